@@ -12,6 +12,17 @@ export interface ChatMessage {
     room: string;
 }
 
+export interface PartyState {
+    room: string;
+    host_id: string;
+    song_id: number;
+    position_ms: number;
+    rate: number;
+    paused: boolean;
+    server_time: number;
+    version: number;
+}
+
 @Injectable({
     providedIn: 'root'
 })
@@ -20,12 +31,26 @@ export class WebSocketService {
     private messagesSubject = new BehaviorSubject<ChatMessage[]>([]);
     private connectedSubject = new BehaviorSubject<boolean>(false);
 
+    // Sala actual, para volver a unirse tras reconectar o cambiar de worker
+    private currentJoin: { user_id: number; username: string; room: string } | null = null;
+    private redirects = 0;
+    private readonly maxRedirects = 3;
+
     public messages$ = this.messagesSubject.asObservable();
     public connected$ = this.connectedSubject.asObservable();
 
+    // Listening party: offset estimado respecto al reloj del servidor (ms)
+    private clockOffset = 0;
+    private partySubject = new BehaviorSubject<PartyState | null>(null);
+    public party$ = this.partySubject.asObservable();
+
     constructor() {
+        this.connect(environment.production ? '' : 'http://localhost:5000');
+    }
+
+    private connect(url: string): void {
         // Configuración simplificada y más estable
-        this.socket = io(environment.production ? '' : 'http://localhost:5000', {
+        this.socket = io(url, {
             transports: ['polling'],  // Solo usar polling inicialmente
             upgrade: false,           // No hacer upgrade a websocket
             forceNew: false,
@@ -38,10 +63,26 @@ export class WebSocketService {
         this.setupSocketListeners();
     }
 
+    // Room sharding: la sala vive en otro worker, reconectar allí
+    private moveToWorker(url: string): void {
+        if (!url || this.redirects >= this.maxRedirects) {
+            console.error('🔀 No se pudo seguir la redirección de sala:', url);
+            return;
+        }
+        this.redirects++;
+        console.log('🔀 Sala alojada en otro worker, reconectando a', url);
+        this.socket.disconnect();
+        this.connect(url);
+    }
+
     private setupSocketListeners(): void {
         this.socket.on('connect', () => {
             console.log('✅ Conectado al servidor WebSocket - ID:', this.socket.id);
             this.connectedSubject.next(true);
+            this.syncClock();
+            if (this.currentJoin) {
+                this.socket.emit('join_room', this.currentJoin);
+            }
         });
 
         this.socket.on('disconnect', (reason: string) => {
@@ -88,9 +129,27 @@ export class WebSocketService {
             this.messagesSubject.next([...currentMessages, message]);
         });
 
+        // Batch of messages (room micro-batching / slow-consumer flush)
+        this.socket.on('new_messages', (batch: { room: string; messages: ChatMessage[] }) => {
+            console.log('💬 Lote de mensajes recibido:', batch.messages.length);
+            const currentMessages = this.messagesSubject.value;
+            this.messagesSubject.next([...currentMessages, ...batch.messages]);
+        });
+
+        // Room owned by another worker (join rejected or room rebalanced)
+        this.socket.on('room_redirect', (data: { room: string; url: string }) => {
+            this.moveToWorker(data.url);
+        });
+
+        this.socket.on('room_moved', (data: { room: string; url: string }) => {
+            this.redirects = 0;
+            this.moveToWorker(data.url);
+        });
+
         // Recent messages when joining a room
         this.socket.on('recent_messages', (data: { messages: ChatMessage[] }) => {
             console.log('📜 Mensajes recientes:', data.messages);
+            this.redirects = 0;
             this.messagesSubject.next(data.messages);
         });
 
@@ -120,6 +179,24 @@ export class WebSocketService {
             console.log('⌨️ Usuario escribiendo:', data);
         });
 
+        // Listening party: estado autoritativo y ticks de corrección de deriva
+        this.socket.on('party_state', (state: PartyState & { active?: boolean }) => {
+            this.partySubject.next(state.active === false ? null : state);
+        });
+
+        this.socket.on('party_tick', ([room, version, serverTime, positionMs]: [string, number, number, number]) => {
+            const state = this.partySubject.value;
+            if (state && state.room === room && state.version === version) {
+                this.partySubject.next({ ...state, server_time: serverTime, position_ms: positionMs });
+            } else if (state && state.room === room) {
+                this.socket.emit('party_state', { room });
+            }
+        });
+
+        this.socket.on('party_ended', () => {
+            this.partySubject.next(null);
+        });
+
         // Error handling
         this.socket.on('error', (error: any) => {
             console.error('🔥 Error del WebSocket:', error);
@@ -129,14 +206,19 @@ export class WebSocketService {
     }
 
     joinRoom(userId: number, username: string, room: string = 'general'): void {
-        this.socket.emit('join_room', {
+        this.currentJoin = {
             user_id: userId,
             username: username,
             room: room
-        });
+        };
+        // Si aún no hay conexión, el handler de 'connect' se une a la sala
+        if (this.socket.connected) {
+            this.socket.emit('join_room', this.currentJoin);
+        }
     }
 
     leaveRoom(userId: number, room: string = 'general'): void {
+        this.currentJoin = null;
         this.socket.emit('leave_room', {
             user_id: userId,
             room: room
@@ -168,6 +250,92 @@ export class WebSocketService {
         });
     }
 
+    // NTP-style: offset = ((t1 - t0) + (t2 - t3)) / 2 de la muestra con menor RTT
+    syncClock(rounds: number = 5): Promise<number> {
+        const samples: { rtt: number; offset: number }[] = [];
+        const sample = (): Promise<void> => new Promise(resolve => {
+            const t0 = Date.now();
+            this.socket.emit('clock_sync', { t0 }, (reply: { t1: number; t2: number }) => {
+                const t3 = Date.now();
+                samples.push({
+                    rtt: (t3 - t0) - (reply.t2 - reply.t1),
+                    offset: ((reply.t1 - t0) + (reply.t2 - t3)) / 2
+                });
+                resolve();
+            });
+        });
+
+        let chain = Promise.resolve();
+        for (let i = 0; i < rounds; i++) {
+            chain = chain.then(sample);
+        }
+        return chain.then(() => {
+            const best = samples.reduce((a, b) => (b.rtt < a.rtt ? b : a));
+            this.clockOffset = best.offset;
+            return this.clockOffset;
+        });
+    }
+
+    serverNow(): number {
+        return Date.now() + this.clockOffset;
+    }
+
+    // Posición esperada de la party ahora mismo (ms), o null si no hay party
+    partyPosition(): number | null {
+        const state = this.partySubject.value;
+        if (!state) {
+            return null;
+        }
+        if (state.paused) {
+            return state.position_ms;
+        }
+        return state.position_ms + (this.serverNow() - state.server_time) * state.rate;
+    }
+
+    // Deriva pequeña: ajustar playbackRate; deriva grande: saltar a la posición
+    correctPlayback(audio: HTMLAudioElement): void {
+        const state = this.partySubject.value;
+        const expected = this.partyPosition();
+        if (!state || expected === null) {
+            return;
+        }
+        if (state.paused) {
+            audio.pause();
+            return;
+        }
+        const drift = expected - audio.currentTime * 1000;
+        if (Math.abs(drift) > 500) {
+            audio.currentTime = expected / 1000;
+            audio.playbackRate = state.rate;
+        } else if (Math.abs(drift) > 40) {
+            // Recuperar la deriva en ~1 s, limitado a ±5 %
+            audio.playbackRate = state.rate * (1 + Math.max(-0.05, Math.min(0.05, drift / 1000)));
+        } else {
+            audio.playbackRate = state.rate;
+        }
+        if (audio.paused) {
+            audio.play().catch(() => undefined);
+        }
+    }
+
+    startParty(userId: number, room: string, songId: number, positionMs: number = 0): void {
+        this.socket.emit('party_start', {
+            user_id: userId,
+            room: room,
+            song_id: songId,
+            position_ms: positionMs
+        });
+    }
+
+    controlParty(userId: number, room: string, action: 'play' | 'pause' | 'seek' | 'rate' | 'song' | 'host',
+                 extra: { position_ms?: number; rate?: number; song_id?: number; host_id?: string } = {}): void {
+        this.socket.emit('party_control', { user_id: userId, room: room, action: action, ...extra });
+    }
+
+    stopParty(userId: number, room: string): void {
+        this.socket.emit('party_stop', { user_id: userId, room: room });
+    }
+
     disconnect(): void {
         if (this.socket) {
             this.socket.disconnect();
@@ -3,7 +3,7 @@ import { CommonModule } from '@angular/common';
 import { FormsModule, ReactiveFormsModule, FormBuilder, FormGroup, Validators } from '@angular/forms';
 import { MusicUploadService, CreateSongData, UploadProgress } from '@core/services/music-upload.service';
 import { TracksService } from '@core/services/tracks.service';
-import { Subject, takeUntil } from 'rxjs';
+import { Subject, takeUntil, timer, switchMap, takeWhile, last } from 'rxjs';
 import { environment } from '../../../../environments/environment';
 
 import { HttpClient, HttpEventType, HttpHeaders } from '@angular/common/http';
@@ -141,14 +141,16 @@ export class MusicUploadComponent implements OnInit, OnDestroy {
         }).subscribe({
             next: (event) => {
                 if (event.type === HttpEventType.Response) {
-                    if (event.body && event.body.url) {
-                        this.songUrl = event.body.url;
-                        alert('Archivo subido correctamente. Ahora completa los datos y guarda la canción.');
+                    if (event.body && event.body.url && event.body.status === 'processing') {
+                        // El servidor aceptó el archivo (202) y lo sube al almacenamiento en segundo plano
+                        this.waitForStorageUpload(event.body.status_url, event.body.url);
+                    } else if (event.body && event.body.url) {
+                        this.onFileUploaded(event.body.url);
                     } else {
                         this.fileUploadError = 'No se pudo obtener la URL del archivo subido.';
                         alert(this.fileUploadError);
+                        this.isUploading = false;
                     }
-                    this.isUploading = false;
                 }
             },
             error: (error: any) => {
@@ -159,6 +161,36 @@ export class MusicUploadComponent implements OnInit, OnDestroy {
         });
     }
 
+    private waitForStorageUpload(statusUrl: string, url: string): void {
+        timer(0, 1000).pipe(
+            switchMap(() => this.http.get<any>(`${environment.apiUrlMusic}${statusUrl}`)),
+            takeWhile(job => job.status === 'processing', true),
+            last(),
+            takeUntil(this.destroy$)
+        ).subscribe({
+            next: (job) => {
+                if (job.status === 'completed') {
+                    this.onFileUploaded(url);
+                } else {
+                    this.fileUploadError = job.error || 'Error al subir el archivo.';
+                    alert(this.fileUploadError);
+                    this.isUploading = false;
+                }
+            },
+            error: () => {
+                this.fileUploadError = 'No se pudo comprobar el estado de la subida.';
+                alert(this.fileUploadError);
+                this.isUploading = false;
+            }
+        });
+    }
+
+    private onFileUploaded(url: string): void {
+        this.songUrl = url;
+        this.isUploading = false;
+        alert('Archivo subido correctamente. Ahora completa los datos y guarda la canción.');
+    }
+
     onSubmit(): void {
         if (!this.uploadForm.valid || !this.selectedFile || !this.songUrl || this.songDuration === null) {
             alert('Debes seleccionar un archivo válido y esperar a que termine la subida antes de guardar la canción.');
@@ -1,12 +1,13 @@
 """
 Music Microservice - Configuración básica optimizada
 """
-from flask import Flask, jsonify, g, request, send_from_directory
+from flask import Flask, jsonify, g, request
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from app.config import get_config
 from app.extensions import db
 from app.controllers.music_controller import music_bp
+from app.utils.json_provider import FastJSONProvider
 import os
 import logging
 import uuid
@@ -19,12 +20,18 @@ app_logger = logging.getLogger("musics-app")
 def create_app(config_name=None):
     """Create and configure the Flask application instance"""
     app = Flask(__name__)
+    # JSON con orjson (mismo formato que el proveedor por defecto de Flask)
+    app.json = FastJSONProvider(app)
 
     # Cargar configuración
     config = get_config()
     app.config.from_object(config)
     config.init_app(app)
 
+    # Compresión gzip/brotli negociada (se registra primero: corre después del resto de after_request)
+    from app.utils.compression import response_compressor
+    response_compressor.init_app(app)
+
     # Inicializar extensiones
     db.init_app(app)
 
@@ -85,10 +92,25 @@ def create_app(config_name=None):
     app.register_blueprint(music_bp)
 
     # Add route to serve uploaded files
+    # Subidas al almacenamiento en segundo plano (spool en disco + pool de hilos acotado)
+    from app.utils.upload_queue import upload_queue
+    upload_queue.init_app(app)
+    from app.utils.direct_upload import direct_uploads
+    direct_uploads.init_app(app, upload_queue.storage)
+
+    # Archivos subidos: rangos (seek del reproductor), 304 y envío sin copia o X-Accel-Redirect
+    from app.utils.media import media_sender
+    media_sender.init_app(app)
+
+    from app.utils.storage import LocalStorage
+    if isinstance(upload_queue.storage, LocalStorage):
+        uploads_dir = upload_queue.storage.directory  # donde escribe STORAGE_BACKEND=local
+    else:
+        uploads_dir = os.path.join(os.getcwd(), 'uploads')
+
     @app.route('/uploads/<filename>')
     def uploaded_file(filename):
-        uploads_dir = os.path.join(os.getcwd(), 'uploads')
-        return send_from_directory(uploads_dir, filename)
+        return media_sender.send(uploads_dir, filename)
 
     # Error handlers simplificados
     setup_basic_error_handlers(app)
@@ -137,6 +159,16 @@ def setup_basic_error_handlers(app):
             'request_id': request_id
         }), 401
 
+    @app.errorhandler(413)
+    def request_entity_too_large(error):
+        request_id = getattr(g, 'request_id', 'unknown')
+        error_logger.warning(f"Request too large: {str(error)}")
+        return jsonify({
+            'error': 'File too large',
+            'message': str(error),
+            'request_id': request_id
+        }), 413
+
     @app.errorhandler(404)
     def not_found(error):
         request_id = getattr(g, 'request_id', 'unknown')
@@ -18,6 +18,47 @@ class Config:
     SERVICE_NAME = os.getenv('SERVICE_NAME', 'users-auth')
     SERVICE_VERSION = os.getenv('SERVICE_VERSION', '1.0.0')
     
+    # Segundos que una lectura espera a la consulta idéntica en curso antes de ejecutarla ella misma
+    CATALOG_SINGLE_FLIGHT_TIMEOUT = float(os.getenv('CATALOG_SINGLE_FLIGHT_TIMEOUT', '10'))
+
+    # Listados: por encima de este número de filas (o con Accept: application/x-ndjson)
+    # la respuesta se transmite por lotes leídos con un cursor de servidor
+    LIST_STREAM_THRESHOLD = int(os.getenv('LIST_STREAM_THRESHOLD', '2000'))
+    LIST_STREAM_BATCH_SIZE = int(os.getenv('LIST_STREAM_BATCH_SIZE', '500'))
+
+    # Compresión gzip/brotli de respuestas: tamaño mínimo (bytes), nivel gzip y calidad brotli
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+    COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '4'))
+
+    # Archivos de /uploads: máximo de rangos por petición, max-age de caché y, detrás de nginx,
+    # prefijo de una location "internal" para X-Accel-Redirect (vacío = los sirve Flask)
+    UPLOADS_MAX_RANGES = int(os.getenv('UPLOADS_MAX_RANGES', '8'))
+    UPLOADS_CACHE_MAX_AGE = int(os.getenv('UPLOADS_CACHE_MAX_AGE', '3600'))
+    UPLOADS_ACCEL_REDIRECT_PREFIX = os.getenv('UPLOADS_ACCEL_REDIRECT_PREFIX', '')
+
+    # Subidas: se copian por bloques a un spool en disco y se envían al almacenamiento en segundo
+    # plano (UPLOAD_WORKERS hilos, como mucho UPLOAD_MAX_PENDING a la vez por proceso).
+    # STORAGE_BACKEND: supabase, local (carpeta servida por /uploads) o s3 (MinIO / S3, requiere boto3)
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'supabase')
+    SUPABASE_BUCKET = os.getenv('SUPABASE_BUCKET', 'musics')
+    LOCAL_STORAGE_DIR = os.getenv('LOCAL_STORAGE_DIR', 'uploads')
+    LOCAL_STORAGE_BASE_URL = os.getenv('LOCAL_STORAGE_BASE_URL', '')
+    S3_BUCKET = os.getenv('S3_BUCKET', 'musics')
+    S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL', '')
+    S3_PUBLIC_BASE_URL = os.getenv('S3_PUBLIC_BASE_URL', '')
+    UPLOAD_SPOOL_DIR = os.getenv('UPLOAD_SPOOL_DIR', '')
+    UPLOAD_MAX_SIZE = int(os.getenv('UPLOAD_MAX_SIZE', str(50 * 1024 * 1024)))
+    UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', '4'))
+    UPLOAD_MAX_PENDING = int(os.getenv('UPLOAD_MAX_PENDING', '16'))
+    UPLOAD_JOB_TTL = int(os.getenv('UPLOAD_JOB_TTL', '3600'))
+    # Subidas directas al almacenamiento: la URL firmada vale DIRECT_UPLOAD_URL_TTL segundos y el
+    # token para completar la subida DIRECT_UPLOAD_COMPLETE_TTL (en Supabase la URL dura siempre 2 h)
+    DIRECT_UPLOAD_URL_TTL = int(os.getenv('DIRECT_UPLOAD_URL_TTL', '900'))
+    DIRECT_UPLOAD_COMPLETE_TTL = int(os.getenv('DIRECT_UPLOAD_COMPLETE_TTL', '86400'))
+    # Werkzeug corta el cuerpo al superar el límite (413) en vez de recibirlo entero
+    MAX_CONTENT_LENGTH = UPLOAD_MAX_SIZE + 1024 * 1024
+
     # CORS Configuration
     CORS_ORIGINS = ['http://localhost:3000', 'http://localhost:5000']
     
@@ -1,9 +1,12 @@
-import os
-from flask import Blueprint, request, jsonify, g
-from app.repositories.music_repository import MusicRepository
+from flask import Blueprint, current_app, request, jsonify, g
+from app.repositories.music_repository import LIST_COLUMNS, MusicRepository
 from app.schemas.music_schema import MusicCreate, MusicUpdate, MusicResponse
 from app.utils.auth import require_auth, no_auth
-from app.utils.supabase_client import supabase
+from app.utils.upload_queue import UploadRejected, upload_queue
+from app.utils.direct_upload import direct_uploads
+from app.utils.storage import LocalStorage
+from app.utils.streaming import stream_batches, wants_ndjson
+from app.utils.projection import selected_columns
 from pydantic import ValidationError
 import logging
 
@@ -45,8 +48,20 @@ def get_all_musics():
     
     request_id = getattr(g, 'request_id', 'unknown')
     try:
-        musics = MusicRepository.get_all_musics()
-        return jsonify([MusicResponse.from_orm(m).dict() for m in musics]), 200
+        # ?fields=id,title,artist: solo esas columnas en el SELECT y en la respuesta
+        columns = selected_columns(LIST_COLUMNS, request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': 'Invalid fields', 'details': str(e), 'request_id': request_id}), 400
+
+    try:
+        if not wants_ndjson():
+            body = MusicRepository.get_all_musics_json(columns)
+            if body is not None:
+                response = current_app.response_class(body, mimetype='application/json')
+                response.vary.add('Accept')
+                return response, 200
+        # Listado grande o NDJSON: por lotes con cursor de servidor
+        return stream_batches(MusicRepository.iter_all_musics(columns)), 200
     except Exception as e:
         logger.error(f"Error fetching all musics: {str(e)}", extra={'custom_request_id': request_id})
         return jsonify({'error': 'Failed to fetch musics', 'details': str(e), 'request_id': request_id}), 500
@@ -198,34 +213,122 @@ def upload_music_file():
         file_extension = filename.rsplit('.', 1)[1].lower()
         unique_filename = f"{timestamp}_{uuid.uuid4().hex[:8]}.{file_extension}"
 
-        # Validar tamaño (50MB)
-        file.seek(0, os.SEEK_END)
-        file_size = file.tell()
-        file.seek(0)
-        max_size = 50 * 1024 * 1024
-        if file_size > max_size:
-            logger.warning(f"File too large: {file_size} bytes", extra={'custom_request_id': request_id})
-            return jsonify({'error': 'File too large (max 50MB)', 'request_id': request_id}), 400
-
-        # Subir a Supabase Storage
-        file_bytes = file.read()
-        bucket_name = "musics"  # Cambia esto si tu bucket tiene otro nombre
-        supabase.storage.from_(bucket_name).upload(unique_filename, file_bytes, {"content-type": file.mimetype})
+        # Se copia por bloques a disco (nunca entero en memoria) y se sube en segundo plano
+        job = upload_queue.accept(file, unique_filename)
 
-        # Obtener URL pública
-        public_url = supabase.storage.from_(bucket_name).get_public_url(unique_filename)
+        logger.info("File accepted for upload", extra={'custom_request_id': request_id, 'file': unique_filename})
 
-        logger.info("File uploaded to Supabase", extra={'custom_request_id': request_id, 'file': unique_filename})
-
-        return jsonify({
-            'message': 'File uploaded successfully',
-            'url': public_url,
+        response = jsonify({
+            'message': 'File accepted, upload in progress',
+            'status': job['status'],
+            'job_id': job['id'],
+            'status_url': f"/api/musics/upload/{job['id']}",
+            'url': job['url'],
             'filename': unique_filename,
             'original_filename': filename,
-            'file_size': file_size,
+            'file_size': job['file_size'],
             'request_id': request_id
-        }), 201
+        })
+        response.headers['Location'] = f"/api/musics/upload/{job['id']}"
+        return response, 202
 
+    except UploadRejected as e:
+        logger.warning(f"Upload rejected: {str(e)}", extra={'custom_request_id': request_id})
+        response = jsonify({'error': str(e), 'request_id': request_id})
+        if e.status_code == 503:
+            response.headers['Retry-After'] = '5'
+        return response, e.status_code
     except Exception as e:
         logger.error(f"Unexpected error during upload: {str(e)}", extra={'custom_request_id': request_id})
-        return jsonify({'error': 'Internal server error', 'details': str(e), 'request_id': request_id}), 500
\ No newline at end of file
+        return jsonify({'error': 'Internal server error', 'details': str(e), 'request_id': request_id}), 500
+
+
+# GET /musics/upload/<job_id> - estado de una subida aceptada
+@music_bp.route('/upload/<job_id>', methods=['GET'])
+@no_auth
+def get_upload_status(job_id):
+    request_id = getattr(g, 'request_id', 'unknown')
+    job = upload_queue.status(job_id)
+    if job is None:
+        return jsonify({'error': 'Upload not found', 'request_id': request_id}), 404
+    response = jsonify({**job, 'request_id': request_id})
+    response.headers['Cache-Control'] = 'no-store'
+    return response, 200
+
+
+# POST /musics/upload/sign - URL firmada para subir el archivo directamente al almacenamiento
+@music_bp.route('/upload/sign', methods=['POST'])
+@no_auth
+def sign_music_upload():
+    request_id = getattr(g, 'request_id', 'unknown')
+    data = request.get_json(silent=True) or {}
+    try:
+        signed = direct_uploads.sign(data.get('filename'), data.get('content_type'), data.get('size'))
+    except UploadRejected as e:
+        logger.warning(f"Direct upload rejected: {str(e)}", extra={'custom_request_id': request_id})
+        return jsonify({'error': str(e), 'request_id': request_id}), e.status_code
+    except Exception as e:
+        logger.error(f"Failed to sign upload: {str(e)}", extra={'custom_request_id': request_id})
+        return jsonify({'error': 'Failed to sign upload', 'details': str(e), 'request_id': request_id}), 502
+
+    logger.info("Direct upload signed", extra={'custom_request_id': request_id, 'file': signed['filename']})
+    response = jsonify({**signed, 'request_id': request_id})
+    response.headers['Cache-Control'] = 'no-store'
+    return response, 200
+
+
+# POST /musics/upload/complete - comprueba el archivo subido y crea la canción
+@music_bp.route('/upload/complete', methods=['POST'])
+@require_auth
+def complete_music_upload():
+    request_id = getattr(g, 'request_id', 'unknown')
+    data = request.get_json(silent=True) or {}
+    try:
+        claims, url = direct_uploads.complete(data.pop('upload_token', None))
+    except UploadRejected as e:
+        logger.warning(f"Direct upload not completed: {str(e)}", extra={'custom_request_id': request_id})
+        return jsonify({'error': str(e), 'request_id': request_id}), e.status_code
+    except Exception as e:
+        logger.error(f"Failed to check uploaded file: {str(e)}", extra={'custom_request_id': request_id})
+        return jsonify({'error': 'Failed to check uploaded file', 'details': str(e), 'request_id': request_id}), 502
+
+    # Reintento de un complete que ya creó la canción
+    existing = MusicRepository.get_music_by_url(url)
+    if existing:
+        return jsonify(MusicResponse.from_orm(existing).dict()), 200
+
+    try:
+        music_in = MusicCreate(**{**data, 'url': url})
+    except (TypeError, ValidationError) as e:
+        logger.warning(f"Invalid input for create: {str(e)}", extra={'custom_request_id': request_id})
+        return jsonify({'error': 'Invalid input', 'details': str(e), 'request_id': request_id}), 400
+
+    from app.models.music import Music
+    from app.metrics_middleware import record_music_upload
+    try:
+        music = MusicRepository.add_music(Music(**music_in.dict()))
+        record_music_upload(True, claims['key'].rsplit('.', 1)[1], claims['size'])
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Music created from direct upload",
+                        extra={'custom_request_id': request_id, 'music_title': music.title})
+        return jsonify(MusicResponse.from_orm(music).dict()), 201
+    except Exception as e:
+        logger.error(f"Failed to create music: {str(e)}", extra={'custom_request_id': request_id})
+        return jsonify({'error': 'Failed to create music', 'details': str(e), 'request_id': request_id}), 500
+
+
+# PUT /musics/storage/<key> - destino de las URLs firmadas con STORAGE_BACKEND=local
+@music_bp.route('/storage/<key>', methods=['PUT'])
+@no_auth
+def put_local_storage_object(key):
+    request_id = getattr(g, 'request_id', 'unknown')
+    storage = upload_queue.storage
+    if not isinstance(storage, LocalStorage):
+        return jsonify({'error': 'Not found', 'request_id': request_id}), 404
+    try:
+        size = storage.receive(key, request.args.get('token'), request.mimetype, request.stream)
+    except PermissionError as e:
+        return jsonify({'error': str(e), 'request_id': request_id}), 403
+    except ValueError as e:
+        return jsonify({'error': str(e), 'request_id': request_id}), 400
+    return jsonify({'key': key, 'size': size, 'request_id': request_id}), 200
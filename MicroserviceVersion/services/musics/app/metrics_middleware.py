@@ -34,6 +34,12 @@ music_downloads_total = Counter(
     ['format']
 )
 
+music_bytes_served_total = Counter(
+    'music_bytes_served_total',
+    'Audio bytes served from /uploads',
+    ['format', 'kind']  # full, partial, multipart, accel (nginx envía el fichero)
+)
+
 music_storage_bytes_used = Gauge(
     'music_storage_bytes_used',
     'Storage space used for music files'
@@ -68,6 +74,13 @@ file_upload_size_bytes = Histogram(
     'Size of uploaded files in bytes'
 )
 
+# Coalescencia de lecturas idénticas concurrentes (single-flight)
+single_flight_calls_total = Counter(
+    'single_flight_calls_total',
+    'Coalesced read calls',
+    ['name', 'result']  # leader, shared, timeout, error
+)
+
 # Métricas de sistema
 memory_usage_bytes = Gauge(
     'nodejs_memory_usage_bytes',
@@ -159,9 +172,12 @@ def record_music_upload(success=True, file_format='unknown', file_size_bytes=0):
     if success and file_size_bytes > 0:
         file_upload_size_bytes.observe(file_size_bytes)
 
-def record_music_download(file_format='unknown'):
-    """Registrar descarga/reproducción de música"""
-    music_downloads_total.labels(format=file_format).inc()
+def record_music_download(file_format='unknown', bytes_served=0, kind='full', counted=True):
+    """Registrar descarga/reproducción de música (counted=False: rango que continúa una ya contada)"""
+    if counted:
+        music_downloads_total.labels(format=file_format).inc()
+    if bytes_served > 0:
+        music_bytes_served_total.labels(format=file_format, kind=kind).inc(bytes_served)
 
 def record_audio_processing_time(duration, operation='upload'):
     """Registrar tiempo de procesamiento de audio"""
@@ -188,6 +204,10 @@ def record_database_query_time(duration, operation='select'):
     """Registrar tiempo de consulta a BD"""
     database_queries_duration_seconds.labels(operation=operation).observe(duration)
 
+def record_single_flight(name, result):
+    """Registrar una lectura coalescida (leader ejecutó la consulta, shared la reutilizó)"""
+    single_flight_calls_total.labels(name=name, result=result).inc()
+
 # =============================================================================
 # INSTANCIA SINGLETON
 # =============================================================================
@@ -205,5 +225,6 @@ __all__ = [
     'record_supabase_request',
     'update_storage_used',
     'update_total_files',
-    'record_database_query_time'
+    'record_database_query_time',
+    'record_single_flight'
 ]
\ No newline at end of file
@@ -1,14 +1,74 @@
 from app.models.music import Music
 from app.extensions import db
-from typing import List, Optional
+from app.utils.single_flight import music_flight
+from app.utils.json_provider import rows_to_json
+from app.utils.projection import fields_key
+from app.config import get_config
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+_config = get_config()
+
+# Campos de MusicResponse, leídos como columnas para el listado directo a JSON
+LIST_COLUMNS = (Music.id, Music.title, Music.artist, Music.album, Music.duration, Music.url,
+                Music.cover_url, Music.artist_name, Music.artist_nickname, Music.nationality)
+
 
 class MusicRepository:
     """Repository for managing music records in the database."""
 
+    @staticmethod
+    def _detach(musics: List[Music]) -> List[Music]:
+        """Expunge loaded records so they can be shared across requests read-only."""
+        for music in musics:
+            db.session.expunge(music)
+        return musics
+
     @staticmethod
     def get_all_musics() -> List[Music]:
-        """Retrieve all music records from the database."""
-        return Music.query.all()
+        """
+        Retrieve all music records from the database.
+
+        Concurrent calls share one query; the records are detached and must
+        not be modified (use get_music_by_id for updates).
+        """
+        return music_flight.do('all', lambda: MusicRepository._detach(Music.query.all()))
+
+    @staticmethod
+    def get_all_musics_json(columns: Sequence = LIST_COLUMNS) -> Optional[bytes]:
+        """
+        All music records as the JSON array of MusicResponse objects (or of
+        a projection of LIST_COLUMNS), encoded straight from the selected
+        columns (no ORM instances or Pydantic models). Concurrent calls
+        share one query and one encoding. Returns None when there are more
+        than LIST_STREAM_THRESHOLD records: stream them with iter_all_musics
+        instead.
+        """
+        threshold = _config.LIST_STREAM_THRESHOLD
+
+        def encode():
+            rows = [row._asdict() for row in db.session.execute(db.select(*columns).limit(threshold + 1))]
+            return rows_to_json(rows) if len(rows) <= threshold else None
+        return music_flight.do(('all_json', fields_key(columns)), encode)
+
+    @staticmethod
+    def iter_all_musics(columns: Sequence = LIST_COLUMNS,
+                        batch_size: Optional[int] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Batches of MusicResponse rows read through a server-side cursor
+        (yield_per). The query runs now; the rows are fetched as the
+        batches are consumed.
+        """
+        statement = db.select(*columns).execution_options(
+            yield_per=batch_size or _config.LIST_STREAM_BATCH_SIZE)
+        result = db.session.execute(statement)
+
+        def batches():
+            try:
+                for partition in result.partitions():
+                    yield [row._asdict() for row in partition]
+            finally:
+                result.close()
+        return batches()
 
     @staticmethod
     def get_music_by_id(music_id: int) -> Optional[Music]:
@@ -17,8 +77,16 @@ class MusicRepository:
 
     @staticmethod
     def get_music_by_title(title: str) -> Optional[Music]:
-        """Retrieve a music record by its title."""
-        return Music.query.filter_by(title=title).first()
+        """Retrieve a music record by its title (coalesced and detached like get_all_musics)."""
+        def query():
+            music = Music.query.filter_by(title=title).first()
+            return MusicRepository._detach([music])[0] if music else None
+        return music_flight.do(('title', title), query)
+
+    @staticmethod
+    def get_music_by_url(url: str) -> Optional[Music]:
+        """Retrieve the music record whose audio file is at ``url``."""
+        return Music.query.filter_by(url=url).first()
 
     @staticmethod
     def add_music(music: Music) -> Music:
@@ -0,0 +1,118 @@
+"""
+Pre-signed uploads straight from the client to the storage backend
+"""
+from typing import Any, Dict, Optional, Tuple
+import logging
+import time
+import uuid
+
+from flask import Flask, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+from app.utils.storage import StorageBackend
+from app.utils.upload_queue import UploadRejected
+
+logger = logging.getLogger(__name__)
+
+# Tipos aceptados por extensión (los navegadores no coinciden en el de wav y m4a)
+AUDIO_TYPES = {
+    'mp3': {'audio/mpeg', 'audio/mp3'},
+    'wav': {'audio/wav', 'audio/x-wav', 'audio/wave'},
+    'flac': {'audio/flac', 'audio/x-flac'},
+    'm4a': {'audio/mp4', 'audio/x-m4a', 'audio/m4a'},
+    'ogg': {'audio/ogg'},
+}
+
+
+class DirectUploads:
+    """
+    The client asks ``sign`` for a short-lived upload URL, PUTs the file to
+    the storage backend itself and then calls ``complete``; the audio never
+    passes through this service.
+
+    ``sign`` also returns an ``upload_token`` binding the object key to the
+    declared size and content type. ``complete`` checks that token and
+    ``stat``s the object: if what arrived doesn't match the declaration (or
+    exceeds ``max_size``), the object is deleted and the upload rejected.
+    The URL is valid for ``url_ttl`` seconds, the token for
+    ``complete_ttl`` so a slow transfer can still be completed.
+    """
+
+    def __init__(self) -> None:
+        self.storage: Optional[StorageBackend] = None
+        self.max_size = 50 * 1024 * 1024
+        self.url_ttl = 900
+        self.complete_ttl = 86400
+        self._signer: Optional[URLSafeTimedSerializer] = None
+
+    def init_app(self, app: Flask, storage: StorageBackend) -> None:
+        self.storage = storage
+        self.max_size = app.config.get('UPLOAD_MAX_SIZE', self.max_size)
+        self.url_ttl = app.config.get('DIRECT_UPLOAD_URL_TTL', self.url_ttl)
+        self.complete_ttl = app.config.get('DIRECT_UPLOAD_COMPLETE_TTL', self.complete_ttl)
+        self._signer = URLSafeTimedSerializer(app.config['SECRET_KEY'], salt='musics-direct-upload')
+
+    def sign(self, filename: str, content_type: str, size: Any) -> Dict[str, Any]:
+        """Signed upload for a file the client declares; raises UploadRejected"""
+        extension = filename.rsplit('.', 1)[1].lower() if '.' in (filename or '') else ''
+        if extension not in AUDIO_TYPES:
+            raise UploadRejected('Invalid file extension')
+        if content_type not in AUDIO_TYPES[extension]:
+            raise UploadRejected(f'Invalid content type for .{extension}')
+        if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+            raise UploadRejected('size must be a positive integer')
+        if size > self.max_size:
+            raise UploadRejected(f'File too large (max {self.max_size // (1024 * 1024)}MB)', 413)
+
+        key = f"{int(time.time())}_{uuid.uuid4().hex[:8]}.{extension}"
+        upload = self.storage.create_signed_upload(key, content_type, size, self.url_ttl)
+        if upload['url'].startswith('/'):
+            upload['url'] = request.host_url.rstrip('/') + upload['url']  # almacenamiento local
+        token = self._signer.dumps({'key': key, 'size': size, 'content_type': content_type,
+                                    'original_filename': filename})
+        return {
+            'upload': upload,
+            'upload_token': token,
+            'filename': key,
+            'expires_at': int(time.time()) + self.url_ttl,
+            'storage': self.storage.name
+        }
+
+    def complete(self, token: str) -> Tuple[Dict[str, Any], str]:
+        """
+        Claims of a finished upload and the object's public URL, once the
+        stored object matches them; raises UploadRejected
+        """
+        try:
+            claims = self._signer.loads(token or '', max_age=self.complete_ttl)
+        except SignatureExpired:
+            raise UploadRejected('Upload token expired', 410)
+        except BadSignature:
+            raise UploadRejected('Invalid upload token')
+
+        key = claims['key']
+        stored = self.storage.stat(key)
+        if stored is None:
+            raise UploadRejected('File not found in storage, upload it first', 409)
+
+        problem = None
+        if stored['size'] != claims['size']:
+            problem = f"Stored size {stored['size']} does not match the declared {claims['size']} bytes"
+        elif stored['size'] > self.max_size:
+            problem = 'File too large'
+        elif stored['content_type'] and stored['content_type'] != claims['content_type'] \
+                and stored['content_type'] not in AUDIO_TYPES[key.rsplit('.', 1)[1]]:
+            problem = f"Stored content type {stored['content_type']} is not {claims['content_type']}"
+        if problem:
+            # Lo que no se declaró no se queda en el bucket
+            logger.warning(f'Rejecting direct upload {key}: {problem}')
+            self.storage.delete(key)
+            raise UploadRejected(problem, 422)
+
+        url = self.storage.public_url(key)
+        if url.startswith('/'):
+            url = request.host_url.rstrip('/') + url
+        return claims, url
+
+
+direct_uploads = DirectUploads()
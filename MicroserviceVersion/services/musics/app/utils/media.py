@@ -0,0 +1,218 @@
+"""
+Range, conditional and zero-copy serving of uploaded audio files
+"""
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+import mimetypes
+import os
+import secrets
+from urllib.parse import quote
+
+from flask import Flask, Response, request
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+# Tipos de audio que el módulo mimetypes no conoce en todas las plataformas
+for _extension, _type in (('.mp3', 'audio/mpeg'), ('.m4a', 'audio/mp4'), ('.aac', 'audio/aac'),
+                          ('.flac', 'audio/flac'), ('.ogg', 'audio/ogg'), ('.wav', 'audio/wav')):
+    mimetypes.add_type(_type, _extension)
+
+ByteRange = Tuple[Optional[int], Optional[int]]
+
+
+def parse_byte_ranges(header: Optional[str]) -> Optional[List[ByteRange]]:
+    """
+    ``Range: bytes=...`` as (start, stop) pairs with ``stop`` exclusive;
+    suffix ranges are (None, length) and open ones (start, None). None when
+    the header is missing or malformed. Unlike werkzeug's parser, ranges may
+    come unsorted or overlap (RFC 9110).
+    """
+    if not header:
+        return None
+    units, _, spec = header.partition('=')
+    if units.strip().lower() != 'bytes':
+        return None
+    ranges: List[ByteRange] = []
+    for item in spec.split(','):
+        first, dash, last = item.strip().partition('-')
+        if not dash or not (first + last).isdigit():
+            return None
+        if not first:
+            ranges.append((None, int(last)))
+        elif not last:
+            ranges.append((int(first), None))
+        elif int(first) <= int(last):
+            ranges.append((int(first), int(last) + 1))
+        else:
+            return None
+    return ranges
+
+
+class MediaSender:
+    """
+    Serves audio files so players can seek: strong ETag and Last-Modified
+    with 304s, ``206`` for one range and ``multipart/byteranges`` for
+    several, ``416`` when none is satisfiable and If-Range so a changed file
+    is never spliced. Whole files and single ranges go through the server's
+    ``wsgi.file_wrapper`` (``sendfile()`` under gunicorn); with
+    ``accel_prefix`` nginx serves the file through ``X-Accel-Redirect``.
+    Bytes served are recorded per format in ``record_music_download``.
+    """
+
+    def __init__(self, chunk_size: int = 256 * 1024, max_ranges: int = 8,
+                 max_age: int = 3600, accel_prefix: Optional[str] = None):
+        self.chunk_size = chunk_size
+        self.max_ranges = max_ranges
+        self.max_age = max_age
+        self.accel_prefix = accel_prefix
+
+    def init_app(self, app: Flask) -> None:
+        self.max_ranges = app.config.get('UPLOADS_MAX_RANGES', self.max_ranges)
+        self.max_age = app.config.get('UPLOADS_CACHE_MAX_AGE', self.max_age)
+        self.accel_prefix = app.config.get('UPLOADS_ACCEL_REDIRECT_PREFIX') or None
+
+    def send(self, directory: str, filename: str) -> Response:
+        """Response for ``filename`` inside ``directory``; NotFound if it isn't a file there"""
+        path = safe_join(directory, filename)
+        if path is None or not os.path.isfile(path):
+            raise NotFound()
+
+        file_format = os.path.splitext(filename)[1].lstrip('.').lower() or 'unknown'
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+        if self.accel_prefix:
+            # nginx resuelve rangos y condicionales y envía el fichero con sendfile
+            response = Response(mimetype=mimetype)
+            response.headers['X-Accel-Redirect'] = self.accel_prefix.rstrip('/') + '/' + quote(filename)
+            self._record(file_format, 'accel', 0, counted=True)
+            return response
+
+        stat = os.stat(path)
+        size = stat.st_size
+        etag = f'{stat.st_mtime_ns:x}-{size:x}'
+        last_modified = int(stat.st_mtime)
+
+        response = Response(mimetype=mimetype, direct_passthrough=True)
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.headers['Accept-Ranges'] = 'bytes'
+        response.cache_control.public = True
+        response.cache_control.max_age = self.max_age
+
+        if request.if_none_match or request.if_modified_since:
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                not_modified = last_modified <= request.if_modified_since.timestamp()
+            if not_modified:
+                response.status_code = 304
+                return response
+
+        ranges = self._requested_ranges(size, etag, last_modified)
+        if ranges == []:
+            response.status_code = 416
+            response.headers['Content-Range'] = f'bytes */{size}'
+            return response
+
+        parts: List[bytes] = []
+        closing = b''
+        if not ranges:
+            kind, (start, stop) = 'full', (0, size)
+            response.content_length = size
+        elif len(ranges) == 1:
+            kind, (start, stop) = 'partial', ranges[0]
+            response.status_code = 206
+            response.content_length = stop - start
+            response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+        else:
+            kind, start = 'multipart', ranges[0][0]
+            boundary = secrets.token_hex(16)
+            parts = [(f'--{boundary}\r\nContent-Type: {mimetype}\r\n'
+                      f'Content-Range: bytes {first}-{last - 1}/{size}\r\n\r\n').encode()
+                     for first, last in ranges]
+            closing = f'--{boundary}--\r\n'.encode()
+            response.status_code = 206
+            response.content_type = f'multipart/byteranges; boundary={boundary}'
+            response.content_length = sum(len(head) + last - first + 2
+                                          for head, (first, last) in zip(parts, ranges)) + len(closing)
+
+        # Una reproducción se cuenta una vez: cuando la petición empieza en el byte 0
+        self._record(file_format, kind, response.content_length or 0, counted=start == 0)
+        if request.method == 'HEAD':
+            return response
+
+        if kind == 'multipart':
+            response.response = self._multipart(path, ranges, parts, closing)
+        else:
+            response.response = self._file_body(path, start, stop - start)
+        return response
+
+    def _requested_ranges(self, size: int, etag: str,
+                          last_modified: int) -> Optional[List[Tuple[int, int]]]:
+        """Sorted, merged (start, stop) pairs; None for the whole file, [] when none is satisfiable"""
+        requested = parse_byte_ranges(request.headers.get('Range'))
+        if requested is None:
+            return None
+
+        if_range = request.if_range
+        if if_range.etag is not None and if_range.etag != etag:
+            return None  # el fichero cambió: se envía completo
+        if if_range.date is not None and int(if_range.date.timestamp()) != last_modified:
+            return None
+        if len(requested) > self.max_ranges:
+            return None
+
+        ranges: List[Tuple[int, int]] = []
+        for start, stop in requested:
+            if start is None:  # sufijo: los últimos ``stop`` bytes
+                start, stop = max(size - stop, 0), size
+            else:
+                stop = size if stop is None else min(stop, size)
+            if start < stop:
+                ranges.append((start, stop))
+
+        merged: List[Tuple[int, int]] = []
+        for start, stop in sorted(ranges):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+            else:
+                merged.append((start, stop))
+        return merged
+
+    def _file_body(self, path: str, start: int, length: int) -> Iterable[bytes]:
+        f = open(path, 'rb')
+        f.seek(start)
+        file_wrapper = request.environ.get('wsgi.file_wrapper')
+        if file_wrapper is not None:
+            # El servidor no envía más de Content-Length (PEP 3333); gunicorn usa sendfile
+            return file_wrapper(f, self.chunk_size)
+        return self._read(f, length)
+
+    def _read(self, f: BinaryIO, length: int) -> Iterator[bytes]:
+        with f:
+            yield from self._read_range(f, length)
+
+    def _multipart(self, path: str, ranges: List[Tuple[int, int]],
+                   parts: List[bytes], closing: bytes) -> Iterator[bytes]:
+        with open(path, 'rb') as f:
+            for head, (start, stop) in zip(parts, ranges):
+                yield head
+                f.seek(start)
+                yield from self._read_range(f, stop - start)
+                yield b'\r\n'
+            yield closing
+
+    def _read_range(self, f: BinaryIO, length: int) -> Iterator[bytes]:
+        while length > 0:
+            chunk = f.read(min(self.chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+    @staticmethod
+    def _record(file_format: str, kind: str, bytes_served: int, counted: bool) -> None:
+        from app.metrics_middleware import record_music_download
+        record_music_download(file_format, bytes_served=bytes_served, kind=kind, counted=counted)
+
+
+media_sender = MediaSender()
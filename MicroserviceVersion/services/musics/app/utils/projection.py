@@ -0,0 +1,30 @@
+"""
+Sparse fieldsets (``?fields=id,title,artist``) for list endpoints
+"""
+from typing import Any, Iterable, List, Optional, Sequence
+
+
+def selected_columns(columns: Sequence[Any], fields: Optional[str] = None,
+                     required: Iterable[str] = ('id',)) -> List[Any]:
+    """
+    The columns of ``columns`` named in ``fields``, plus ``required``, in
+    their original order; all of them without ``fields``. Raises
+    ValueError for names that are not in ``columns``.
+    """
+    if not fields or not fields.strip():
+        return list(columns)
+
+    names = {name.strip() for name in fields.split(',') if name.strip()}
+    available = {column.key for column in columns}
+    unknown = names - available
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))} "
+                         f"(available: {', '.join(column.key for column in columns)})")
+
+    names.update(required)
+    return [column for column in columns if column.key in names]
+
+
+def fields_key(columns: Sequence[Any]) -> str:
+    """Canonical form of a projection, for single-flight keys"""
+    return ','.join(column.key for column in columns)
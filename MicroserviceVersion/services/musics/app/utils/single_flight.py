@@ -0,0 +1,84 @@
+"""
+Single-flight request coalescing for expensive reads
+"""
+from typing import Any, Callable, Dict, Hashable, Optional
+import logging
+import threading
+
+from app.config import get_config
+
+logger = logging.getLogger("single_flight")
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Dogpile protection: concurrent identical reads share one computation.
+
+    The first caller of ``do(key, fn)`` runs ``fn``; callers arriving with
+    the same key while it runs wait for it and receive the same result (or
+    exception). A follower waiting more than ``timeout`` seconds gives up
+    and runs ``fn`` itself. The result is shared between threads, so it
+    must be treated as read-only.
+    """
+
+    def __init__(self, name: str, timeout: float = 10.0):
+        self.name = name
+        self.timeout = timeout
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if leader:
+            return self._lead(key, call, fn)
+
+        if not call.done.wait(self.timeout if timeout is None else timeout):
+            self._record('timeout')
+            logger.warning(f'Single-flight wait timed out for {self.name}:{key}, running it directly')
+            return fn()
+
+        self._record('shared')
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def _lead(self, key: Hashable, call: _Call, fn: Callable[[], Any]) -> Any:
+        try:
+            call.result = fn()
+            self._record('leader')
+            return call.result
+        except Exception as e:
+            call.error = e
+            self._record('error')
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def _record(self, result: str):
+        from app.metrics_middleware import record_single_flight
+        record_single_flight(self.name, result)
+
+
+_config = get_config()
+
+music_flight = SingleFlight('music_repository', timeout=_config.CATALOG_SINGLE_FLIGHT_TIMEOUT)
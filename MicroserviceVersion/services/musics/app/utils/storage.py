@@ -0,0 +1,236 @@
+"""
+Storage backends for uploaded audio files
+"""
+from typing import IO, Any, Dict, Mapping, Optional
+import mimetypes
+import os
+import shutil
+import tempfile
+
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+from app.utils import media  # noqa: F401  (registra los tipos de audio en mimetypes)
+
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+except ImportError:  # boto3 es opcional: solo lo necesita el backend s3 (MinIO / S3)
+    boto3 = None
+
+
+class StorageBackend:
+    """
+    Destination of uploaded files. ``upload`` streams a complete file from
+    disk, so no backend needs the whole body in memory.
+
+    For direct uploads, ``create_signed_upload`` returns a short-lived
+    ``{'url', 'method', 'headers'}`` the client sends the file to without
+    going through this service, and ``stat`` reports what actually
+    arrived (``{'size', 'content_type'}``, None if nothing did).
+    """
+
+    name = 'base'
+
+    def upload(self, key: str, path: str, content_type: str) -> None:
+        raise NotImplementedError
+
+    def public_url(self, key: str) -> str:
+        raise NotImplementedError
+
+    def create_signed_upload(self, key: str, content_type: str, size: int, expires_in: int) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def stat(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+
+class SupabaseStorage(StorageBackend):
+    """Supabase Storage bucket (the default)"""
+
+    name = 'supabase'
+
+    def __init__(self, bucket: str):
+        self.bucket = bucket
+
+    @property
+    def _bucket(self):
+        # Import diferido: el cliente exige credenciales al importarse
+        from app.utils.supabase_client import supabase
+        return supabase.storage.from_(self.bucket)
+
+    def upload(self, key: str, path: str, content_type: str) -> None:
+        with open(path, 'rb') as f:
+            # storage3 envía el archivo abierto como multipart leyéndolo por bloques
+            self._bucket.upload(key, f, {'content-type': content_type})
+
+    def public_url(self, key: str) -> str:
+        return self._bucket.get_public_url(key)
+
+    def create_signed_upload(self, key: str, content_type: str, size: int, expires_in: int) -> Dict[str, Any]:
+        # storage3 0.5 no expone las URLs de subida firmadas: se piden a la API REST de Storage.
+        # Supabase fija su validez en 2 horas; expires_in acota el token de finalización
+        import httpx
+        from app.utils.supabase_client import SUPABASE_SERVICE_ROLE_KEY, SUPABASE_URL
+        storage_url = f"{SUPABASE_URL.rstrip('/')}/storage/v1"
+        response = httpx.post(f'{storage_url}/object/upload/sign/{self.bucket}/{key}',
+                              headers={'Authorization': f'Bearer {SUPABASE_SERVICE_ROLE_KEY}',
+                                       'apikey': SUPABASE_SERVICE_ROLE_KEY},
+                              timeout=10)
+        response.raise_for_status()
+        return {'url': storage_url + response.json()['url'], 'method': 'PUT',
+                'headers': {'Content-Type': content_type}}
+
+    def stat(self, key: str) -> Optional[Dict[str, Any]]:
+        for item in self._bucket.list(None, {'search': key, 'limit': 10}):
+            if item.get('name') == key:
+                metadata = item.get('metadata') or {}
+                return {'size': metadata.get('size'), 'content_type': metadata.get('mimetype')}
+        return None
+
+    def delete(self, key: str) -> None:
+        self._bucket.remove([key])
+
+
+class S3Storage(StorageBackend):
+    """
+    S3-compatible bucket (MinIO in development). Files above
+    ``multipart_threshold`` go up as a multipart upload with
+    ``max_concurrency`` parts in flight.
+    """
+
+    name = 's3'
+
+    def __init__(self, bucket: str, endpoint_url: str = None, public_base_url: str = None,
+                 multipart_threshold: int = 8 * 1024 * 1024, max_concurrency: int = 4):
+        if boto3 is None:
+            raise RuntimeError('boto3 is required for STORAGE_BACKEND=s3')
+        self.bucket = bucket
+        self.client = boto3.client('s3', endpoint_url=endpoint_url or None)
+        self.public_base_url = (public_base_url or f"{endpoint_url or 'https://s3.amazonaws.com'}/{bucket}").rstrip('/')
+        self.transfer = TransferConfig(multipart_threshold=multipart_threshold,
+                                       multipart_chunksize=multipart_threshold,
+                                       max_concurrency=max_concurrency)
+
+    def upload(self, key: str, path: str, content_type: str) -> None:
+        self.client.upload_file(path, self.bucket, key, ExtraArgs={'ContentType': content_type},
+                                Config=self.transfer)
+
+    def public_url(self, key: str) -> str:
+        return f'{self.public_base_url}/{key}'
+
+    def create_signed_upload(self, key: str, content_type: str, size: int, expires_in: int) -> Dict[str, Any]:
+        url = self.client.generate_presigned_url(
+            'put_object', ExpiresIn=expires_in,
+            Params={'Bucket': self.bucket, 'Key': key, 'ContentType': content_type})
+        return {'url': url, 'method': 'PUT', 'headers': {'Content-Type': content_type}}
+
+    def stat(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=key)
+        except self.client.exceptions.ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return {'size': head['ContentLength'], 'content_type': head.get('ContentType')}
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+
+class LocalStorage(StorageBackend):
+    """
+    Files in a local folder, served by ``/uploads/<filename>``. For
+    development and tests: no external service needed.
+
+    Signed uploads follow the same contract as the real backends: the URL
+    points at ``PUT /api/musics/storage/<key>`` with a token signed with
+    ``SECRET_KEY`` that fixes the key, content type and maximum size and
+    expires after ``expires_in`` seconds (see ``receive``).
+    """
+
+    name = 'local'
+
+    def __init__(self, directory: str, base_url: str = '', secret_key: str = '', chunk_size: int = 1024 * 1024):
+        self.directory = directory
+        self.base_url = base_url.rstrip('/')
+        self.chunk_size = chunk_size
+        self._signer = URLSafeTimedSerializer(secret_key, salt='local-storage-upload')
+
+    def upload(self, key: str, path: str, content_type: str) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        target = os.path.join(self.directory, key)
+        # Copia a un temporal y rename: nunca se sirve un archivo a medias
+        shutil.copyfile(path, target + '.tmp')
+        os.replace(target + '.tmp', target)
+
+    def public_url(self, key: str) -> str:
+        return f'{self.base_url}/uploads/{key}'
+
+    def create_signed_upload(self, key: str, content_type: str, size: int, expires_in: int) -> Dict[str, Any]:
+        token = self._signer.dumps({'key': key, 'content_type': content_type, 'max_size': size,
+                                    'expires_in': expires_in})
+        return {'url': f'{self.base_url}/api/musics/storage/{key}?token={token}', 'method': 'PUT',
+                'headers': {'Content-Type': content_type}}
+
+    def receive(self, key: str, token: str, content_type: Optional[str], stream: IO[bytes]) -> int:
+        """
+        Body of a signed PUT: checks the token against ``key`` and the
+        Content-Type, then streams at most the signed size to disk. Returns
+        the bytes written; raises PermissionError or ValueError.
+        """
+        try:
+            claims = self._signer.loads(token or '')
+            self._signer.loads(token, max_age=claims['expires_in'])
+        except SignatureExpired:
+            raise PermissionError('Upload URL expired')
+        except (BadSignature, KeyError, TypeError):
+            raise PermissionError('Invalid upload signature')
+        if claims['key'] != key:
+            raise PermissionError('Invalid upload signature')
+        if content_type != claims['content_type']:
+            raise ValueError(f"Content-Type must be {claims['content_type']}")
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in iter(lambda: stream.read(self.chunk_size), b''):
+                    size += len(chunk)
+                    if size > claims['max_size']:
+                        raise ValueError('Body exceeds the signed size')
+                    f.write(chunk)
+            os.replace(temp, os.path.join(self.directory, key))
+        except Exception:
+            os.remove(temp)
+            raise
+        return size
+
+    def stat(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            size = os.path.getsize(os.path.join(self.directory, key))
+        except FileNotFoundError:
+            return None
+        return {'size': size, 'content_type': mimetypes.guess_type(key)[0]}
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(os.path.join(self.directory, key))
+        except FileNotFoundError:
+            pass
+
+
+def create_storage(config: Mapping[str, Any]) -> StorageBackend:
+    """Backend selected by ``STORAGE_BACKEND`` (supabase, s3 or local)"""
+    backend = config.get('STORAGE_BACKEND', 'supabase')
+    if backend == 'local':
+        return LocalStorage(os.path.join(os.getcwd(), config.get('LOCAL_STORAGE_DIR', 'uploads')),
+                            config.get('LOCAL_STORAGE_BASE_URL', ''), config.get('SECRET_KEY', ''))
+    if backend == 's3':
+        return S3Storage(config['S3_BUCKET'], config.get('S3_ENDPOINT_URL'), config.get('S3_PUBLIC_BASE_URL'))
+    if backend == 'supabase':
+        return SupabaseStorage(config.get('SUPABASE_BUCKET', 'musics'))
+    raise ValueError(f'Unknown STORAGE_BACKEND: {backend}')
@@ -0,0 +1,51 @@
+"""
+Streaming of large list responses as a JSON array or NDJSON
+"""
+from typing import Iterable, List, Mapping, Any
+import logging
+
+from flask import Response, request, stream_with_context
+
+from app.utils.json_provider import rows_to_json, rows_to_ndjson
+
+logger = logging.getLogger("streaming")
+
+JSON = 'application/json'
+NDJSON = 'application/x-ndjson'
+
+
+def wants_ndjson() -> bool:
+    """True when the client prefers NDJSON (``Accept: application/x-ndjson``)"""
+    return request.accept_mimetypes.best_match([JSON, NDJSON]) == NDJSON
+
+
+def stream_batches(batches: Iterable[List[Mapping[str, Any]]]) -> Response:
+    """
+    Stream batches of rows (e.g. the partitions of a ``yield_per`` result)
+    as a JSON array or, if the client asked for it, as NDJSON. Each batch is
+    encoded and sent on its own, so memory doesn't grow with the result. An
+    error after the first byte cuts the body short (invalid JSON array).
+    """
+    ndjson = wants_ndjson()
+
+    def generate():
+        sent = 0
+        try:
+            if not ndjson:
+                yield b'['
+            for rows in batches:
+                if ndjson:
+                    yield rows_to_ndjson(rows)
+                else:
+                    # Cada lote se codifica como array y se le quitan los corchetes
+                    yield (b',' if sent else b'') + rows_to_json(rows)[1:-1]
+                sent += len(rows)
+            if not ndjson:
+                yield b']'
+        except Exception as e:
+            logger.error(f"Error streaming {request.path} after {sent} rows: {str(e)}")
+
+    response = Response(stream_with_context(generate()), mimetype=NDJSON if ndjson else JSON)
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx: enviar cada lote sin esperar
+    response.vary.add('Accept')
+    return response
@@ -0,0 +1,183 @@
+"""
+Spooled, bounded background uploads to the storage backend
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+
+from flask import Flask, request
+from werkzeug.datastructures import FileStorage
+
+from app.utils.storage import StorageBackend, create_storage
+
+logger = logging.getLogger(__name__)
+
+JOB_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class UploadRejected(Exception):
+    """Upload that can't be accepted, with the HTTP status to answer"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class UploadQueue:
+    """
+    Accepts an upload by copying it in chunks to a spool file on disk and
+    answers right away; a pool of ``workers`` threads streams spooled files
+    to the storage backend. At most ``max_pending`` uploads are spooled or
+    in flight per process: beyond that new ones get 503 + Retry-After
+    instead of piling up on disk and in the storage connection pool.
+
+    Job status lives in ``<job_id>.json`` next to the spool files, so any
+    worker process on the host can answer the status endpoint. Statuses
+    older than ``job_ttl`` seconds, and spool files a dead process left
+    behind, are removed on startup and as new uploads arrive.
+    """
+
+    def __init__(self) -> None:
+        self.storage: Optional[StorageBackend] = None
+        self.spool_dir: Optional[str] = None
+        self.max_size = 50 * 1024 * 1024
+        self.chunk_size = 1024 * 1024
+        self.job_ttl = 3600
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[threading.BoundedSemaphore] = None
+        self._last_sweep = 0.0
+
+    def init_app(self, app: Flask) -> None:
+        self.storage = create_storage(app.config)
+        self.spool_dir = app.config.get('UPLOAD_SPOOL_DIR') or os.path.join(tempfile.gettempdir(), 'musics-uploads')
+        self.max_size = app.config.get('UPLOAD_MAX_SIZE', self.max_size)
+        self.job_ttl = app.config.get('UPLOAD_JOB_TTL', self.job_ttl)
+        workers = app.config.get('UPLOAD_WORKERS', 4)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='upload')
+        self._slots = threading.BoundedSemaphore(app.config.get('UPLOAD_MAX_PENDING', 4 * workers))
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.sweep()
+
+    def accept(self, file: FileStorage, key: str) -> Dict[str, Any]:
+        """Spool ``file`` and queue it for upload as ``key``; returns the new job"""
+        if not self._slots.acquire(blocking=False):
+            raise UploadRejected('Too many uploads in progress, retry later', 503)
+        try:
+            path, size = self._spool(file)
+        except Exception:
+            self._slots.release()
+            raise
+
+        url = self.storage.public_url(key)
+        if url.startswith('/'):
+            url = request.host_url.rstrip('/') + url  # almacenamiento local sin LOCAL_STORAGE_BASE_URL
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': 'processing',
+            'filename': key,
+            'original_filename': file.filename,
+            'content_type': file.mimetype or 'application/octet-stream',
+            'file_size': size,
+            'url': url,
+            'storage': self.storage.name,
+            'created_at': time.time()
+        }
+        try:
+            self._write(job)
+            # El worker trabaja sobre su copia: la respuesta 202 lleva el estado inicial
+            self.executor.submit(self._run, dict(job), path)
+        except Exception:
+            os.remove(path)
+            self._slots.release()
+            raise
+        self._maybe_sweep()
+        return job
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not JOB_ID.match(job_id):
+            return None
+        try:
+            with open(self._job_path(job_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _spool(self, file: FileStorage):
+        fd, path = tempfile.mkstemp(dir=self.spool_dir, suffix='.part')
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as spool:
+                for chunk in iter(lambda: file.stream.read(self.chunk_size), b''):
+                    size += len(chunk)
+                    if size > self.max_size:
+                        raise UploadRejected(f'File too large (max {self.max_size // (1024 * 1024)}MB)', 413)
+                    spool.write(chunk)
+        except Exception:
+            os.remove(path)
+            raise
+        return path, size
+
+    def _run(self, job: Dict[str, Any], path: str) -> None:
+        from app.metrics_middleware import (record_audio_processing_time, record_failed_upload,
+                                            record_music_upload, record_supabase_request)
+        file_format = job['filename'].rsplit('.', 1)[-1]
+        started = time.perf_counter()
+        try:
+            self.storage.upload(job['filename'], path, job['content_type'])
+            job['status'] = 'completed'
+            record_music_upload(True, file_format, job['file_size'])
+        except Exception as e:
+            logger.error(f"Upload to {self.storage.name} failed for {job['filename']}: {str(e)}")
+            job['status'] = 'failed'
+            job['error'] = str(e)
+            record_music_upload(False, file_format)
+            record_failed_upload('storage_error')
+        finally:
+            job['completed_at'] = time.time()
+            if self.storage.name == 'supabase':
+                record_supabase_request('upload', job['status'] == 'completed')
+            record_audio_processing_time(time.perf_counter() - started, 'upload')
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._write(job)
+            self._slots.release()
+
+    def _job_path(self, job_id: str) -> str:
+        return os.path.join(self.spool_dir, f'{job_id}.json')
+
+    def _write(self, job: Dict[str, Any]) -> None:
+        temp = self._job_path(job['id']) + '.tmp'
+        with open(temp, 'w') as f:
+            json.dump(job, f)
+        os.replace(temp, self._job_path(job['id']))
+
+    def _maybe_sweep(self) -> None:
+        if time.time() - self._last_sweep > min(self.job_ttl, 600):
+            self.sweep()
+
+    def sweep(self) -> int:
+        """Remove expired job statuses and abandoned spool files; returns how many"""
+        self._last_sweep = time.time()
+        cutoff = self._last_sweep - self.job_ttl
+        removed = 0
+        for name in os.listdir(self.spool_dir):
+            path = os.path.join(self.spool_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+upload_queue = UploadQueue()
@@ -5,6 +5,7 @@ from flask import Flask, jsonify, g, request, make_response
 from flask_cors import CORS
 from flask_socketio import SocketIO
 from app.config import get_config
+from app.core.json_provider import FastJSONProvider
 
 import logging
 
@@ -22,12 +23,18 @@ def create_app(config_name=None):
     """Create and configure the Flask application instance"""
 
     app = Flask(__name__)
+    # JSON con orjson (mismo formato que el proveedor por defecto de Flask)
+    app.json = FastJSONProvider(app)
 
     # Cargar configuración
     config = get_config()
     app.config.from_object(config)
     config.init_app(app)
 
+    # Compresión gzip/brotli negociada (se registra primero: corre después del resto de after_request)
+    from app.core.compression import response_compressor
+    response_compressor.init_app(app)
+
     # CORS origins
     cors_origins = [
         'http://localhost:4200',
@@ -70,11 +77,17 @@ def create_app(config_name=None):
             response.headers['Access-Control-Allow-Credentials'] = 'true'
         return response
 
-    # Configurar SocketIO
+    # Configurar SocketIO (JSON por defecto, MessagePack negociado por cliente)
+    from app.core.socket_serializer import (
+        AdaptivePacket, NegotiatingManager, install_negotiated_serializer
+    )
     socketio.init_app(app,
                       cors_allowed_origins=cors_origins,
                       logger=False,
-                      engineio_logger=False)
+                      engineio_logger=False,
+                      serializer=AdaptivePacket,
+                      client_manager=NegotiatingManager(allow_msgpack=config.CHAT_SOCKET_MSGPACK))
+    install_negotiated_serializer(socketio)
 
     # ...resto del código...
 
@@ -92,7 +105,9 @@ def create_app(config_name=None):
     # Register WebSocket event handlers
     from app.controllers.websocket_controller import (
         handle_connect, handle_disconnect, handle_join_room, handle_leave_room,
-        handle_send_message, handle_get_message_history, handle_typing, handle_get_connected_users
+        handle_send_message, handle_get_message_history, handle_typing, handle_get_connected_users,
+        handle_get_unread, handle_mark_read, handle_clock_sync, handle_party_start,
+        handle_party_control, handle_party_stop, handle_party_state
     )
 
     socketio.on_event('connect', handle_connect)
@@ -103,6 +118,21 @@ def create_app(config_name=None):
     socketio.on_event('get_message_history', handle_get_message_history)
     socketio.on_event('typing', handle_typing)
     socketio.on_event('get_connected_users', handle_get_connected_users)
+    socketio.on_event('get_unread', handle_get_unread)
+    socketio.on_event('mark_read', handle_mark_read)
+    socketio.on_event('clock_sync', handle_clock_sync)
+    socketio.on_event('party_start', handle_party_start)
+    socketio.on_event('party_control', handle_party_control)
+    socketio.on_event('party_stop', handle_party_stop)
+    socketio.on_event('party_state', handle_party_state)
+
+    # Modo sharding: vigilar peers y rebalancear salas
+    from app.services.room_sharding import room_sharding
+    room_sharding.start()
+
+    # Particiones de chat_messages: crear meses futuros y aplicar retención
+    from app.services.partition_maintenance import partition_maintenance
+    partition_maintenance.start()
 
     # ✅ Error handlers simplificados
     setup_basic_error_handlers(app)
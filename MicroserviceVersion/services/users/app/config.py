@@ -13,6 +13,68 @@ class Config:
     SUPABASE_ANON_KEY = os.getenv('SUPABASE_ANON_KEY')
     SUPABASE_SERVICE_ROLE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
     SUPABASE_JWT_SECRET = os.getenv('SUPABASE_JWT_SECRET')
+
+    # Timeouts y circuit breaker para llamadas a Supabase (segundos)
+    SUPABASE_HTTP_TIMEOUT = float(os.getenv('SUPABASE_HTTP_TIMEOUT', '10'))
+    SUPABASE_READ_TIMEOUT = float(os.getenv('SUPABASE_READ_TIMEOUT', '3'))
+    SUPABASE_WRITE_TIMEOUT = float(os.getenv('SUPABASE_WRITE_TIMEOUT', '5'))
+    SUPABASE_MAX_CONCURRENT_CALLS = int(os.getenv('SUPABASE_MAX_CONCURRENT_CALLS', '8'))
+    SUPABASE_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('SUPABASE_CIRCUIT_FAILURE_THRESHOLD', '5'))
+    SUPABASE_CIRCUIT_RESET_TIMEOUT = float(os.getenv('SUPABASE_CIRCUIT_RESET_TIMEOUT', '30'))
+
+    # Backend de almacenamiento del chat: 'supabase' (PostgREST) o 'sql' (Postgres/SQLite directo)
+    CHAT_STORE_BACKEND = os.getenv('CHAT_STORE_BACKEND', 'supabase')
+    CHAT_DATABASE_URL = os.getenv('CHAT_DATABASE_URL')
+    CHAT_DB_POOL_SIZE = int(os.getenv('CHAT_DB_POOL_SIZE', '5'))
+    CHAT_DB_MAX_OVERFLOW = int(os.getenv('CHAT_DB_MAX_OVERFLOW', '10'))
+    CHAT_DB_POOL_TIMEOUT = float(os.getenv('CHAT_DB_POOL_TIMEOUT', '5'))
+    CHAT_DB_STATEMENT_TIMEOUT_MS = int(os.getenv('CHAT_DB_STATEMENT_TIMEOUT_MS', '5000'))
+    CHAT_DB_CREATE_TABLES = os.getenv('CHAT_DB_CREATE_TABLES', 'false').lower() == 'true'
+
+    # Pipeline de persistencia de mensajes fuera de los handlers de Socket.IO
+    CHAT_PERSIST_WORKERS = int(os.getenv('CHAT_PERSIST_WORKERS', '4'))
+    CHAT_PERSIST_MAX_QUEUE = int(os.getenv('CHAT_PERSIST_MAX_QUEUE', '1000'))
+
+    # Control de flujo por conexión (profundidad de la cola de salida de Engine.IO)
+    CHAT_SOCKET_TYPING_DROP_DEPTH = int(os.getenv('CHAT_SOCKET_TYPING_DROP_DEPTH', '16'))
+    CHAT_SOCKET_COALESCE_DEPTH = int(os.getenv('CHAT_SOCKET_COALESCE_DEPTH', '64'))
+    CHAT_SOCKET_DISCONNECT_DEPTH = int(os.getenv('CHAT_SOCKET_DISCONNECT_DEPTH', '256'))
+    CHAT_SOCKET_MAX_COALESCED = int(os.getenv('CHAT_SOCKET_MAX_COALESCED', '200'))
+    CHAT_DELIVERY_ACK_MODE = os.getenv('CHAT_DELIVERY_ACK_MODE', 'false').lower() == 'true'
+    CHAT_DELIVERY_ACK_WINDOW = int(os.getenv('CHAT_DELIVERY_ACK_WINDOW', '32'))
+    CHAT_BATCH_WINDOW_MS = int(os.getenv('CHAT_BATCH_WINDOW_MS', '15'))
+    CHAT_BATCH_MAX_SIZE = int(os.getenv('CHAT_BATCH_MAX_SIZE', '100'))
+    CHAT_SOCKET_MSGPACK = os.getenv('CHAT_SOCKET_MSGPACK', 'true').lower() == 'true'
+
+    # Sharding de salas por hashing consistente (una sala vive en un solo worker)
+    CHAT_SHARDING_ENABLED = os.getenv('CHAT_SHARDING_ENABLED', 'false').lower() == 'true'
+    CHAT_WORKER_ID = os.getenv('CHAT_WORKER_ID')
+    CHAT_SHARD_WORKERS = os.getenv('CHAT_SHARD_WORKERS', '')
+    CHAT_SHARD_VNODES = int(os.getenv('CHAT_SHARD_VNODES', '100'))
+    CHAT_SHARD_HEALTH_INTERVAL = float(os.getenv('CHAT_SHARD_HEALTH_INTERVAL', '5'))
+    CHAT_SHARD_FAILURE_THRESHOLD = int(os.getenv('CHAT_SHARD_FAILURE_THRESHOLD', '2'))
+    CHAT_SHARD_HANDOFF_GRACE = float(os.getenv('CHAT_SHARD_HANDOFF_GRACE', '10'))
+
+    # Contadores de no leídos: cada cuántos segundos se persisten
+    CHAT_UNREAD_FLUSH_INTERVAL = float(os.getenv('CHAT_UNREAD_FLUSH_INTERVAL', '5'))
+
+    # Particiones mensuales de chat_messages y retención (0 meses = conservar todo)
+    CHAT_PARTITION_MONTHS_AHEAD = int(os.getenv('CHAT_PARTITION_MONTHS_AHEAD', '2'))
+    CHAT_PARTITION_MAINTENANCE_INTERVAL = float(os.getenv('CHAT_PARTITION_MAINTENANCE_INTERVAL', '21600'))
+    CHAT_RETENTION_MONTHS = int(os.getenv('CHAT_RETENTION_MONTHS', '0'))
+    CHAT_RETENTION_MODE = os.getenv('CHAT_RETENTION_MODE', 'drop').lower()  # drop | archive
+
+    # Listening parties: segundos entre ticks de corrección de deriva
+    CHAT_PARTY_TICK_INTERVAL = float(os.getenv('CHAT_PARTY_TICK_INTERVAL', '1'))
+
+    # Cache stale-while-revalidate para lecturas del chat (segundos)
+    CHAT_CACHE_TTL = float(os.getenv('CHAT_CACHE_TTL', '5'))
+    CHAT_CACHE_STALE_TTL = float(os.getenv('CHAT_CACHE_STALE_TTL', '60'))
+
+    # Compresión gzip/brotli de respuestas: tamaño mínimo (bytes), nivel gzip y calidad brotli
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+    COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '4'))
     
     # ✅ Configuración de logging simplificada
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'WARNING')  # WARNING por defecto para práctica
@@ -13,7 +13,8 @@ from app.exceptions.chat_exceptions import (
     MessageValidationException,
     MessageNotFoundException,
     UnauthorizedMessageException,
-    ChatServiceException
+    ChatServiceException,
+    ChatStorageUnavailableException
 )
 import functools
 import logging
@@ -67,6 +68,19 @@ def handle_chat_response(func):
                 "request_id": request_id
             }), 403
 
+        except ChatStorageUnavailableException as e:
+            logger.warning(f"Chat storage unavailable in {func.__name__}: {str(e)}", extra={
+                'custom_request_id': request_id
+            })
+            response = jsonify({
+                "error": "Chat storage unavailable",
+                "message": str(e),
+                "request_id": request_id
+            })
+            if e.retry_after:
+                response.headers['Retry-After'] = str(e.retry_after)
+            return response, 503
+
         except ChatServiceException as e:
             logger.error(f"Chat service error in {func.__name__}: {str(e)}", extra={
                 'custom_request_id': request_id
@@ -100,6 +114,15 @@ def handle_chat_response(func):
     return wrapper
 
 
+@chat_bp.after_request
+def add_cache_status_headers(response):
+    """Marcar respuestas servidas desde cache obsoleta mientras se revalida"""
+    if getattr(g, 'chat_cache_stale', False):
+        response.headers['X-Cache-Status'] = 'STALE'
+        response.headers['Warning'] = '110 - "Response is Stale"'
+    return response
+
+
 @chat_bp.route('/messages', methods=['POST'])
 @handle_chat_response
 def send_message():
@@ -165,11 +188,16 @@ def get_message_history():
     room = request.args.get('room', 'general')
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
+    before = request.args.get('before')
 
     if per_page > 50:
         per_page = 50  # Cap at 50 messages per page
 
-    history = chat_service.get_message_history(room, page, per_page)
+    if before is not None or request.args.get('pagination') == 'keyset':
+        # Paginación keyset: ?before=<next_cursor> evita COUNT y OFFSET
+        history = chat_service.get_messages_before(room, before or None, per_page)
+    else:
+        history = chat_service.get_message_history(room, page, per_page)
 
     return jsonify({
         **history.dict(),
@@ -245,6 +273,123 @@ def get_room_statistics(room_name):
     }), 200
 
 
+@chat_bp.route('/rooms/<room_name>/search', methods=['GET'])
+@handle_chat_response
+def search_room_messages(room_name):
+    """Full-text search in a room: ?q=<text>&limit=20&cursor=<next_cursor>"""
+    request_id = getattr(g, 'request_id', 'unknown')
+
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 50)
+    result = chat_service.search_messages(
+        room_name, request.args.get('q', ''), request.args.get('cursor') or None, limit
+    )
+
+    return jsonify({
+        **result.dict(),
+        "request_id": request_id
+    }), 200
+
+
+@chat_bp.route('/unread', methods=['GET'])
+@handle_chat_response
+def get_unread_counts():
+    """Get unread message counts per room for a user"""
+    request_id = getattr(g, 'request_id', 'unknown')
+
+    user_id = request.args.get('user_id')
+    if not user_id:
+        raise ValueError("user_id query parameter is required")
+
+    unread = chat_service.get_unread_counts(user_id)
+
+    return jsonify({
+        **unread.dict(),
+        "request_id": request_id
+    }), 200
+
+
+@chat_bp.route('/rooms/<room_name>/read', methods=['POST'])
+@handle_chat_response
+def mark_room_read(room_name):
+    """Mark all messages of a room as read by a user"""
+    request_id = getattr(g, 'request_id', 'unknown')
+
+    data = request.get_json(silent=True) or {}
+    user_id = data.get('user_id')
+    if not user_id:
+        raise ValueError("user_id is required")
+
+    last_read_seq = chat_service.mark_room_read(user_id, room_name)
+
+    return jsonify({
+        "user_id": str(user_id),
+        "room": room_name,
+        "last_read_seq": last_read_seq,
+        "unread": 0,
+        "request_id": request_id
+    }), 200
+
+
+@chat_bp.route('/rooms/<room_name>/owner', methods=['GET'])
+def get_room_owner(room_name):
+    """Worker that owns a room when room sharding is enabled"""
+    from app.services.room_sharding import room_sharding
+
+    return jsonify({
+        **room_sharding.owner(room_name),
+        "sharding_enabled": room_sharding.enabled,
+        "request_id": getattr(g, 'request_id', 'unknown')
+    }), 200
+
+
+@chat_bp.route('/shards', methods=['GET'])
+def get_shard_status():
+    """Shard ring as seen by this worker (also polled by peers)"""
+    from app.services.room_sharding import room_sharding
+
+    return jsonify(room_sharding.status_info()), 200
+
+
+@chat_bp.route('/shards/drain', methods=['POST'])
+def drain_shard():
+    """Take this worker out of the ring before shutting it down (local calls only)"""
+    from app.services.room_sharding import room_sharding
+
+    if request.remote_addr not in ('127.0.0.1', '::1'):
+        return jsonify({"error": "Forbidden"}), 403
+
+    room_sharding.drain()
+    return jsonify(room_sharding.status_info()), 202
+
+
+@chat_bp.route('/partitions', methods=['GET'])
+def get_partition_report():
+    """Partitions touched by a room's recent/keyset query (local calls only)"""
+    from app.repositories.chat_store import get_chat_store
+
+    if request.remote_addr not in ('127.0.0.1', '::1'):
+        return jsonify({"error": "Forbidden"}), 403
+
+    room_name = request.args.get('room', 'general')
+    limit = request.args.get('limit', 50, type=int)
+    report = get_chat_store().explain_recent(room_name, limit, request.args.get('before'))
+    if report is None:
+        return jsonify({"error": "Chat store is not a partitioned Postgres table"}), 404
+    return jsonify(report), 200
+
+
+@chat_bp.route('/socket-config', methods=['GET'])
+def get_socket_config():
+    """Socket.IO serializers a client may negotiate before connecting"""
+    from app import socketio
+    from app.core.socket_serializer import socket_config
+
+    return jsonify({
+        **socket_config(socketio.server.manager),
+        "request_id": getattr(g, 'request_id', 'unknown')
+    }), 200
+
+
 @chat_bp.route('/debug', methods=['GET'])
 @handle_chat_response
 def debug_chat():
@@ -4,7 +4,14 @@ WebSocket event handlers for chat functionality
 from flask import request
 from flask_socketio import emit, join_room, leave_room
 from app.services.chat_service import ChatService
-from app.core.supabase import get_supabase_admin
+from app.services.message_pipeline import message_pipeline
+from app.services.room_delivery import room_delivery
+from app.services.room_batcher import room_batcher
+from app.services.room_sharding import room_sharding
+from app.services.listening_party import listening_party, server_time_ms
+from app.schemas.chat_schema import ChatMessageCreate
+from app.exceptions.chat_exceptions import ChatStorageUnavailableException
+from app.metrics_middleware import timed_socket_handler
 import logging
 
 logger = logging.getLogger("websocket_controller")
@@ -22,6 +29,7 @@ def handle_connect():
         logger.error(f'❌ Error in connect handler: {str(e)}')
 
 
+@timed_socket_handler('disconnect')
 def handle_disconnect():
     """Handle client disconnection"""
     try:
@@ -32,6 +40,8 @@ def handle_disconnect():
                 user_to_remove = user_id
                 break
 
+        room_delivery.forget(request.sid)
+
         if user_to_remove:
             del connected_users[user_to_remove]
             emit('user_disconnected', {
@@ -43,6 +53,7 @@ def handle_disconnect():
         logger.error(f'❌ Error in disconnect handler: {str(e)}')
 
 
+@timed_socket_handler('join_room')
 def handle_join_room(data):
     """Handle user joining a chat room"""
     try:
@@ -54,18 +65,39 @@ def handle_join_room(data):
             emit('error', {'message': 'User ID is required'})
             return
 
+        # En modo sharding solo el worker dueño de la sala la aloja
+        redirect = room_sharding.redirect_for(room)
+        if redirect:
+            emit('room_redirect', redirect)
+            return {'status': 'redirect', **redirect}
+
         # Join the room
         join_room(room)
+        room_sharding.note_join(room)
         connected_users[user_id] = request.sid
 
         # Get recent messages for the room
         chat_service = ChatService()
-        recent_messages = chat_service.get_recent_messages(room)
+        try:
+            recent_messages = chat_service.get_recent_messages(room)
+        except ChatStorageUnavailableException as e:
+            # Se entra a la sala igualmente; el historial llega con get_message_history
+            logger.warning(f'Recent messages unavailable for room {room}: {str(e)}')
+            recent_messages = []
+        try:
+            chat_service.mark_room_read(user_id, room)
+        except Exception as e:
+            logger.warning(f'Could not mark room {room} as read for {user_id}: {str(e)}')
 
         # Send recent messages to the user
         emit('recent_messages', {'messages': [
              msg.dict() for msg in recent_messages]})
 
+        # Sincronizar al recién llegado con la listening party en curso
+        party = listening_party.state(room)
+        if party:
+            emit('party_state', party)
+
         # Notify others in the room
         emit('user_joined', {
             'user_id': user_id,
@@ -80,6 +112,7 @@ def handle_join_room(data):
         emit('error', {'message': 'Failed to join room'})
 
 
+@timed_socket_handler('leave_room')
 def handle_leave_room(data):
     """Handle user leaving a chat room"""
     try:
@@ -102,9 +135,18 @@ def handle_leave_room(data):
         emit('error', {'message': 'Failed to leave room'})
 
 
+@timed_socket_handler('send_message')
 def handle_send_message(data):
-    """Handle sending a chat message"""
+    """
+    Handle sending a chat message.
+
+    Validates and enqueues the message, then returns immediately. The return
+    value is delivered as the client's ack callback; persistence runs on the
+    message pipeline and the broadcast follows completion.
+    """
+    client_id = None
     try:
+        client_id = data.get('client_id')
         user_id = data.get('user_id')
         message_text = data.get('message', '').strip()
         room = data.get('room', 'general')
@@ -112,10 +154,15 @@ def handle_send_message(data):
 
         if not user_id or not message_text:
             emit('error', {'message': 'User ID and message are required'})
-            return
+            return {'status': 'error', 'client_id': client_id,
+                    'message': 'User ID and message are required'}
+
+        redirect = room_sharding.redirect_for(room)
+        if redirect:
+            emit('room_redirect', redirect)
+            return {'status': 'redirect', 'client_id': client_id, **redirect}
 
         # Create message data
-        from app.schemas.chat_schema import ChatMessageCreate
         message_data = ChatMessageCreate(
             user_id=user_id,
             username=username,
@@ -123,25 +170,53 @@ def handle_send_message(data):
             room=room
         )
 
-        # Save message using ChatService
-        chat_service = ChatService()
-        saved_message = chat_service.save_message(message_data)
+        sid = request.sid
+        accepted = message_pipeline.submit(
+            message_data,
+            on_success=lambda saved: _broadcast_saved_message(saved, sid, client_id),
+            on_error=lambda error: _notify_persist_failure(sid, client_id)
+        )
 
-        if not saved_message:
-            emit('error', {'message': 'Failed to save message'})
-            return
+        if not accepted:
+            emit('error', {'message': 'Chat is busy, please retry'})
+            return {'status': 'rejected', 'client_id': client_id,
+                    'message': 'Chat is busy, please retry'}
 
-        # Broadcast message to all users in the room
-        message_data_dict = saved_message.dict()
-        emit('new_message', message_data_dict, room=room)
-        logger.info(
-            f'💬 Message sent in room {room} by {username}: {message_text}')
+        return {'status': 'queued', 'client_id': client_id}
 
     except Exception as e:
         logger.error(f'❌ Error sending message: {str(e)}')
         emit('error', {'message': 'Failed to send message'})
+        return {'status': 'error', 'client_id': client_id,
+                'message': 'Failed to send message'}
+
+
+def _broadcast_saved_message(saved_message, sid, client_id):
+    """Broadcast a persisted message to its room and confirm it to the sender"""
+    from app import socketio
 
+    # Timestamp en ISO: el codificador JSON de Socket.IO no serializa datetime
+    message_data_dict = saved_message.model_dump(mode='json')
+    room_batcher.add(saved_message.room, message_data_dict)
+    socketio.emit('message_ack', {
+        'status': 'saved',
+        'client_id': client_id,
+        'id': saved_message.id,
+        'timestamp': message_data_dict['timestamp']
+    }, to=sid)
+    logger.info(
+        f'💬 Message sent in room {saved_message.room} by {saved_message.username}')
 
+
+def _notify_persist_failure(sid, client_id):
+    """Tell the sender that its queued message could not be stored"""
+    from app import socketio
+
+    socketio.emit('message_ack', {'status': 'failed', 'client_id': client_id}, to=sid)
+    socketio.emit('error', {'message': 'Failed to save message'}, to=sid)
+
+
+@timed_socket_handler('get_message_history')
 def handle_get_message_history(data):
     """Handle request for message history"""
     try:
@@ -158,6 +233,42 @@ def handle_get_message_history(data):
         emit('error', {'message': 'Failed to get message history'})
 
 
+@timed_socket_handler('get_unread')
+def handle_get_unread(data):
+    """Handle request for the user's unread counts across rooms"""
+    try:
+        user_id = data.get('user_id')
+        if not user_id:
+            emit('error', {'message': 'User ID is required'})
+            return
+
+        unread = ChatService().get_unread_counts(user_id)
+        emit('unread_counts', unread.dict())
+
+    except Exception as e:
+        logger.error(f'Error getting unread counts: {str(e)}')
+        emit('error', {'message': 'Failed to get unread counts'})
+
+
+@timed_socket_handler('mark_read')
+def handle_mark_read(data):
+    """Handle a client marking a room as read"""
+    try:
+        user_id = data.get('user_id')
+        room = data.get('room', 'general')
+        if not user_id:
+            emit('error', {'message': 'User ID is required'})
+            return
+
+        last_read_seq = ChatService().mark_room_read(user_id, room)
+        return {'room': room, 'last_read_seq': last_read_seq, 'unread': 0}
+
+    except Exception as e:
+        logger.error(f'Error marking room as read: {str(e)}')
+        emit('error', {'message': 'Failed to mark room as read'})
+
+
+@timed_socket_handler('typing')
 def handle_typing(data):
     """Handle typing indicator"""
     try:
@@ -166,16 +277,20 @@ def handle_typing(data):
         username = data.get('username', f'User_{user_id}')
         is_typing = data.get('is_typing', False)
 
-        emit('user_typing', {
+        if not room_sharding.is_local(room):
+            return
+
+        room_delivery.broadcast_typing(room, {
             'user_id': user_id,
             'username': username,
             'is_typing': is_typing
-        }, room=room, include_self=False)
+        }, exclude_sid=request.sid)
 
     except Exception as e:
         logger.error(f'❌ Error in typing handler: {str(e)}')
 
 
+@timed_socket_handler('get_connected_users')
 def handle_get_connected_users(data):
     """Handle request for connected users"""
     try:
@@ -199,3 +314,97 @@ def handle_get_connected_users(data):
     except Exception as e:
         logger.error(f'❌ Error getting connected users: {str(e)}')
         emit('error', {'message': 'Failed to get connected users'})
+
+
+# ---------------------------------------------------------------------------
+# Listening parties
+# ---------------------------------------------------------------------------
+
+def handle_clock_sync(data):
+    """NTP-style clock handshake; replies through the ack with (t0, t1, t2)"""
+    received_at = server_time_ms()
+    t0 = (data or {}).get('t0')
+    return listening_party.clock_sync(t0, received_at)
+
+
+@timed_socket_handler('party_start')
+def handle_party_start(data):
+    """Start (or restart) a synchronized playback session in a room"""
+    try:
+        room = data.get('room', 'general')
+        user_id = data.get('user_id')
+        if not user_id:
+            emit('error', {'message': 'User ID is required'})
+            return
+
+        redirect = room_sharding.redirect_for(room)
+        if redirect:
+            emit('room_redirect', redirect)
+            return {'status': 'redirect', **redirect}
+
+        state = listening_party.start(
+            room, user_id, data.get('song_id'),
+            position_ms=data.get('position_ms', 0),
+            rate=data.get('rate', 1.0),
+            paused=data.get('paused', False)
+        )
+        emit('party_state', state, to=room)
+        return {'status': 'ok', 'state': state}
+
+    except (ValueError, PermissionError) as e:
+        emit('error', {'message': str(e)})
+        return {'status': 'error', 'message': str(e)}
+    except Exception as e:
+        logger.error(f'❌ Error starting listening party: {str(e)}')
+        emit('error', {'message': 'Failed to start listening party'})
+
+
+@timed_socket_handler('party_control')
+def handle_party_control(data):
+    """Host playback command: play, pause, seek, rate, song or host"""
+    try:
+        room = data.get('room', 'general')
+        if not room_sharding.is_local(room):
+            emit('room_redirect', room_sharding.owner(room))
+            return
+
+        state = listening_party.control(room, data.get('user_id'), data.get('action'), data)
+        emit('party_state', state, to=room)
+        return {'status': 'ok', 'state': state}
+
+    except (ValueError, PermissionError) as e:
+        emit('error', {'message': str(e)})
+        return {'status': 'error', 'message': str(e)}
+    except Exception as e:
+        logger.error(f'❌ Error in party_control: {str(e)}')
+        emit('error', {'message': 'Failed to update listening party'})
+
+
+@timed_socket_handler('party_stop')
+def handle_party_stop(data):
+    """End the listening party of a room (host only)"""
+    try:
+        room = data.get('room', 'general')
+        user_id = data.get('user_id')
+        if not user_id:
+            emit('error', {'message': 'User ID is required'})
+            return
+
+        if listening_party.stop(room, user_id):
+            emit('party_ended', {'room': room}, to=room)
+        return {'status': 'ok'}
+
+    except PermissionError as e:
+        emit('error', {'message': str(e)})
+        return {'status': 'error', 'message': str(e)}
+    except Exception as e:
+        logger.error(f'❌ Error in party_stop: {str(e)}')
+        emit('error', {'message': 'Failed to stop listening party'})
+
+
+def handle_party_state(data):
+    """Current playback state of a room (also returned through the ack)"""
+    room = (data or {}).get('room', 'general')
+    state = listening_party.state(room)
+    emit('party_state', state or {'room': room, 'active': False})
+    return state
@@ -0,0 +1,100 @@
+"""
+Negotiated gzip/brotli compression of JSON responses
+"""
+from typing import Iterable, Iterator, List
+import gzip
+import zlib
+
+from flask import Flask, Response, request
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se negocia gzip
+    brotli = None
+
+COMPRESSIBLE_TYPES = {'application/json', 'application/x-ndjson', 'text/plain', 'text/html'}
+
+
+def available_encodings() -> List[str]:
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+class ResponseCompressor:
+    """
+    Compresses response bodies of a compressible type and at least
+    ``min_size`` bytes with the best coding the client accepts (``br``
+    first). Streamed responses are compressed chunk by chunk with a sync
+    flush, so each batch is still sent as soon as it is produced. Files,
+    partial content and already encoded bodies are left alone. A strong
+    ETag becomes weak, since the bytes differ from the identity body.
+    """
+
+    def __init__(self, min_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def init_app(self, app: Flask) -> None:
+        self.min_size = app.config.get('COMPRESSION_MIN_SIZE', self.min_size)
+        self.gzip_level = app.config.get('COMPRESSION_GZIP_LEVEL', self.gzip_level)
+        self.brotli_quality = app.config.get('COMPRESSION_BROTLI_QUALITY', self.brotli_quality)
+        app.after_request(self.after_request)
+
+    def after_request(self, response: Response) -> Response:
+        if response.mimetype not in COMPRESSIBLE_TYPES or response.direct_passthrough:
+            return response
+        response.vary.add('Accept-Encoding')
+
+        if (request.method == 'HEAD' or response.status_code < 200
+                or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        offered = available_encodings()
+        encoding = request.accept_encodings.best_match(offered)
+        if encoding not in offered:
+            return response
+
+        if response.is_streamed:
+            response.response = self._compress_stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            response.set_data(self.compress(data, encoding))
+
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def compress(self, data: bytes, encoding: str) -> bytes:
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+
+    def _compress_stream(self, chunks: Iterable, encoding: str) -> Iterator[bytes]:
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            compress, flush, finish = compressor.process, compressor.flush, compressor.finish
+        else:
+            compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            compress, finish = compressor.compress, compressor.flush
+            flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)  # noqa: E731
+
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                if chunk:
+                    yield compress(chunk) + flush()
+            yield finish()
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+
+
+response_compressor = ResponseCompressor()
@@ -0,0 +1,52 @@
+"""
+JSON encoding backed by orjson, with the stdlib ``json`` module as fallback.
+
+``FastJSONProvider`` replaces Flask's default provider (``app.json``), so
+``jsonify`` encodes with orjson while producing the same documents as
+before: sorted keys, HTTP dates for ``datetime`` values and the same
+handling of ``Decimal``, ``UUID`` and dataclasses.
+"""
+from typing import Any
+
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el módulo json estándar
+    orjson = None
+
+
+def orjson_available() -> bool:
+    return orjson is not None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider using orjson when it is installed"""
+
+    def _options(self) -> int:
+        # Los datetime pasan por default() para mantener el formato HTTP de Flask
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default,
+                            option=self._options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
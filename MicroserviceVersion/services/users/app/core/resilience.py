@@ -0,0 +1,244 @@
+"""
+Resilience helpers for chat storage calls (Supabase or direct SQL): timeouts,
+circuit breaker and stale-while-revalidate cache
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from app.config import get_config
+from app.exceptions.chat_exceptions import ChatStorageUnavailableException
+
+logger = logging.getLogger("resilience")
+
+
+class CircuitBreaker:
+    """Circuit breaker clásico: closed -> open -> half_open -> closed"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Return True if a call may proceed (only one probe while half-open)"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit '{self.name}' closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"Circuit '{self.name}' opened after {self._failures} failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def retry_after(self) -> int:
+        """Seconds until the breaker lets a probe through"""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+            return max(1, int(remaining + 0.999))
+
+
+class StorageGuard:
+    """Run blocking storage calls with a per-operation timeout behind a circuit breaker"""
+
+    def __init__(self, breaker: CircuitBreaker, timeouts: Dict[str, float], max_workers: int = 8):
+        self.breaker = breaker
+        self.timeouts = timeouts
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='chat-store-call')
+
+    def call(self, operation: str, fn: Callable[[], Any], kind: str = 'read') -> Any:
+        """Execute fn, failing fast if the circuit is open or the call exceeds its timeout"""
+        from app.metrics_middleware import record_chat_store_call, update_circuit_state
+
+        if not self.breaker.allow_request():
+            record_chat_store_call(operation, 'rejected')
+            update_circuit_state(self.breaker.name, self.breaker.state)
+            raise ChatStorageUnavailableException(
+                f"Chat storage unavailable (circuit open for '{operation}')",
+                retry_after=self.breaker.retry_after()
+            )
+
+        timeout = self.timeouts.get(kind, self.timeouts.get('read', 3.0))
+        start = time.monotonic()
+        future = self._executor.submit(fn)
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # El hilo sigue ocupado hasta que httpx corte la conexión,
+            # pero el worker de Flask queda libre inmediatamente
+            future.cancel()
+            self.breaker.record_failure()
+            record_chat_store_call(operation, 'timeout', time.monotonic() - start)
+            update_circuit_state(self.breaker.name, self.breaker.state)
+            raise ChatStorageUnavailableException(
+                f"Chat storage '{operation}' timed out after {timeout}s",
+                retry_after=self.breaker.retry_after()
+            )
+        except Exception:
+            self.breaker.record_failure()
+            record_chat_store_call(operation, 'error', time.monotonic() - start)
+            update_circuit_state(self.breaker.name, self.breaker.state)
+            raise
+
+        self.breaker.record_success()
+        record_chat_store_call(operation, 'success', time.monotonic() - start)
+        update_circuit_state(self.breaker.name, self.breaker.state)
+        return result
+
+
+class StaleWhileRevalidateCache:
+    """
+    In-memory cache that serves stale entries while a background refresh runs.
+
+    Entries younger than ``ttl`` are fresh. Between ``ttl`` and ``ttl + stale_ttl``
+    they are served as stale and refreshed in the background. Older entries are
+    only served when the loader fails (stale-if-error).
+    """
+
+    FRESH = 'fresh'
+    STALE = 'stale'
+    MISS = 'miss'
+
+    def __init__(self, ttl: float, stale_ttl: float, max_entries: int = 1024, max_workers: int = 2):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[Any, float]] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='swr-refresh')
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Tuple[Any, str]:
+        """Return (value, status) where status is fresh, stale or miss"""
+        from app.metrics_middleware import record_chat_cache_result
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+
+        if entry is not None:
+            value, stored_at = entry
+            age = now - stored_at
+            if age < self.ttl:
+                record_chat_cache_result(self.FRESH)
+                return value, self.FRESH
+            if age < self.ttl + self.stale_ttl:
+                self._schedule_refresh(key, loader)
+                record_chat_cache_result(self.STALE)
+                return value, self.STALE
+
+        try:
+            value = loader()
+        except Exception:
+            if entry is not None:
+                # stale-if-error: mejor datos viejos que una lista vacía
+                record_chat_cache_result(self.STALE)
+                return entry[0], self.STALE
+            raise
+
+        self._store(key, value)
+        record_chat_cache_result(self.MISS)
+        return value, self.MISS
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None):
+        """Drop every entry (or those whose key matches predicate)"""
+        with self._lock:
+            if predicate is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+
+    def _store(self, key: Hashable, value: Any):
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                oldest = min(self._entries, key=lambda k: self._entries[k][1])
+                del self._entries[oldest]
+            self._entries[key] = (value, time.monotonic())
+
+    def _schedule_refresh(self, key: Hashable, loader: Callable[[], Any]):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        self._executor.submit(self._refresh, key, loader)
+
+    def _refresh(self, key: Hashable, loader: Callable[[], Any]):
+        try:
+            self._store(key, loader())
+        except Exception as e:
+            logger.warning(f"Background refresh failed for {key}: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+
+# =============================================================================
+# INSTANCIAS GLOBALES
+# =============================================================================
+
+_config = get_config()
+
+chat_store_breaker = CircuitBreaker(
+    'chat_store',
+    failure_threshold=_config.SUPABASE_CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=_config.SUPABASE_CIRCUIT_RESET_TIMEOUT
+)
+
+chat_store_guard = StorageGuard(
+    chat_store_breaker,
+    timeouts={
+        'read': _config.SUPABASE_READ_TIMEOUT,
+        'write': _config.SUPABASE_WRITE_TIMEOUT
+    },
+    max_workers=_config.SUPABASE_MAX_CONCURRENT_CALLS
+)
+
+chat_read_cache = StaleWhileRevalidateCache(
+    ttl=_config.CHAT_CACHE_TTL,
+    stale_ttl=_config.CHAT_CACHE_STALE_TTL
+)
@@ -0,0 +1,70 @@
+"""
+Consistent hashing ring used to assign chat rooms to worker processes
+"""
+from bisect import bisect
+from hashlib import md5
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def _hash(key: str) -> int:
+    return int(md5(key.encode('utf-8')).hexdigest()[:16], 16)
+
+
+class HashRing:
+    """
+    Consistent hash ring with virtual nodes.
+
+    Adding or removing a node only moves the keys that hash to that node's
+    virtual points (about 1/N of the rooms); every other room keeps its owner.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 100):
+        self.vnodes = vnodes
+        self._points: List[int] = []
+        self._owners: Dict[int, str] = {}
+        self._nodes = set()
+        for node in nodes:
+            self.add_node(node)
+
+    @property
+    def nodes(self) -> List[str]:
+        return sorted(self._nodes)
+
+    def add_node(self, node: str):
+        if node in self._nodes:
+            return
+        self._nodes.add(node)
+        for i in range(self.vnodes):
+            point = _hash(f'{node}#{i}')
+            # En la improbable colisión gana el nodo con menor id, igual en todos los workers
+            if point in self._owners and self._owners[point] < node:
+                continue
+            if point not in self._owners:
+                self._points.insert(bisect(self._points, point), point)
+            self._owners[point] = node
+
+    def remove_node(self, node: str):
+        if node not in self._nodes:
+            return
+        self._nodes.discard(node)
+        self._points = []
+        self._owners = {}
+        for remaining in list(self._nodes):
+            self._nodes.discard(remaining)
+            self.add_node(remaining)
+
+    def owner(self, key: str) -> Optional[str]:
+        """Node responsible for key, or None if the ring is empty"""
+        if not self._points:
+            return None
+        index = bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+    def diff(self, other: 'HashRing', keys: Iterable[str]) -> List[Tuple[str, Optional[str], Optional[str]]]:
+        """(key, old_owner, new_owner) for every key whose owner changes in other"""
+        moved = []
+        for key in keys:
+            old, new = self.owner(key), other.owner(key)
+            if old != new:
+                moved.append((key, old, new))
+        return moved
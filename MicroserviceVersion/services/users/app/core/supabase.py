@@ -3,6 +3,7 @@ Basic Supabase client for authentication only
 """
 import logging
 from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
 from app.config import get_config
 
 logger = logging.getLogger(__name__)
@@ -15,15 +16,23 @@ class SupabaseAuthClient:
         self.config = get_config()
         self._validate_auth_config()
         
+        # Timeout de transporte: evita que un PostgREST lento retenga hilos indefinidamente
+        options = ClientOptions(
+            postgrest_client_timeout=self.config.SUPABASE_HTTP_TIMEOUT,
+            storage_client_timeout=self.config.SUPABASE_HTTP_TIMEOUT
+        )
+
         # Initialize clients
         self.client = create_client(
             self.config.SUPABASE_URL,
-            self.config.SUPABASE_ANON_KEY
+            self.config.SUPABASE_ANON_KEY,
+            options=options
         )
         
         self.admin_client = create_client(
             self.config.SUPABASE_URL,
-            self.config.SUPABASE_SERVICE_ROLE_KEY
+            self.config.SUPABASE_SERVICE_ROLE_KEY,
+            options=options
         )
         
         logger.info("Supabase auth client initialized")
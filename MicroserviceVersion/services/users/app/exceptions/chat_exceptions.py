@@ -57,4 +57,11 @@ class ChatServiceException(BaseChatException):
     """Exception raised for general chat service errors."""
 
     def __init__(self, message: str = "Chat service error", error_code: int = 500):
-        super().__init__(message, error_code) 
\ No newline at end of file
+        super().__init__(message, error_code) 
+
+class ChatStorageUnavailableException(BaseChatException):
+    """Exception raised when the chat storage is slow or the circuit breaker is open."""
+
+    def __init__(self, message: str = "Chat storage unavailable", error_code: int = 503, retry_after: int = 0):
+        self.retry_after = retry_after
+        super().__init__(message, error_code)
@@ -1,4 +1,5 @@
 from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
+import functools
 import time
 import psutil
 import os
@@ -50,6 +51,83 @@ active_sessions_gauge = Gauge(
     'Current active user sessions'
 )
 
+# Métricas de resiliencia del almacenamiento del chat
+chat_store_calls_total = Counter(
+    'chat_store_calls_total',
+    'Total chat storage calls (Supabase or SQL)',
+    ['operation', 'status']  # success, error, timeout, rejected
+)
+
+chat_store_call_duration_seconds = Histogram(
+    'chat_store_call_duration_seconds',
+    'Chat storage call latency',
+    ['operation']
+)
+
+circuit_breaker_state = Gauge(
+    'circuit_breaker_state',
+    'Circuit breaker state (0=closed, 1=half_open, 2=open)',
+    ['name']
+)
+
+chat_cache_results_total = Counter(
+    'chat_cache_results_total',
+    'Chat read cache lookups',
+    ['result']  # fresh, stale, miss
+)
+
+# Métricas de Socket.IO y del pipeline de persistencia
+socketio_handler_duration_seconds = Histogram(
+    'socketio_handler_duration_seconds',
+    'Socket.IO event handler latency',
+    ['event']
+)
+
+chat_persist_queue_depth = Gauge(
+    'chat_persist_queue_depth',
+    'Messages waiting for or undergoing persistence'
+)
+
+chat_persist_total = Counter(
+    'chat_persist_total',
+    'Chat messages handled by the persistence pipeline',
+    ['status']  # success, failed, rejected
+)
+
+chat_persist_duration_seconds = Histogram(
+    'chat_persist_duration_seconds',
+    'Time from enqueue to persisted message'
+)
+
+socketio_outbound_queue_depth = Gauge(
+    'socketio_outbound_queue_depth',
+    'Deepest per-socket outbound queue among room members at last broadcast',
+    ['room']
+)
+
+socketio_dropped_events_total = Counter(
+    'socketio_dropped_events_total',
+    'Socket.IO events dropped, coalesced or cut off by the slow-consumer policy',
+    ['room', 'event', 'reason']  # typing_dropped, coalesced, coalesce_overflow, disconnected
+)
+
+socketio_batch_size = Histogram(
+    'socketio_batch_size',
+    'Chat messages delivered per room broadcast batch',
+    buckets=[1, 2, 5, 10, 25, 50, 100]
+)
+
+listening_parties_active = Gauge(
+    'listening_parties_active',
+    'Rooms with an active listening-party playback session'
+)
+
+listening_party_tick_seconds = Histogram(
+    'listening_party_tick_seconds',
+    'Time to fan out one round of listening-party drift ticks',
+    buckets=[0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1]
+)
+
 # Métricas de sistema
 memory_usage_bytes = Gauge(
     'nodejs_memory_usage_bytes',
@@ -168,6 +246,62 @@ def update_database_connections(count):
     """Actualizar número de conexiones de BD activas"""
     database_connections_active.set(count)
 
+def record_chat_store_call(operation, status, duration=None):
+    """Registrar una llamada al almacenamiento del chat y su latencia"""
+    chat_store_calls_total.labels(operation=operation, status=status).inc()
+    if duration is not None:
+        chat_store_call_duration_seconds.labels(operation=operation).observe(duration)
+
+def update_circuit_state(name, state):
+    """Actualizar el estado de un circuit breaker"""
+    value = {'closed': 0, 'half_open': 1, 'open': 2}.get(state, 0)
+    circuit_breaker_state.labels(name=name).set(value)
+
+def record_chat_cache_result(result):
+    """Registrar resultado de la cache de lecturas del chat"""
+    chat_cache_results_total.labels(result=result).inc()
+
+def record_chat_persist(status, duration=None):
+    """Registrar el resultado de persistir un mensaje del chat"""
+    chat_persist_total.labels(status=status).inc()
+    if duration is not None:
+        chat_persist_duration_seconds.observe(duration)
+
+def update_chat_persist_queue_depth(depth):
+    """Actualizar la profundidad de la cola de persistencia"""
+    chat_persist_queue_depth.set(depth)
+
+def update_socket_queue_depth(room, depth):
+    """Actualizar la profundidad máxima de cola de salida en una sala"""
+    socketio_outbound_queue_depth.labels(room=room).set(depth)
+
+def record_dropped_socket_event(room, event, reason, count=1):
+    """Registrar eventos descartados o agrupados por consumidores lentos"""
+    socketio_dropped_events_total.labels(room=room, event=event, reason=reason).inc(count)
+
+def record_socket_batch(size):
+    """Registrar el tamaño de un lote de mensajes emitido a una sala"""
+    socketio_batch_size.observe(size)
+
+def record_party_tick(active_parties, duration):
+    """Registrar una ronda de ticks de sincronización de las listening parties"""
+    listening_parties_active.set(active_parties)
+    listening_party_tick_seconds.observe(duration)
+
+def timed_socket_handler(event):
+    """Decorador que mide la latencia de un handler de Socket.IO"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                socketio_handler_duration_seconds.labels(event=event).observe(
+                    time.perf_counter() - start)
+        return wrapper
+    return decorator
+
 # =============================================================================
 # INSTANCIA SINGLETON
 # =============================================================================
@@ -183,5 +317,15 @@ __all__ = [
     'record_jwt_token_issued',
     'record_password_reset_request',
     'update_active_sessions',
-    'update_database_connections'
+    'update_database_connections',
+    'record_chat_store_call',
+    'update_circuit_state',
+    'record_chat_cache_result',
+    'record_chat_persist',
+    'update_chat_persist_queue_depth',
+    'timed_socket_handler',
+    'update_socket_queue_depth',
+    'record_dropped_socket_event',
+    'record_socket_batch',
+    'record_party_tick'
 ]
\ No newline at end of file
@@ -0,0 +1,4 @@
+"""
+Repositories package for Users service
+Data access layer for chat storage backends
+"""
@@ -0,0 +1,180 @@
+"""
+Monthly range partitions of chat_messages on Postgres
+"""
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+import json
+import logging
+import re
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("chat_partitions")
+
+PARENT = 'chat_messages'
+PARTITION_RE = re.compile(r'^chat_messages_y(\d{4})m(\d{2})$')
+
+# Mismas columnas que sql_chat_store.chat_messages; la PK incluye la clave de partición
+PARTITIONED_DDL = """
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY,
+    user_id VARCHAR(64) NOT NULL,
+    username VARCHAR(100),
+    message TEXT NOT NULL,
+    room VARCHAR(50) NOT NULL DEFAULT 'general',
+    timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp)
+"""
+
+PARTITIONED_INDEX_DDL = """
+CREATE INDEX IF NOT EXISTS ix_chat_messages_room_timestamp_id
+    ON chat_messages (room, timestamp, id)
+"""
+
+# Búsqueda de texto: la expresión debe coincidir con SqlChatStore.search_messages
+SEARCH_INDEX_DDL = """
+CREATE INDEX IF NOT EXISTS ix_chat_messages_message_fts
+    ON chat_messages USING gin (to_tsvector('simple'::regconfig, message))
+"""
+
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    years, index = divmod(month.month - 1 + months, 12)
+    return date(month.year + years, index + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f'{PARENT}_y{month.year}m{month.month:02d}'
+
+
+class ChatPartitionMaintainer:
+    """
+    Keeps chat_messages split into ``chat_messages_yYYYYmMM`` partitions.
+
+    Upcoming months are created ahead of time so inserts never miss a
+    partition. Months older than the retention window are detached
+    (CONCURRENTLY on Postgres 14+) and then dropped, or kept as
+    ``chat_messages_archive_yYYYYmMM`` tables: expiring a month is a
+    metadata change instead of a bulk DELETE.
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    def create_table(self):
+        with self.engine.begin() as conn:
+            conn.execute(text(PARTITIONED_DDL))
+            conn.execute(text(PARTITIONED_INDEX_DDL))
+            conn.execute(text(SEARCH_INDEX_DDL))
+
+    def is_partitioned(self) -> bool:
+        with self.engine.connect() as conn:
+            return conn.execute(text("""
+                SELECT 1 FROM pg_partitioned_table pt
+                JOIN pg_class c ON c.oid = pt.partrelid
+                WHERE c.relname = :name AND pg_table_is_visible(c.oid)
+            """), {'name': PARENT}).first() is not None
+
+    def partitions(self, conn) -> Dict[date, str]:
+        """{month: partition name} of the attached monthly partitions"""
+        rows = conn.execute(text("""
+            SELECT child.relname FROM pg_inherits i
+            JOIN pg_class parent ON parent.oid = i.inhparent
+            JOIN pg_class child ON child.oid = i.inhrelid
+            WHERE parent.relname = :name
+        """), {'name': PARENT})
+        result = {}
+        for (name,) in rows:
+            match = PARTITION_RE.match(name)
+            if match:
+                result[date(int(match.group(1)), int(match.group(2)), 1)] = name
+        return result
+
+    def ensure_partitions(self, months_ahead: int, today: Optional[date] = None) -> List[str]:
+        """Create the current month and the next ``months_ahead`` months if missing"""
+        current = month_start(today or datetime.utcnow().date())
+        created = []
+        with self.engine.begin() as conn:
+            existing = self.partitions(conn)
+            for offset in range(months_ahead + 1):
+                month = add_months(current, offset)
+                if month in existing:
+                    continue
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {PARENT} "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+                ))
+                created.append(partition_name(month))
+        return created
+
+    def apply_retention(self, retention_months: int, archive: bool = False,
+                        today: Optional[date] = None) -> List[str]:
+        """Detach and drop (or archive) partitions ending before the retention window"""
+        if not retention_months:
+            return []
+
+        cutoff = add_months(month_start(today or datetime.utcnow().date()), -retention_months)
+        # DETACH ... CONCURRENTLY no admite un bloque de transacción
+        with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            version = int(conn.execute(text('SHOW server_version_num')).scalar())
+            concurrently = 'CONCURRENTLY' if version >= 140000 else ''
+            expired = sorted((month, name) for month, name in self.partitions(conn).items()
+                             if add_months(month, 1) <= cutoff)
+
+            for month, name in expired:
+                conn.execute(text(f'ALTER TABLE {PARENT} DETACH PARTITION {name} {concurrently}'))
+                if archive:
+                    conn.execute(text(
+                        f'ALTER TABLE {name} RENAME TO {PARENT}_archive_y{month.year}m{month.month:02d}'
+                    ))
+                else:
+                    conn.execute(text(f'DROP TABLE {name}'))
+                logger.info(f'Chat partition {name} {"archived" if archive else "dropped"}')
+        return [name for _, name in expired]
+
+    def explain_recent(self, room: str, limit: int = 50, before=None) -> Dict[str, Any]:
+        """
+        EXPLAIN ANALYZE the recent/keyset query of a room and list the partitions
+        it touched. With ``before`` older partitions are pruned at plan time;
+        without it the ordered Append stops once LIMIT rows are found, so older
+        partitions appear in the plan but are never executed.
+        """
+        sql = f'SELECT * FROM {PARENT} WHERE room = :room'
+        params = {'room': room, 'limit': limit}
+        if before is not None:
+            sql += ' AND timestamp < :before'
+            params['before'] = before
+        sql += ' ORDER BY timestamp DESC, id DESC LIMIT :limit'
+
+        with self.engine.connect() as conn:
+            plan = conn.execute(text(f'EXPLAIN (ANALYZE, COSTS OFF, FORMAT JSON) {sql}'), params).scalar()
+            attached = self.partitions(conn)
+
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        in_plan, scanned = set(), set()
+
+        def walk(node):
+            relation = node.get('Relation Name')
+            if relation and PARTITION_RE.match(relation):
+                in_plan.add(relation)
+                if node.get('Actual Loops', 0) > 0:
+                    scanned.add(relation)
+            for child in node.get('Plans', []):
+                walk(child)
+
+        walk(plan[0]['Plan'])
+        return {
+            'query': sql,
+            'partitions_attached': len(attached),
+            'partitions_in_plan': sorted(in_plan),
+            'partitions_scanned': sorted(scanned),
+            'pruned_at_plan_time': len(attached) - len(in_plan)
+        }
@@ -0,0 +1,145 @@
+"""
+ChatStore interface and backend factory
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+import threading
+import logging
+
+from app.config import get_config
+
+logger = logging.getLogger("chat_store")
+
+# Configuración de texto de la búsqueda (sin stemming: mensajes en varios idiomas)
+SEARCH_CONFIG = 'simple'
+# Delimitadores de ts_headline; ChatService los convierte en <mark> tras escapar el HTML
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_STOP = '\x03'
+
+
+class ChatStore(ABC):
+    """
+    Storage backend for chat messages.
+
+    Rows are plain dicts with the keys id, user_id, username, message,
+    timestamp and room. ``timestamp`` may be a datetime or an ISO string.
+    """
+
+    name = 'base'
+
+    @abstractmethod
+    def insert_message(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a message and return the stored row"""
+
+    @abstractmethod
+    def get_message(self, message_id: int) -> Optional[Dict[str, Any]]:
+        """Return a single message or None"""
+
+    @abstractmethod
+    def delete_message(self, message_id: int) -> bool:
+        """Delete a message, returning True if a row was removed"""
+
+    @abstractmethod
+    def recent_messages(self, room: str, limit: int) -> List[Dict[str, Any]]:
+        """Newest ``limit`` messages of a room in chronological order"""
+
+    @abstractmethod
+    def messages_before(self, room: str, before_timestamp, before_id: int, limit: int) -> List[Dict[str, Any]]:
+        """Keyset page: messages older than (timestamp, id), newest first"""
+
+    @abstractmethod
+    def message_page(self, room: str, offset: int, limit: int) -> List[Dict[str, Any]]:
+        """Offset page of a room, newest first"""
+
+    @abstractmethod
+    def count_messages(self, room: str) -> int:
+        """Number of messages in a room"""
+
+    @abstractmethod
+    def last_message(self, room: str) -> Optional[Dict[str, Any]]:
+        """Newest message of a room or None"""
+
+    @abstractmethod
+    def active_rooms(self) -> List[str]:
+        """Distinct room names that have messages"""
+
+    @abstractmethod
+    def search_messages(self, room: str, query: str, before_timestamp, before_id: Optional[int],
+                        limit: int) -> List[Dict[str, Any]]:
+        """
+        Full-text search in a room, newest first, older than (timestamp, id)
+        when given. Rows carry an extra ``headline`` key with the matches
+        wrapped in HIGHLIGHT_START/HIGHLIGHT_STOP.
+        """
+
+    # Contadores de sala y marcadores de lectura (ver UnreadTracker)
+
+    @abstractmethod
+    def get_room_counters(self, rooms: List[str]) -> Dict[str, int]:
+        """Persisted message counters for rooms (rooms without a row are omitted)"""
+
+    @abstractmethod
+    def create_room_counters(self, counters: Dict[str, int]):
+        """Insert counters for rooms that have no row yet; existing rows are left alone"""
+
+    @abstractmethod
+    def increment_room_counters(self, deltas: Dict[str, int]):
+        """Add deltas to room message counters (missing rows start at 0)"""
+
+    @abstractmethod
+    def get_read_markers(self, user_id: str) -> Dict[str, int]:
+        """Persisted read markers of a user as {room: last_read_seq}"""
+
+    @abstractmethod
+    def upsert_read_markers(self, markers: List[Tuple[str, str, int]]):
+        """Insert or advance (user_id, room, last_read_seq) read markers; they never move back"""
+
+    # Particiones mensuales de chat_messages (ver app/services/partition_maintenance.py)
+
+    @abstractmethod
+    def maintain_partitions(self, months_ahead: int, retention_months: int,
+                            archive: bool = False) -> Dict[str, List[str]]:
+        """Create upcoming partitions and expire old ones; returns {created, expired}"""
+
+    def explain_recent(self, room: str, limit: int = 50, before=None) -> Optional[Dict[str, Any]]:
+        """Partitions touched by the recent-messages query, or None if unsupported"""
+        return None
+
+
+# Global instance
+_chat_store = None
+_chat_store_lock = threading.Lock()
+
+
+def create_chat_store(backend: Optional[str] = None) -> ChatStore:
+    """Build the chat store selected by CHAT_STORE_BACKEND (supabase | sql)"""
+    config = get_config()
+    backend = (backend or config.CHAT_STORE_BACKEND).lower()
+
+    if backend == 'supabase':
+        from app.repositories.supabase_chat_store import SupabaseChatStore
+        return SupabaseChatStore()
+
+    if backend == 'sql':
+        from app.repositories.sql_chat_store import SqlChatStore
+        return SqlChatStore(
+            config.CHAT_DATABASE_URL,
+            pool_size=config.CHAT_DB_POOL_SIZE,
+            max_overflow=config.CHAT_DB_MAX_OVERFLOW,
+            pool_timeout=config.CHAT_DB_POOL_TIMEOUT,
+            statement_timeout_ms=config.CHAT_DB_STATEMENT_TIMEOUT_MS,
+            create_tables=config.CHAT_DB_CREATE_TABLES
+        )
+
+    raise ValueError(f"Unknown CHAT_STORE_BACKEND: {backend}")
+
+
+def get_chat_store() -> ChatStore:
+    """Get global chat store instance"""
+    global _chat_store
+    if _chat_store is None:
+        with _chat_store_lock:
+            if _chat_store is None:
+                _chat_store = create_chat_store()
+                logger.info(f"Chat store backend: {_chat_store.name}")
+    return _chat_store
@@ -0,0 +1,269 @@
+"""
+ChatStore backed by a directly connected Postgres (psycopg2) or SQLite database
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import re
+
+from sqlalchemy import (
+    BigInteger, Column, DateTime, Index, Integer, MetaData, String, Table, Text,
+    and_, case, create_engine, delete, func, insert, literal_column, or_, select
+)
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.repositories.chat_partitions import ChatPartitionMaintainer
+from app.repositories.chat_store import (
+    ChatStore, HIGHLIGHT_START, HIGHLIGHT_STOP, SEARCH_CONFIG
+)
+
+metadata = MetaData()
+
+# En Postgres la tabla real está particionada por mes (PK (id, timestamp));
+# ver app/repositories/chat_partitions.py
+chat_messages = Table(
+    'chat_messages', metadata,
+    Column('id', BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=True),
+    Column('user_id', String(64), nullable=False),
+    Column('username', String(100)),
+    Column('message', Text, nullable=False),
+    Column('room', String(50), nullable=False, default='general'),
+    Column('timestamp', DateTime, nullable=False, server_default=func.current_timestamp()),
+    # Índice para lecturas keyset por sala: (room, timestamp, id)
+    Index('ix_chat_messages_room_timestamp_id', 'room', 'timestamp', 'id'),
+)
+
+chat_room_counters = Table(
+    'chat_room_counters', metadata,
+    Column('room', String(50), primary_key=True),
+    Column('message_count', BigInteger, nullable=False, default=0),
+    Column('updated_at', DateTime, nullable=False, server_default=func.current_timestamp()),
+)
+
+chat_read_markers = Table(
+    'chat_read_markers', metadata,
+    Column('user_id', String(64), primary_key=True),
+    Column('room', String(50), primary_key=True),
+    Column('last_read_seq', BigInteger, nullable=False, default=0),
+    Column('updated_at', DateTime, nullable=False, server_default=func.current_timestamp()),
+)
+
+
+# Literal (no parámetro) para que coincida con el índice GIN de la expresión
+SEARCH_REGCONFIG = literal_column(f"'{SEARCH_CONFIG}'::regconfig")
+HEADLINE_OPTIONS = (f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, '
+                    'MaxWords=30, MinWords=10, MaxFragments=2')
+
+
+def _like_headline(message: str, terms: List[str]) -> str:
+    """ts_headline stand-in for SQLite: wrap every term occurrence"""
+    pattern = re.compile('|'.join(re.escape(t) for t in terms), re.IGNORECASE)
+    return pattern.sub(lambda m: f'{HIGHLIGHT_START}{m.group(0)}{HIGHLIGHT_STOP}', message)
+
+
+class SqlChatStore(ChatStore):
+    """Chat storage over a pooled SQLAlchemy Core engine"""
+
+    name = 'sql'
+
+    def __init__(self, database_url: str, pool_size: int = 5, max_overflow: int = 10,
+                 pool_timeout: float = 5.0, statement_timeout_ms: int = 0,
+                 create_tables: bool = False):
+        if not database_url:
+            raise ValueError("CHAT_DATABASE_URL is required for the sql chat store")
+
+        engine_kwargs = {'pool_pre_ping': True, 'future': True}
+        connect_args = {}
+        if database_url.startswith('sqlite'):
+            connect_args['check_same_thread'] = False
+        else:
+            engine_kwargs.update(pool_size=pool_size, max_overflow=max_overflow,
+                                 pool_timeout=pool_timeout, pool_recycle=1800)
+            if statement_timeout_ms:
+                connect_args['options'] = f'-c statement_timeout={statement_timeout_ms}'
+
+        self.engine = create_engine(database_url, connect_args=connect_args, **engine_kwargs)
+        self.partitions = None
+        if self.engine.dialect.name == 'postgresql':
+            self.partitions = ChatPartitionMaintainer(self.engine)
+
+        if create_tables:
+            tables = None
+            if self.partitions is not None:
+                self.partitions.create_table()
+                tables = [t for t in metadata.sorted_tables if t is not chat_messages]
+            metadata.create_all(self.engine, tables=tables)
+
+    @staticmethod
+    def _row(row) -> Optional[Dict[str, Any]]:
+        return dict(row._mapping) if row is not None else None
+
+    def insert_message(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        # INSERT ... RETURNING: un solo round-trip para obtener id y timestamp
+        stmt = insert(chat_messages).values(**record).returning(*chat_messages.c)
+        with self.engine.begin() as conn:
+            return self._row(conn.execute(stmt).first())
+
+    def get_message(self, message_id: int) -> Optional[Dict[str, Any]]:
+        stmt = select(chat_messages).where(chat_messages.c.id == message_id)
+        with self.engine.connect() as conn:
+            return self._row(conn.execute(stmt).first())
+
+    def delete_message(self, message_id: int) -> bool:
+        stmt = delete(chat_messages).where(chat_messages.c.id == message_id)
+        with self.engine.begin() as conn:
+            return conn.execute(stmt).rowcount > 0
+
+    def recent_messages(self, room: str, limit: int) -> List[Dict[str, Any]]:
+        stmt = select(chat_messages)\
+            .where(chat_messages.c.room == room)\
+            .order_by(chat_messages.c.timestamp.desc(), chat_messages.c.id.desc())\
+            .limit(limit)
+        with self.engine.connect() as conn:
+            rows = [self._row(r) for r in conn.execute(stmt)]
+        rows.reverse()
+        return rows
+
+    def messages_before(self, room: str, before_timestamp, before_id: int, limit: int) -> List[Dict[str, Any]]:
+        c = chat_messages.c
+        stmt = select(chat_messages)\
+            .where(c.room == room)\
+            .where(or_(c.timestamp < before_timestamp,
+                       and_(c.timestamp == before_timestamp, c.id < before_id)))\
+            .order_by(c.timestamp.desc(), c.id.desc())\
+            .limit(limit)
+        with self.engine.connect() as conn:
+            return [self._row(r) for r in conn.execute(stmt)]
+
+    def message_page(self, room: str, offset: int, limit: int) -> List[Dict[str, Any]]:
+        stmt = select(chat_messages)\
+            .where(chat_messages.c.room == room)\
+            .order_by(chat_messages.c.timestamp.desc(), chat_messages.c.id.desc())\
+            .offset(offset)\
+            .limit(limit)
+        with self.engine.connect() as conn:
+            return [self._row(r) for r in conn.execute(stmt)]
+
+    def count_messages(self, room: str) -> int:
+        stmt = select(func.count()).select_from(chat_messages).where(chat_messages.c.room == room)
+        with self.engine.connect() as conn:
+            return conn.execute(stmt).scalar() or 0
+
+    def last_message(self, room: str) -> Optional[Dict[str, Any]]:
+        rows = self.recent_messages(room, 1)
+        return rows[0] if rows else None
+
+    def active_rooms(self) -> List[str]:
+        stmt = select(chat_messages.c.room).distinct().where(chat_messages.c.room.isnot(None))
+        with self.engine.connect() as conn:
+            return [r[0] for r in conn.execute(stmt)]
+
+    def search_messages(self, room: str, query: str, before_timestamp, before_id: Optional[int],
+                        limit: int) -> List[Dict[str, Any]]:
+        c = chat_messages.c
+        page = select(chat_messages).where(c.room == room)
+        if before_timestamp is not None:
+            page = page.where(or_(c.timestamp < before_timestamp,
+                                  and_(c.timestamp == before_timestamp, c.id < before_id)))
+
+        if self.engine.dialect.name != 'postgresql':
+            terms = query.split()
+            for term in terms:
+                escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                page = page.where(c.message.ilike(f'%{escaped}%', escape='\\'))
+            stmt = page.order_by(c.timestamp.desc(), c.id.desc()).limit(limit)
+            with self.engine.connect() as conn:
+                rows = [self._row(r) for r in conn.execute(stmt)]
+            for row in rows:
+                row['headline'] = _like_headline(row['message'], terms)
+            return rows
+
+        # websearch_to_tsquery acepta la entrada del usuario sin errores de sintaxis
+        tsquery = func.websearch_to_tsquery(SEARCH_REGCONFIG, query)
+        page = page.where(func.to_tsvector(SEARCH_REGCONFIG, c.message).op('@@')(tsquery))\
+            .order_by(c.timestamp.desc(), c.id.desc())\
+            .limit(limit)\
+            .subquery()
+        # ts_headline solo sobre las filas de la página
+        stmt = select(page, func.ts_headline(SEARCH_REGCONFIG, page.c.message, tsquery,
+                                             HEADLINE_OPTIONS).label('headline'))\
+            .order_by(page.c.timestamp.desc(), page.c.id.desc())
+        with self.engine.connect() as conn:
+            return [self._row(r) for r in conn.execute(stmt)]
+
+    def _upsert(self, table, rows: List[Dict[str, Any]], keys: List[str], set_=None):
+        """
+        INSERT ... ON CONFLICT (Postgres y SQLite comparten la sintaxis). ``set_(excluded)``
+        da las columnas a actualizar; sin él las filas existentes no se tocan
+        """
+        dialect = postgresql if self.engine.dialect.name == 'postgresql' else sqlite
+        stmt = dialect.insert(table).values(rows)
+        if set_ is None:
+            stmt = stmt.on_conflict_do_nothing(index_elements=keys)
+        else:
+            stmt = stmt.on_conflict_do_update(index_elements=keys, set_=set_(stmt.excluded))
+        with self.engine.begin() as conn:
+            conn.execute(stmt)
+
+    def get_room_counters(self, rooms: List[str]) -> Dict[str, int]:
+        if not rooms:
+            return {}
+        c = chat_room_counters.c
+        stmt = select(c.room, c.message_count).where(c.room.in_(rooms))
+        with self.engine.connect() as conn:
+            return {room: count for room, count in conn.execute(stmt)}
+
+    def create_room_counters(self, counters: Dict[str, int]):
+        if not counters:
+            return
+        now = datetime.utcnow()
+        self._upsert(chat_room_counters, [
+            {'room': room, 'message_count': count, 'updated_at': now}
+            for room, count in counters.items()
+        ], ['room'])
+
+    def increment_room_counters(self, deltas: Dict[str, int]):
+        if not deltas:
+            return
+        now = datetime.utcnow()
+        c = chat_room_counters.c
+        # Cada worker suma lo que contó: ninguno pisa los mensajes contados por otro
+        self._upsert(chat_room_counters, [
+            {'room': room, 'message_count': delta, 'updated_at': now}
+            for room, delta in deltas.items()
+        ], ['room'], lambda excluded: {'message_count': c.message_count + excluded.message_count,
+                                       'updated_at': excluded.updated_at})
+
+    def get_read_markers(self, user_id: str) -> Dict[str, int]:
+        c = chat_read_markers.c
+        stmt = select(c.room, c.last_read_seq).where(c.user_id == user_id)
+        with self.engine.connect() as conn:
+            return {room: seq for room, seq in conn.execute(stmt)}
+
+    def upsert_read_markers(self, markers: List[Tuple[str, str, int]]):
+        if not markers:
+            return
+        now = datetime.utcnow()
+        c = chat_read_markers.c
+        self._upsert(chat_read_markers, [
+            {'user_id': user_id, 'room': room, 'last_read_seq': seq, 'updated_at': now}
+            for user_id, room, seq in markers
+        ], ['user_id', 'room'], lambda excluded: {
+            # GREATEST portable (SQLite no lo tiene): un marcador nunca retrocede
+            'last_read_seq': case((excluded.last_read_seq > c.last_read_seq, excluded.last_read_seq),
+                                  else_=c.last_read_seq),
+            'updated_at': excluded.updated_at
+        })
+
+    def maintain_partitions(self, months_ahead: int, retention_months: int,
+                            archive: bool = False) -> Dict[str, List[str]]:
+        if self.partitions is None or not self.partitions.is_partitioned():
+            return {'created': [], 'expired': []}
+        return {
+            'created': self.partitions.ensure_partitions(months_ahead),
+            'expired': self.partitions.apply_retention(retention_months, archive)
+        }
+
+    def explain_recent(self, room: str, limit: int = 50, before=None) -> Optional[Dict[str, Any]]:
+        if self.partitions is None or not self.partitions.is_partitioned():
+            return None
+        return self.partitions.explain_recent(room, limit, before)
@@ -0,0 +1,150 @@
+"""
+ChatStore backed by the Supabase PostgREST API
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.supabase import get_supabase_admin
+from app.repositories.chat_store import ChatStore
+
+
+class SupabaseChatStore(ChatStore):
+    """Chat storage through supabase_admin.table('chat_messages')"""
+
+    name = 'supabase'
+    table_name = 'chat_messages'
+
+    def __init__(self):
+        self.client = get_supabase_admin()
+
+    def _table(self):
+        return self.client.table(self.table_name)
+
+    def insert_message(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        record = dict(record)
+        if hasattr(record.get('timestamp'), 'isoformat'):
+            record['timestamp'] = record['timestamp'].isoformat()
+        response = self._table().insert(record).execute()
+        return response.data[0] if response.data else None
+
+    def get_message(self, message_id: int) -> Optional[Dict[str, Any]]:
+        response = self._table().select('*').eq('id', message_id).execute()
+        return response.data[0] if response.data else None
+
+    def delete_message(self, message_id: int) -> bool:
+        response = self._table().delete().eq('id', message_id).execute()
+        return len(response.data) > 0
+
+    def recent_messages(self, room: str, limit: int) -> List[Dict[str, Any]]:
+        response = self._table()\
+            .select('*')\
+            .eq('room', room)\
+            .order('timestamp', desc=True)\
+            .order('id', desc=True)\
+            .limit(limit)\
+            .execute()
+        return list(reversed(response.data))
+
+    def messages_before(self, room: str, before_timestamp, before_id: int, limit: int) -> List[Dict[str, Any]]:
+        ts = before_timestamp.isoformat() if hasattr(before_timestamp, 'isoformat') else before_timestamp
+        response = self._table()\
+            .select('*')\
+            .eq('room', room)\
+            .or_(f'timestamp.lt.{ts},and(timestamp.eq.{ts},id.lt.{before_id})')\
+            .order('timestamp', desc=True)\
+            .order('id', desc=True)\
+            .limit(limit)\
+            .execute()
+        return response.data
+
+    def message_page(self, room: str, offset: int, limit: int) -> List[Dict[str, Any]]:
+        response = self._table()\
+            .select('*')\
+            .eq('room', room)\
+            .order('timestamp', desc=True)\
+            .range(offset, offset + limit - 1)\
+            .execute()
+        return response.data
+
+    def count_messages(self, room: str) -> int:
+        response = self._table()\
+            .select('id', count='exact')\
+            .eq('room', room)\
+            .execute()
+        return response.count or 0
+
+    def last_message(self, room: str) -> Optional[Dict[str, Any]]:
+        response = self._table()\
+            .select('*')\
+            .eq('room', room)\
+            .order('timestamp', desc=True)\
+            .limit(1)\
+            .execute()
+        return response.data[0] if response.data else None
+
+    def active_rooms(self) -> List[str]:
+        response = self._table().select('room').execute()
+        return list({msg['room'] for msg in response.data if msg.get('room')})
+
+    def search_messages(self, room: str, query: str, before_timestamp, before_id: Optional[int],
+                        limit: int) -> List[Dict[str, Any]]:
+        # Función definida en migrations/003_chat_message_search.sql (índice GIN + ts_headline)
+        ts = before_timestamp.isoformat() if hasattr(before_timestamp, 'isoformat') else before_timestamp
+        response = self.client.rpc('chat_search_messages', {
+            'search_room': room,
+            'search_query': query,
+            'before_ts': ts,
+            'before_id': before_id,
+            'max_rows': limit
+        }).execute()
+        return response.data or []
+
+    def get_room_counters(self, rooms: List[str]) -> Dict[str, int]:
+        if not rooms:
+            return {}
+        response = self.client.table('chat_room_counters')\
+            .select('room, message_count')\
+            .in_('room', rooms)\
+            .execute()
+        return {row['room']: row['message_count'] for row in response.data}
+
+    def create_room_counters(self, counters: Dict[str, int]):
+        if not counters:
+            return
+        now = datetime.utcnow().isoformat()
+        self.client.table('chat_room_counters').upsert([
+            {'room': room, 'message_count': count, 'updated_at': now}
+            for room, count in counters.items()
+        ], ignore_duplicates=True).execute()
+
+    def increment_room_counters(self, deltas: Dict[str, int]):
+        if not deltas:
+            return
+        # Función definida en migrations/004_chat_unread_increments.sql
+        self.client.rpc('chat_increment_room_counters', {'deltas': deltas}).execute()
+
+    def get_read_markers(self, user_id: str) -> Dict[str, int]:
+        response = self.client.table('chat_read_markers')\
+            .select('room, last_read_seq')\
+            .eq('user_id', user_id)\
+            .execute()
+        return {row['room']: row['last_read_seq'] for row in response.data}
+
+    def upsert_read_markers(self, markers: List[Tuple[str, str, int]]):
+        if not markers:
+            return
+        # Función definida en migrations/004_chat_unread_increments.sql
+        self.client.rpc('chat_advance_read_markers', {'markers': [
+            {'user_id': user_id, 'room': room, 'last_read_seq': seq}
+            for user_id, room, seq in markers
+        ]}).execute()
+
+    def maintain_partitions(self, months_ahead: int, retention_months: int,
+                            archive: bool = False) -> Dict[str, List[str]]:
+        # Función definida en migrations/002_partition_chat_messages.sql
+        response = self.client.rpc('chat_messages_maintain', {
+            'months_ahead': months_ahead,
+            'retention_months': retention_months,
+            'archive': archive
+        }).execute()
+        return response.data or {'created': [], 'expired': []}
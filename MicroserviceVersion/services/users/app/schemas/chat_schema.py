@@ -2,7 +2,7 @@
 Chat-related Pydantic schemas for validation and serialization
 """
 from pydantic import BaseModel, Field, validator
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 
 
@@ -56,6 +56,8 @@ class MessageHistoryResponse(BaseModel):
         default=False, description="Whether there's a next page")
     has_prev: bool = Field(
         default=False, description="Whether there's a previous page")
+    next_cursor: Optional[str] = Field(
+        None, description="Keyset cursor for the next (older) page")
 
     class Config:
         from_attributes = True
@@ -111,3 +113,32 @@ class RoomStatistics(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class UnreadCountsResponse(BaseModel):
+    """Schema for per-room unread counts of a user"""
+    user_id: str = Field(..., description="ID of the user")
+    rooms: Dict[str, int] = Field(default_factory=dict,
+                                  description="Unread messages per followed room")
+    total: int = Field(default=0, description="Unread messages across all rooms")
+
+    class Config:
+        from_attributes = True
+
+
+class ChatSearchHit(ChatMessageResponse):
+    """Schema for a chat search result"""
+    highlight: str = Field(..., description="HTML-escaped snippet with matches in <mark>")
+
+
+class ChatSearchResponse(BaseModel):
+    """Schema for keyset-paginated chat search results"""
+    room: str = Field(..., description="Room searched")
+    query: str = Field(..., description="Search query")
+    results: List[ChatSearchHit] = Field(default=[], description="Matches, newest first")
+    has_next: bool = Field(default=False, description="Whether there are older matches")
+    next_cursor: Optional[str] = Field(
+        None, description="Keyset cursor for the next (older) page")
+
+    class Config:
+        from_attributes = True
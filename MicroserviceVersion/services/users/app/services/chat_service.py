@@ -1,15 +1,24 @@
 """
-Chat service for handling chat operations with Supabase
+Chat service for handling chat operations on the configured ChatStore
 """
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
-from app.core.supabase import get_supabase, get_supabase_admin
-from app.schemas.chat_schema import ChatMessageCreate, ChatMessageResponse, MessageHistoryResponse
+import base64
+import html
+from flask import g, has_app_context
+from app.core.resilience import chat_store_guard, chat_read_cache
+from app.repositories.chat_store import HIGHLIGHT_START, HIGHLIGHT_STOP, get_chat_store
+from app.schemas.chat_schema import (
+    ChatMessageCreate, ChatMessageResponse, ChatSearchHit, ChatSearchResponse,
+    MessageHistoryResponse, UnreadCountsResponse
+)
+from app.services.unread_tracker import unread_tracker
 from app.exceptions.chat_exceptions import (
     MessageValidationException,
     MessageNotFoundException,
     UnauthorizedMessageException,
-    ChatServiceException
+    ChatServiceException,
+    ChatStorageUnavailableException
 )
 import logging
 
@@ -20,8 +29,9 @@ class ChatService:
     """Service class for chat-related operations"""
 
     def __init__(self):
-        self.supabase = get_supabase()
-        self.supabase_admin = get_supabase_admin()
+        self.store = get_chat_store()
+        self.guard = chat_store_guard
+        self.cache = chat_read_cache
 
     def save_message(self, message_data: ChatMessageCreate) -> ChatMessageResponse:
         """Save a chat message to the database"""
@@ -29,66 +39,58 @@ class ChatService:
             # Validate message data
             self._validate_message_data(message_data)
 
-            # Prepare data for Supabase
+            # Prepare data for the store
             message_record = {
                 'user_id': message_data.user_id,
                 'message': message_data.message.strip(),
                 'room': message_data.room,
-                'timestamp': datetime.utcnow().isoformat(),
+                'timestamp': datetime.utcnow(),
                 'username': message_data.username or f'User_{message_data.user_id}'
             }
 
             # Insert into chat_messages table
-            response = self.supabase_admin.table(
-                'chat_messages').insert(message_record).execute()
+            saved_message = self.guard.call(
+                'save_message',
+                lambda: self.store.insert_message(message_record),
+                kind='write'
+            )
 
-            if not response.data:
+            if not saved_message:
                 raise ChatServiceException("Failed to save message")
 
-            saved_message = response.data[0]
+            self._invalidate_room(message_data.room)
+            self._record_unread(message_data.room, message_data.user_id)
 
-            return ChatMessageResponse(
-                id=saved_message['id'],
-                user_id=saved_message['user_id'],
-                username=saved_message['username'],
-                message=saved_message['message'],
-                timestamp=datetime.fromisoformat(saved_message['timestamp']),
-                room=saved_message['room']
-            )
+            return self._to_message_response(saved_message)
 
         except Exception as e:
             logger.error(f"Error saving message: {str(e)}")
-            if isinstance(e, (MessageValidationException, ChatServiceException)):
+            if isinstance(e, (MessageValidationException, ChatServiceException,
+                              ChatStorageUnavailableException)):
                 raise
             raise ChatServiceException(f"Failed to save message: {str(e)}")
 
     def get_recent_messages(self, room: str = 'general', limit: int = 50) -> List[ChatMessageResponse]:
         """Get recent messages from a chat room"""
         try:
-            response = self.supabase_admin.table('chat_messages')\
-                .select('*')\
-                .eq('room', room)\
-                .order('timestamp', desc=False)\
-                .limit(limit)\
-                .execute()
-
-            messages = []
-            for msg in response.data:
-                messages.append(ChatMessageResponse(
-                    id=msg['id'],
-                    user_id=msg['user_id'],
-                    username=msg['username'],
-                    message=msg['message'],
-                    timestamp=datetime.fromisoformat(msg['timestamp']),
-                    room=msg['room']
-                ))
-
-            return messages
+            return self._cached_read(
+                ('recent_messages', room, limit),
+                lambda: self._fetch_recent_messages(room, limit)
+            )
 
+        except ChatStorageUnavailableException:
+            raise  # 503 con Retry-After: la caché ya sirvió lo que tenía
         except Exception as e:
             logger.error(f"Error getting recent messages: {str(e)}")
             return []
 
+    def _fetch_recent_messages(self, room: str, limit: int) -> List[ChatMessageResponse]:
+        rows = self.guard.call(
+            'get_recent_messages',
+            lambda: self.store.recent_messages(room, limit)
+        )
+        return [self._to_message_response(msg) for msg in rows]
+
     def get_message_history(self, room: str = 'general', page: int = 1, per_page: int = 20) -> MessageHistoryResponse:
         """Get paginated message history"""
         try:
@@ -96,31 +98,18 @@ class ChatService:
             offset = (page - 1) * per_page
 
             # Get total count
-            count_response = self.supabase_admin.table('chat_messages')\
-                .select('id', count='exact')\
-                .eq('room', room)\
-                .execute()
-
-            total = count_response.count or 0
+            total = self.guard.call(
+                'count_messages',
+                lambda: self.store.count_messages(room)
+            )
 
             # Get paginated messages
-            response = self.supabase_admin.table('chat_messages')\
-                .select('*')\
-                .eq('room', room)\
-                .order('timestamp', desc=True)\
-                .range(offset, offset + per_page - 1)\
-                .execute()
-
-            messages = []
-            for msg in response.data:
-                messages.append(ChatMessageResponse(
-                    id=msg['id'],
-                    user_id=msg['user_id'],
-                    username=msg['username'],
-                    message=msg['message'],
-                    timestamp=datetime.fromisoformat(msg['timestamp']),
-                    room=msg['room']
-                ))
+            rows = self.guard.call(
+                'get_message_history',
+                lambda: self.store.message_page(room, offset, per_page)
+            )
+
+            messages = [self._to_message_response(msg) for msg in rows]
 
             # Reverse to get chronological order
             messages.reverse()
@@ -136,6 +125,8 @@ class ChatService:
                 has_prev=page > 1
             )
 
+        except ChatStorageUnavailableException:
+            raise  # 503 con Retry-After (el historial paginado no pasa por la caché)
         except Exception as e:
             logger.error(f"Error getting message history: {str(e)}")
             return MessageHistoryResponse(
@@ -147,57 +138,129 @@ class ChatService:
                 has_prev=False
             )
 
+    def get_messages_before(self, room: str = 'general', cursor: Optional[str] = None,
+                            limit: int = 20) -> MessageHistoryResponse:
+        """Keyset-paginated history: messages older than cursor, no COUNT or OFFSET scan"""
+        before_timestamp, before_id = self.decode_cursor(cursor) if cursor else (None, None)
+
+        if before_timestamp is None:
+            rows = self.guard.call(
+                'get_message_history',
+                lambda: list(reversed(self.store.recent_messages(room, limit + 1)))
+            )
+        else:
+            rows = self.guard.call(
+                'get_message_history',
+                lambda: self.store.messages_before(room, before_timestamp, before_id, limit + 1)
+            )
+
+        has_next = len(rows) > limit
+        messages = [self._to_message_response(msg) for msg in rows[:limit]]
+        next_cursor = self.encode_cursor(messages[-1]) if has_next and messages else None
+
+        # Reverse to get chronological order
+        messages.reverse()
+
+        return MessageHistoryResponse(
+            messages=messages,
+            total=len(messages),
+            pages=0,
+            current_page=1,
+            has_next=has_next,
+            has_prev=cursor is not None,
+            next_cursor=next_cursor
+        )
+
+    def search_messages(self, room: str, query: str, cursor: Optional[str] = None,
+                        limit: int = 20) -> ChatSearchResponse:
+        """Full-text search in a room (newest first) with keyset pagination"""
+        query = (query or '').strip()
+        if not query:
+            raise ValueError('Search query is required')
+        if len(query) > 200:
+            raise ValueError('Search query is too long')
+
+        before_timestamp, before_id = self.decode_cursor(cursor) if cursor else (None, None)
+        rows = self.guard.call(
+            'search_messages',
+            lambda: self.store.search_messages(room, query, before_timestamp, before_id, limit + 1)
+        )
+
+        has_next = len(rows) > limit
+        results = [
+            ChatSearchHit(**self._to_message_response(row).dict(),
+                          highlight=self._highlight(row.get('headline') or row['message']))
+            for row in rows[:limit]
+        ]
+        return ChatSearchResponse(
+            room=room,
+            query=query,
+            results=results,
+            has_next=has_next,
+            next_cursor=self.encode_cursor(results[-1]) if has_next and results else None
+        )
+
+    @staticmethod
+    def _highlight(headline: str) -> str:
+        """Escape the snippet, then turn the store delimiters into <mark> tags"""
+        return html.escape(headline)\
+            .replace(HIGHLIGHT_START, '<mark>')\
+            .replace(HIGHLIGHT_STOP, '</mark>')
+
     def delete_message(self, message_id: int, user_id: str) -> bool:
         """Delete a message (only by the author)"""
         try:
             # First, get the message to check ownership
-            response = self.supabase_admin.table('chat_messages')\
-                .select('*')\
-                .eq('id', message_id)\
-                .execute()
+            message = self.guard.call(
+                'get_message',
+                lambda: self.store.get_message(message_id)
+            )
 
-            if not response.data:
+            if not message:
                 raise MessageNotFoundException("Message not found")
 
-            message = response.data[0]
-
             # Check if user is the author
             if message['user_id'] != user_id:
                 raise UnauthorizedMessageException(
                     "You can only delete your own messages")
 
             # Delete the message
-            delete_response = self.supabase_admin.table('chat_messages')\
-                .delete()\
-                .eq('id', message_id)\
-                .execute()
+            deleted = self.guard.call(
+                'delete_message',
+                lambda: self.store.delete_message(message_id),
+                kind='write'
+            )
+
+            self._invalidate_room(message.get('room'))
 
-            return len(delete_response.data) > 0
+            return deleted
 
         except Exception as e:
             logger.error(f"Error deleting message: {str(e)}")
-            if isinstance(e, (MessageNotFoundException, UnauthorizedMessageException)):
+            if isinstance(e, (MessageNotFoundException, UnauthorizedMessageException,
+                              ChatStorageUnavailableException)):
                 raise
             raise ChatServiceException(f"Failed to delete message: {str(e)}")
 
     def get_active_rooms(self) -> List[str]:
         """Get list of active chat rooms"""
         try:
-            response = self.supabase_admin.table('chat_messages')\
-                .select('room')\
-                .execute()
-
-            rooms = set()
-            for msg in response.data:
-                if msg.get('room'):
-                    rooms.add(msg['room'])
-
-            return list(rooms) if rooms else ['general']
+            return self._cached_read(('active_rooms',), self._fetch_active_rooms)
 
+        except ChatStorageUnavailableException:
+            raise  # 503 con Retry-After: la caché ya sirvió lo que tenía
         except Exception as e:
             logger.error(f"Error getting active rooms: {str(e)}")
             return ['general']
 
+    def _fetch_active_rooms(self) -> List[str]:
+        rooms = self.guard.call(
+            'get_active_rooms',
+            self.store.active_rooms
+        )
+
+        return list(rooms) if rooms else ['general']
+
     def _validate_message_data(self, message_data: ChatMessageCreate):
         """Validate chat message data"""
         errors = []
@@ -221,40 +284,13 @@ class ChatService:
     def get_room_statistics(self, room: str = 'general') -> Dict[str, Any]:
         """Get statistics for a specific room"""
         try:
-            # Get message count
-            count_response = self.supabase_admin.table('chat_messages')\
-                .select('id', count='exact')\
-                .eq('room', room)\
-                .execute()
-
-            message_count = count_response.count or 0
-
-            # Get last message
-            last_message_response = self.supabase_admin.table('chat_messages')\
-                .select('*')\
-                .eq('room', room)\
-                .order('timestamp', desc=True)\
-                .limit(1)\
-                .execute()
-
-            last_message = None
-            if last_message_response.data:
-                msg = last_message_response.data[0]
-                last_message = ChatMessageResponse(
-                    id=msg['id'],
-                    user_id=msg['user_id'],
-                    username=msg['username'],
-                    message=msg['message'],
-                    timestamp=datetime.fromisoformat(msg['timestamp']),
-                    room=msg['room']
-                )
-
-            return {
-                'room': room,
-                'message_count': message_count,
-                'last_message': last_message
-            }
+            return self._cached_read(
+                ('room_statistics', room),
+                lambda: self._fetch_room_statistics(room)
+            )
 
+        except ChatStorageUnavailableException:
+            raise  # 503 con Retry-After: la caché ya sirvió lo que tenía
         except Exception as e:
             logger.error(f"Error getting room statistics: {str(e)}")
             return {
@@ -262,3 +298,83 @@ class ChatService:
                 'message_count': 0,
                 'last_message': None
             }
+
+    def _fetch_room_statistics(self, room: str) -> Dict[str, Any]:
+        # Get message count
+        message_count = self.guard.call(
+            'count_messages',
+            lambda: self.store.count_messages(room)
+        )
+
+        # Get last message
+        last_row = self.guard.call(
+            'get_last_message',
+            lambda: self.store.last_message(room)
+        )
+
+        last_message = self._to_message_response(last_row) if last_row else None
+
+        return {
+            'room': room,
+            'message_count': message_count,
+            'last_message': last_message
+        }
+
+    def _cached_read(self, key, loader):
+        """Read through the stale-while-revalidate cache, flagging stale responses"""
+        value, status = self.cache.get(key, loader)
+        if status == self.cache.STALE and has_app_context():
+            g.chat_cache_stale = True
+        return value
+
+    def get_unread_counts(self, user_id: str) -> UnreadCountsResponse:
+        """Unread messages per room for a user, from the in-memory counters"""
+        rooms = self.guard.call('get_unread_counts', lambda: unread_tracker.unread_for(user_id))
+        return UnreadCountsResponse(user_id=str(user_id), rooms=rooms, total=sum(rooms.values()))
+
+    def mark_room_read(self, user_id: str, room: str) -> int:
+        """Mark every message of room as read by user; returns the read marker"""
+        return self.guard.call('mark_room_read', lambda: unread_tracker.mark_read(user_id, room))
+
+    @staticmethod
+    def _record_unread(room: str, sender_id: str):
+        # El mensaje ya está guardado: un fallo del contador no debe romper el envío
+        try:
+            unread_tracker.record_message(room, sender_id)
+        except Exception as e:
+            logger.warning(f"Unread counter not updated for room {room}: {str(e)}")
+
+    def _invalidate_room(self, room: Optional[str]):
+        """Drop cached reads affected by a write in room"""
+        self.cache.invalidate(
+            lambda key: key[0] == 'active_rooms' or (len(key) > 1 and key[1] == room)
+        )
+
+    @staticmethod
+    def _to_message_response(msg: Dict[str, Any]) -> ChatMessageResponse:
+        timestamp = msg['timestamp']
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        return ChatMessageResponse(
+            id=msg['id'],
+            user_id=msg['user_id'],
+            username=msg['username'],
+            message=msg['message'],
+            timestamp=timestamp,
+            room=msg['room']
+        )
+
+    @staticmethod
+    def encode_cursor(message: ChatMessageResponse) -> str:
+        """Opaque keyset cursor for (timestamp, id)"""
+        raw = f"{message.timestamp.isoformat()}|{message.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            timestamp, message_id = base64.urlsafe_b64decode(padded).decode().split('|')
+            return datetime.fromisoformat(timestamp), int(message_id)
+        except Exception:
+            raise ValueError('Invalid cursor')
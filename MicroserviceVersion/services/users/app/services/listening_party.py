@@ -0,0 +1,247 @@
+"""
+Listening parties: synchronized playback sessions on top of chat rooms
+"""
+from typing import Any, Dict, List, Optional
+import logging
+import threading
+import time
+
+from app.config import get_config
+
+logger = logging.getLogger("listening_party")
+
+MIN_RATE = 0.5
+MAX_RATE = 2.0
+
+# Reloj del servidor en ms epoch derivado de un reloj monótono: los ajustes
+# del reloj del sistema no hacen saltar las posiciones de reproducción
+_WALL_ANCHOR_MS = time.time() * 1000
+_MONO_ANCHOR = time.monotonic()
+
+
+def server_time_ms() -> float:
+    return _WALL_ANCHOR_MS + (time.monotonic() - _MONO_ANCHOR) * 1000
+
+
+class PartySession:
+    """Authoritative playback state of one room"""
+
+    __slots__ = ('room', 'host_id', 'song_id', 'position_ms', 'rate', 'paused',
+                 'updated_at', 'version')
+
+    def __init__(self, room: str, host_id: str, song_id: Any, position_ms: float = 0,
+                 rate: float = 1.0, paused: bool = False):
+        self.room = room
+        self.host_id = host_id
+        self.song_id = song_id
+        self.position_ms = position_ms
+        self.rate = rate
+        self.paused = paused
+        self.updated_at = server_time_ms()
+        self.version = 1
+
+    def position_at(self, now_ms: float) -> float:
+        if self.paused:
+            return self.position_ms
+        return self.position_ms + (now_ms - self.updated_at) * self.rate
+
+    def rebase(self, now_ms: float):
+        """Fold elapsed playback into position_ms before changing rate/pause/seek"""
+        self.position_ms = self.position_at(now_ms)
+        self.updated_at = now_ms
+        self.version += 1
+
+    def snapshot(self, now_ms: Optional[float] = None) -> Dict[str, Any]:
+        now_ms = server_time_ms() if now_ms is None else now_ms
+        return {
+            'room': self.room,
+            'host_id': self.host_id,
+            'song_id': self.song_id,
+            'position_ms': round(self.position_at(now_ms)),
+            'rate': self.rate,
+            'paused': self.paused,
+            'server_time': round(now_ms),
+            'version': self.version
+        }
+
+    def tick(self, now_ms: float) -> List[Any]:
+        """Compact drift-correction payload: [room, version, server_time, position_ms]"""
+        return [self.room, self.version, round(now_ms), round(self.position_at(now_ms))]
+
+
+class ListeningPartyManager:
+    """
+    Synchronized playback for chat rooms.
+
+    Clients estimate their offset to the server clock with ``clock_sync``
+    (NTP-style: offset = ((t1 - t0) + (t2 - t3)) / 2, keeping the sample with
+    the lowest round trip) and then derive the playback position locally as
+    ``position_ms + (server_now - server_time) * rate``. The server keeps the
+    only authoritative state per room and bumps ``version`` on every change.
+
+    While a party is playing, every ``tick_interval`` seconds members get a
+    compact ``party_tick`` so they can correct drift (small drift: nudge the
+    playback rate, large drift: seek). Ticks are ephemeral and skipped for
+    slow consumers; each one is a single room-wide emit encoded once.
+
+    State lives in the process that hosts the room (the owning worker in
+    sharded mode).
+    """
+
+    def __init__(self, tick_interval: float = 1.0):
+        self.tick_interval = tick_interval
+        self._sessions: Dict[str, PartySession] = {}
+        self._lock = threading.Lock()
+        self._ticker_started = False
+
+    # ------------------------------------------------------------------ clock
+
+    @staticmethod
+    def clock_sync(t0: Any, received_at: float) -> Dict[str, Any]:
+        """Timestamps for one NTP-style exchange (t1 = received, t2 = replied)"""
+        return {'t0': t0, 't1': received_at, 't2': server_time_ms()}
+
+    # ------------------------------------------------------------------ state
+
+    def get(self, room: str) -> Optional[PartySession]:
+        with self._lock:
+            return self._sessions.get(room)
+
+    def state(self, room: str) -> Optional[Dict[str, Any]]:
+        session = self.get(room)
+        return session.snapshot() if session else None
+
+    def start(self, room: str, host_id: str, song_id: Any, position_ms: float = 0,
+              rate: float = 1.0, paused: bool = False) -> Dict[str, Any]:
+        if song_id is None:
+            raise ValueError('song_id is required')
+        session = PartySession(room, str(host_id), song_id, self._valid_position(position_ms),
+                               self._valid_rate(rate), bool(paused))
+        with self._lock:
+            previous = self._sessions.get(room)
+            if previous and previous.host_id != session.host_id:
+                raise PermissionError('Only the host can restart the party')
+            if previous:
+                session.version = previous.version + 1
+            self._sessions[room] = session
+        self._ensure_ticker()
+        logger.info(f'Listening party started in {room} by {host_id}')
+        return session.snapshot()
+
+    def control(self, room: str, user_id: str, action: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply a host command: play, pause, seek, rate, song or host"""
+        with self._lock:
+            session = self._sessions.get(room)
+            if session is None:
+                raise ValueError('No listening party in this room')
+            if session.host_id != str(user_id):
+                raise PermissionError('Only the host can control playback')
+
+            # Validar antes de rebase: un comando inválido no cambia version ni posición
+            changes = self._changes(action, data)
+            now = server_time_ms()
+            session.rebase(now)
+            for field, value in changes.items():
+                setattr(session, field, value)
+            return session.snapshot(now)
+
+    def stop(self, room: str, user_id: Optional[str] = None) -> bool:
+        with self._lock:
+            session = self._sessions.get(room)
+            if session is None:
+                return False
+            if user_id is not None and session.host_id != str(user_id):
+                raise PermissionError('Only the host can stop the party')
+            del self._sessions[room]
+        logger.info(f'Listening party stopped in {room}')
+        return True
+
+    @classmethod
+    def _changes(cls, action: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Session fields a host command sets; raises ValueError if it is invalid"""
+        if action == 'play':
+            return {'paused': False}
+        if action == 'pause':
+            return {'paused': True}
+        if action == 'seek':
+            return {'position_ms': cls._valid_position(data.get('position_ms', 0))}
+        if action == 'rate':
+            return {'rate': cls._valid_rate(data.get('rate', 1.0))}
+        if action == 'song':
+            if data.get('song_id') is None:
+                raise ValueError('song_id is required')
+            return {'song_id': data['song_id'],
+                    'position_ms': cls._valid_position(data.get('position_ms', 0)),
+                    'paused': bool(data.get('paused', False))}
+        if action == 'host':
+            if not data.get('host_id'):
+                raise ValueError('host_id is required')
+            return {'host_id': str(data['host_id'])}
+        raise ValueError(f'Unknown action: {action}')
+
+    @staticmethod
+    def _valid_position(position: Any) -> float:
+        try:
+            return max(0.0, float(position))
+        except (TypeError, ValueError):
+            raise ValueError('position_ms must be a number')
+
+    @staticmethod
+    def _valid_rate(rate: Any) -> float:
+        try:
+            rate = float(rate)
+        except (TypeError, ValueError):
+            raise ValueError('rate must be a number')
+        if not MIN_RATE <= rate <= MAX_RATE:
+            raise ValueError(f'rate must be between {MIN_RATE} and {MAX_RATE}')
+        return rate
+
+    # ------------------------------------------------------------------ drift ticks
+
+    def _ensure_ticker(self):
+        with self._lock:
+            if self._ticker_started or not self.tick_interval:
+                return
+            self._ticker_started = True
+
+        from app import socketio
+        socketio.start_background_task(self._tick_loop)
+
+    def _tick_loop(self):
+        from app import socketio
+
+        while True:
+            socketio.sleep(self.tick_interval)
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f'Error sending listening party ticks: {str(e)}')
+
+    def tick(self):
+        """Send one drift-correction tick to every playing party; end parties of empty rooms"""
+        from app import socketio
+        from app.metrics_middleware import record_party_tick
+        from app.services.room_delivery import room_delivery
+
+        started = time.perf_counter()
+        with self._lock:
+            sessions = list(self._sessions.values())
+
+        manager = socketio.server.manager
+        for session in sessions:
+            if not any(True for _ in manager.get_participants('/', session.room)):
+                self.stop(session.room)
+                continue
+            if not session.paused:
+                room_delivery.broadcast_ephemeral(
+                    session.room, 'party_tick', session.tick(server_time_ms()), reason='tick_dropped'
+                )
+
+        with self._lock:
+            active = len(self._sessions)
+        record_party_tick(active, time.perf_counter() - started)
+
+
+_config = get_config()
+
+listening_party = ListeningPartyManager(tick_interval=_config.CHAT_PARTY_TICK_INTERVAL)
@@ -0,0 +1,87 @@
+"""
+Executor-backed pipeline that persists chat messages off the Socket.IO event loop
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+import logging
+import threading
+import time
+
+from app.config import get_config
+from app.schemas.chat_schema import ChatMessageCreate, ChatMessageResponse
+
+logger = logging.getLogger("message_pipeline")
+
+
+class MessagePipeline:
+    """
+    Bounded worker pool for blocking message inserts.
+
+    ``submit`` never blocks: it returns False when ``max_queue`` messages are
+    already pending, so handlers can reject instead of stalling the worker.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 1000):
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='chat-persist')
+        self._slots = threading.BoundedSemaphore(max_queue)
+        self._depth = 0
+        self._lock = threading.Lock()
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    def submit(self, message_data: ChatMessageCreate,
+               on_success: Callable[[ChatMessageResponse], None],
+               on_error: Callable[[Exception], None]) -> bool:
+        """Enqueue a message for persistence; False if the queue is full"""
+        from app.metrics_middleware import record_chat_persist
+
+        if not self._slots.acquire(blocking=False):
+            record_chat_persist('rejected')
+            return False
+
+        self._change_depth(1)
+        self._executor.submit(self._persist, message_data, on_success, on_error, time.perf_counter())
+        return True
+
+    def _persist(self, message_data, on_success, on_error, enqueued_at):
+        from app.metrics_middleware import record_chat_persist
+        from app.services.chat_service import ChatService
+
+        try:
+            saved_message = ChatService().save_message(message_data)
+        except Exception as e:
+            logger.error(f"Error persisting message: {str(e)}")
+            record_chat_persist('failed', time.perf_counter() - enqueued_at)
+            self._safe_callback(on_error, e)
+        else:
+            record_chat_persist('success', time.perf_counter() - enqueued_at)
+            self._safe_callback(on_success, saved_message)
+        finally:
+            self._change_depth(-1)
+            self._slots.release()
+
+    def _change_depth(self, delta: int):
+        from app.metrics_middleware import update_chat_persist_queue_depth
+
+        with self._lock:
+            self._depth += delta
+            update_chat_persist_queue_depth(self._depth)
+
+    @staticmethod
+    def _safe_callback(callback, value):
+        try:
+            callback(value)
+        except Exception as e:
+            logger.error(f"Error in pipeline callback: {str(e)}")
+
+
+_config = get_config()
+
+message_pipeline = MessagePipeline(
+    max_workers=_config.CHAT_PERSIST_WORKERS,
+    max_queue=_config.CHAT_PERSIST_MAX_QUEUE
+)
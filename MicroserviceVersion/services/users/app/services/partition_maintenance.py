@@ -0,0 +1,68 @@
+"""
+Periodic maintenance of the monthly chat_messages partitions
+"""
+from typing import Callable, Dict, List
+import logging
+
+from app.config import get_config
+from app.repositories.chat_store import ChatStore, get_chat_store
+
+logger = logging.getLogger("partition_maintenance")
+
+
+class PartitionMaintenance:
+    """
+    Runs ``ChatStore.maintain_partitions`` at startup and every ``interval``
+    seconds: upcoming months get their partition ahead of time and months
+    older than ``retention_months`` (0 keeps everything) are detached and
+    dropped, or archived when ``archive`` is set.
+    """
+
+    def __init__(self, store_factory: Callable[[], ChatStore] = get_chat_store,
+                 months_ahead: int = 2, retention_months: int = 0,
+                 archive: bool = False, interval: float = 6 * 3600):
+        self._store_factory = store_factory
+        self.months_ahead = months_ahead
+        self.retention_months = retention_months
+        self.archive = archive
+        self.interval = interval
+        self._started = False
+
+    def run(self) -> Dict[str, List[str]]:
+        try:
+            result = self._store_factory().maintain_partitions(
+                self.months_ahead, self.retention_months, self.archive
+            )
+        except Exception as e:
+            logger.error(f'Error maintaining chat partitions: {str(e)}')
+            return {'created': [], 'expired': []}
+
+        if result.get('created') or result.get('expired'):
+            logger.info(f"Chat partitions maintained: created={result.get('created')} "
+                        f"expired={result.get('expired')}")
+        return result
+
+    def start(self):
+        from app import socketio
+
+        if self._started or not self.interval:
+            return
+        self._started = True
+        socketio.start_background_task(self._maintenance_loop)
+
+    def _maintenance_loop(self):
+        from app import socketio
+
+        while True:
+            self.run()
+            socketio.sleep(self.interval)
+
+
+_config = get_config()
+
+partition_maintenance = PartitionMaintenance(
+    months_ahead=_config.CHAT_PARTITION_MONTHS_AHEAD,
+    retention_months=_config.CHAT_RETENTION_MONTHS,
+    archive=_config.CHAT_RETENTION_MODE == 'archive',
+    interval=_config.CHAT_PARTITION_MAINTENANCE_INTERVAL
+)
@@ -0,0 +1,107 @@
+"""
+Per-room micro-batching of chat broadcasts
+"""
+from typing import Any, Callable, Dict, List
+import logging
+import threading
+
+from app.config import get_config
+
+logger = logging.getLogger("room_batcher")
+
+
+class RoomBatcher:
+    """
+    Collect messages per room for a short window and hand them off as one batch.
+
+    The first message of a window wakes the flusher, which waits ``window_ms``
+    and then delivers every buffered room with a single call to ``deliver``.
+    A room that reaches ``max_batch`` is delivered immediately. With
+    ``window_ms`` = 0 batching is disabled and every message is delivered on
+    its own.
+    """
+
+    def __init__(self, deliver: Callable[[str, List[Dict[str, Any]]], None],
+                 window_ms: int = 15, max_batch: int = 100):
+        self.deliver = deliver
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flusher_started = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def add(self, room: str, message: Dict[str, Any]):
+        """Queue message for room; delivered within one batching window"""
+        if not self.enabled:
+            self._deliver(room, [message])
+            return
+
+        full_batch = None
+        with self._lock:
+            buffer = self._buffers.setdefault(room, [])
+            buffer.append(message)
+            if len(buffer) >= self.max_batch:
+                full_batch = self._buffers.pop(room)
+
+        if full_batch is not None:
+            self._deliver(room, full_batch)
+            return
+
+        self._ensure_flusher()
+        self._wakeup.set()
+
+    def flush(self):
+        """Deliver everything buffered so far"""
+        with self._lock:
+            buffers, self._buffers = self._buffers, {}
+        for room, messages in buffers.items():
+            self._deliver(room, messages)
+
+    def _deliver(self, room: str, messages: List[Dict[str, Any]]):
+        from app.metrics_middleware import record_socket_batch
+
+        record_socket_batch(len(messages))
+        try:
+            self.deliver(room, messages)
+        except Exception as e:
+            logger.error(f'Error delivering batch of {len(messages)} messages to room {room}: {str(e)}')
+
+    def _ensure_flusher(self):
+        from app import socketio
+
+        with self._lock:
+            if self._flusher_started:
+                return
+            self._flusher_started = True
+        socketio.start_background_task(self._flush_loop)
+
+    def _flush_loop(self):
+        from app import socketio
+
+        while True:
+            self._wakeup.wait()
+            socketio.sleep(self.window)
+            # Se limpia antes de vaciar: lo que llegue durante el flush abre otra ventana
+            self._wakeup.clear()
+            self.flush()
+
+
+def _deliver_to_room(room: str, messages: List[Dict[str, Any]]):
+    from app.services.room_delivery import room_delivery
+
+    room_delivery.broadcast_messages(room, messages)
+
+
+_config = get_config()
+
+room_batcher = RoomBatcher(
+    _deliver_to_room,
+    window_ms=_config.CHAT_BATCH_WINDOW_MS,
+    max_batch=_config.CHAT_BATCH_MAX_SIZE
+)
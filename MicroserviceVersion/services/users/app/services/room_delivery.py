@@ -0,0 +1,253 @@
+"""
+Per-connection flow control for chat room broadcasts
+"""
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+import logging
+import threading
+
+from app.config import get_config
+
+logger = logging.getLogger("room_delivery")
+
+NAMESPACE = '/'
+
+
+class RoomDelivery:
+    """
+    Broadcast chat events to a room while protecting the server from slow consumers.
+
+    Each member's Engine.IO outbound queue is inspected before a broadcast and
+    the slow-consumer policy is applied in order of severity:
+
+    1. depth >= typing_drop_depth: typing indicators are dropped
+    2. depth >= coalesce_depth: messages are buffered per socket and later
+       flushed as a single ``new_messages`` event
+    3. depth >= disconnect_depth: the socket is disconnected
+
+    Healthy members still receive one room-wide emit (encoded once) with the
+    slow sockets passed as ``skip_sid``. In ack mode each message is emitted
+    per socket with a callback and sockets with too many unacknowledged
+    messages are treated as slow.
+    """
+
+    def __init__(self, typing_drop_depth: int = 16, coalesce_depth: int = 64,
+                 disconnect_depth: int = 256, max_coalesced: int = 200,
+                 ack_mode: bool = False, ack_window: int = 32, flush_interval: float = 0.5):
+        self.typing_drop_depth = typing_drop_depth
+        self.coalesce_depth = coalesce_depth
+        self.disconnect_depth = disconnect_depth
+        self.max_coalesced = max_coalesced
+        self.ack_mode = ack_mode
+        self.ack_window = ack_window
+        self.flush_interval = flush_interval
+
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._pending_rooms: Dict[str, str] = {}
+        self._missed: Dict[str, int] = defaultdict(int)
+        self._in_flight: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._flusher_started = False
+
+    # ------------------------------------------------------------------ broadcast
+
+    def broadcast_message(self, room: str, message: Dict[str, Any]):
+        """Deliver a persisted message to every member of room"""
+        self.broadcast_messages(room, [message])
+
+    def broadcast_messages(self, room: str, messages: List[Dict[str, Any]]):
+        """
+        Deliver persisted messages to every member of room as one event.
+
+        A single message keeps the ``new_message`` event; larger batches are
+        sent as ``new_messages``. The room-wide emit is encoded once by the
+        Socket.IO manager and the same packet is queued for every recipient.
+        """
+        from app import socketio
+
+        if len(messages) == 1:
+            event, payload = 'new_message', messages[0]
+        else:
+            event, payload = 'new_messages', {'room': room, 'messages': messages, 'missed': 0}
+
+        members = self._member_depths(room)
+        skip_sids = []
+        for sid, depth in members:
+            if depth >= self.disconnect_depth:
+                self._disconnect_slow_consumer(sid, room, depth)
+                skip_sids.append(sid)
+            elif self._is_slow(sid, depth) or self._has_pending(sid):
+                self._coalesce(sid, room, messages)
+                skip_sids.append(sid)
+
+        if self.ack_mode:
+            for sid, _ in members:
+                if sid not in skip_sids:
+                    self._emit_with_ack(sid, event, payload)
+        else:
+            socketio.emit(event, payload, to=room, skip_sid=skip_sids or None)
+
+    def broadcast_typing(self, room: str, payload: Dict[str, Any], exclude_sid: Optional[str] = None):
+        """Deliver a typing indicator, dropping it for members that are falling behind"""
+        self.broadcast_ephemeral(room, 'user_typing', payload, exclude_sid, reason='typing_dropped')
+
+    def broadcast_ephemeral(self, room: str, event: str, payload: Any,
+                            exclude_sid: Optional[str] = None, reason: str = 'dropped'):
+        """
+        Deliver an event that the next one supersedes (typing, playback ticks):
+        members that are falling behind simply skip it.
+        """
+        from app import socketio
+        from app.metrics_middleware import record_dropped_socket_event
+
+        skip_sids = [exclude_sid] if exclude_sid else []
+        for sid, depth in self._member_depths(room):
+            if sid == exclude_sid:
+                continue
+            if depth >= self.typing_drop_depth or self._has_pending(sid) or self._ack_backlog(sid):
+                skip_sids.append(sid)
+                record_dropped_socket_event(room, event, reason)
+
+        socketio.emit(event, payload, to=room, skip_sid=skip_sids or None)
+
+    def forget(self, sid: str):
+        """Drop per-socket state when a client disconnects"""
+        with self._lock:
+            self._pending.pop(sid, None)
+            self._pending_rooms.pop(sid, None)
+            self._missed.pop(sid, None)
+            self._in_flight.pop(sid, None)
+
+    # ------------------------------------------------------------------ policy
+
+    def _member_depths(self, room: str):
+        """Return (sid, outbound queue depth) per member and export the room maximum"""
+        from app import socketio
+        from app.metrics_middleware import update_socket_queue_depth
+
+        server = socketio.server
+        members = []
+        max_depth = 0
+        for sid, eio_sid in server.manager.get_participants(NAMESPACE, room):
+            eio_socket = server.eio.sockets.get(eio_sid)
+            depth = eio_socket.queue.qsize() if eio_socket is not None else 0
+            max_depth = max(max_depth, depth)
+            members.append((sid, depth))
+
+        update_socket_queue_depth(room, max_depth)
+        return members
+
+    def _is_slow(self, sid: str, depth: int) -> bool:
+        return depth >= self.coalesce_depth or self._ack_backlog(sid)
+
+    def _ack_backlog(self, sid: str) -> bool:
+        return self.ack_mode and self._in_flight.get(sid, 0) >= self.ack_window
+
+    def _has_pending(self, sid: str) -> bool:
+        return sid in self._pending
+
+    def _coalesce(self, sid: str, room: str, messages: List[Dict[str, Any]]):
+        from app.metrics_middleware import record_dropped_socket_event
+
+        with self._lock:
+            buffer = self._pending.setdefault(sid, [])
+            self._pending_rooms[sid] = room
+            buffer.extend(messages)
+            if len(buffer) > self.max_coalesced:
+                # Solo se conservan los más recientes; el cliente puede pedir historial
+                overflow = len(buffer) - self.max_coalesced
+                del buffer[:overflow]
+                self._missed[sid] += overflow
+                record_dropped_socket_event(room, 'new_message', 'coalesce_overflow', overflow)
+
+        record_dropped_socket_event(room, 'new_message', 'coalesced', len(messages))
+        self._ensure_flusher()
+
+    def _disconnect_slow_consumer(self, sid: str, room: str, depth: int):
+        from app import socketio
+        from app.metrics_middleware import record_dropped_socket_event
+
+        logger.warning(f'Disconnecting slow consumer {sid} in room {room} (queue depth {depth})')
+        record_dropped_socket_event(room, 'new_message', 'disconnected')
+        self.forget(sid)
+        try:
+            socketio.server.disconnect(sid, namespace=NAMESPACE)
+        except Exception as e:
+            logger.error(f'Error disconnecting slow consumer {sid}: {str(e)}')
+
+    # ------------------------------------------------------------------ acks
+
+    def _emit_with_ack(self, sid: str, event: str, data: Any):
+        from app import socketio
+
+        with self._lock:
+            self._in_flight[sid] += 1
+        socketio.emit(event, data, to=sid, callback=lambda *args: self._on_ack(sid))
+
+    def _on_ack(self, sid: str):
+        with self._lock:
+            if self._in_flight.get(sid, 0) > 0:
+                self._in_flight[sid] -= 1
+
+    # ------------------------------------------------------------------ flushing
+
+    def _ensure_flusher(self):
+        from app import socketio
+
+        with self._lock:
+            if self._flusher_started:
+                return
+            self._flusher_started = True
+        socketio.start_background_task(self._flush_loop)
+
+    def _flush_loop(self):
+        from app import socketio
+
+        while True:
+            socketio.sleep(self.flush_interval)
+            try:
+                self.flush_pending()
+            except Exception as e:
+                logger.error(f'Error flushing coalesced messages: {str(e)}')
+
+    def flush_pending(self):
+        """Send buffered messages to sockets whose queues have drained"""
+        from app import socketio
+
+        server = socketio.server
+        with self._lock:
+            sids = list(self._pending)
+
+        for sid in sids:
+            eio_sid = server.manager.eio_sid_from_sid(sid, NAMESPACE)
+            eio_socket = server.eio.sockets.get(eio_sid) if eio_sid else None
+            if eio_socket is None:
+                self.forget(sid)
+                continue
+            if eio_socket.queue.qsize() >= self.coalesce_depth or self._ack_backlog(sid):
+                continue
+
+            with self._lock:
+                messages = self._pending.pop(sid, [])
+                room = self._pending_rooms.pop(sid, None)
+                missed = self._missed.pop(sid, 0)
+            if not messages:
+                continue
+
+            payload = {'room': room, 'messages': messages, 'missed': missed}
+            if self.ack_mode:
+                self._emit_with_ack(sid, 'new_messages', payload)
+            else:
+                socketio.emit('new_messages', payload, to=sid)
+
+
+_config = get_config()
+
+room_delivery = RoomDelivery(
+    typing_drop_depth=_config.CHAT_SOCKET_TYPING_DROP_DEPTH,
+    coalesce_depth=_config.CHAT_SOCKET_COALESCE_DEPTH,
+    disconnect_depth=_config.CHAT_SOCKET_DISCONNECT_DEPTH,
+    max_coalesced=_config.CHAT_SOCKET_MAX_COALESCED,
+    ack_mode=_config.CHAT_DELIVERY_ACK_MODE,
+    ack_window=_config.CHAT_DELIVERY_ACK_WINDOW
+)
@@ -0,0 +1,200 @@
+"""
+Room-sharded deployment mode: each chat room is owned by exactly one worker
+"""
+from typing import Any, Dict, Optional
+from urllib.request import urlopen
+import json
+import logging
+import socket
+import threading
+
+from app.config import get_config
+from app.core.sharding import HashRing
+
+logger = logging.getLogger("room_sharding")
+
+NAMESPACE = '/'
+
+ACTIVE = 'active'
+DRAINING = 'draining'
+
+
+def parse_workers(spec: str) -> Dict[str, str]:
+    """'users-1=http://users-1:5000,users-2=http://users-2:5000' -> {id: url}"""
+    workers = {}
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        worker_id, _, url = item.partition('=')
+        workers[worker_id.strip()] = url.strip().rstrip('/')
+    return workers
+
+
+class RoomShardCoordinator:
+    """
+    Assign rooms to workers with a consistent hash ring and keep it up to date.
+
+    Every worker knows the full list of peers (``CHAT_SHARD_WORKERS``) and
+    polls their ``/api/chat/shards`` status. Only peers that answer and are
+    not draining are on the ring, so a worker joining, crashing or draining
+    moves only the rooms that hash to it. Rooms this worker stops owning are
+    handed off: members get ``room_moved`` with the new owner's URL and the
+    local room state is dropped after ``handoff_grace`` seconds.
+    """
+
+    def __init__(self, enabled: bool, worker_id: str, workers: Dict[str, str],
+                 vnodes: int = 100, health_interval: float = 5.0,
+                 failure_threshold: int = 2, handoff_grace: float = 10.0):
+        self.enabled = enabled
+        self.worker_id = worker_id
+        self.workers = dict(workers)
+        self.vnodes = vnodes
+        self.health_interval = health_interval
+        self.failure_threshold = failure_threshold
+        self.handoff_grace = handoff_grace
+
+        self.status = ACTIVE
+        self._failures: Dict[str, int] = {}
+        self._hosted = set()
+        self._lock = threading.Lock()
+        self._started = False
+
+        self.workers.setdefault(worker_id, '')
+        self.ring = HashRing(self.workers, vnodes=vnodes)
+
+    # ------------------------------------------------------------------ routing
+
+    def owner(self, room: str) -> Dict[str, Any]:
+        worker_id = self.ring.owner(room) if self.enabled else self.worker_id
+        return {'room': room, 'worker_id': worker_id, 'url': self.workers.get(worker_id, '')}
+
+    def is_local(self, room: str) -> bool:
+        return not self.enabled or self.ring.owner(room) == self.worker_id
+
+    def redirect_for(self, room: str) -> Optional[Dict[str, Any]]:
+        """Owner info if room lives on another worker, else None"""
+        if self.is_local(room):
+            return None
+        return self.owner(room)
+
+    def note_join(self, room: str):
+        with self._lock:
+            self._hosted.add(room)
+
+    # ------------------------------------------------------------------ membership
+
+    def status_info(self) -> Dict[str, Any]:
+        with self._lock:
+            hosted = sorted(self._hosted)
+        return {
+            'enabled': self.enabled,
+            'worker_id': self.worker_id,
+            'status': self.status,
+            'ring': self.ring.nodes,
+            'workers': self.workers,
+            'hosted_rooms': hosted
+        }
+
+    def drain(self):
+        """Leave the ring gracefully: peers drop this worker and its rooms are handed off"""
+        self.status = DRAINING
+        self._apply_ring([w for w in self.ring.nodes if w != self.worker_id])
+
+    def start(self):
+        from app import socketio
+
+        if not self.enabled or self._started:
+            return
+        self._started = True
+        socketio.start_background_task(self._membership_loop)
+
+    def _membership_loop(self):
+        from app import socketio
+
+        while True:
+            socketio.sleep(self.health_interval)
+            try:
+                self.refresh_membership()
+            except Exception as e:
+                logger.error(f'Error refreshing shard membership: {str(e)}')
+
+    def refresh_membership(self):
+        live = [] if self.status == DRAINING else [self.worker_id]
+        for worker_id, url in self.workers.items():
+            if worker_id == self.worker_id:
+                continue
+            if self._peer_is_active(worker_id, url):
+                live.append(worker_id)
+        self._apply_ring(live)
+
+    def _peer_is_active(self, worker_id: str, url: str) -> bool:
+        try:
+            with urlopen(f'{url}/api/chat/shards', timeout=2) as response:
+                healthy = json.loads(response.read()).get('status') == ACTIVE
+        except Exception:
+            healthy = False
+
+        if healthy:
+            self._failures[worker_id] = 0
+            return True
+        self._failures[worker_id] = self._failures.get(worker_id, 0) + 1
+        # Un peer que estaba en el anillo sobrevive a fallos aislados
+        return worker_id in self.ring.nodes and self._failures[worker_id] < self.failure_threshold
+
+    def _apply_ring(self, live_workers):
+        if sorted(live_workers) == self.ring.nodes:
+            return
+
+        new_ring = HashRing(live_workers, vnodes=self.vnodes)
+        with self._lock:
+            hosted = list(self._hosted)
+        moved = [(room, new) for room, _, new in self.ring.diff(new_ring, hosted)
+                 if new != self.worker_id]
+        logger.info(f'Shard ring changed: {self.ring.nodes} -> {new_ring.nodes} '
+                    f'({len(moved)} local rooms moving)')
+        self.ring = new_ring
+
+        for room, new_owner in moved:
+            self._hand_off(room, new_owner)
+
+    # ------------------------------------------------------------------ handoff
+
+    def _hand_off(self, room: str, new_owner: Optional[str]):
+        from app import socketio
+
+        socketio.emit('room_moved', {
+            'room': room,
+            'worker_id': new_owner,
+            'url': self.workers.get(new_owner, '')
+        }, to=room)
+        socketio.start_background_task(self._release_room, room)
+
+    def _release_room(self, room: str):
+        from app import socketio
+        from app.core.resilience import chat_read_cache
+        from app.services.room_batcher import room_batcher
+
+        socketio.sleep(self.handoff_grace)
+        if self.is_local(room):
+            return  # El anillo volvió a asignarnos la sala durante la gracia
+
+        room_batcher.flush()
+        try:
+            socketio.close_room(room, namespace=NAMESPACE)
+        except Exception as e:
+            logger.error(f'Error closing handed-off room {room}: {str(e)}')
+        chat_read_cache.invalidate(lambda key: len(key) > 1 and key[1] == room)
+        with self._lock:
+            self._hosted.discard(room)
+        logger.info(f'Room {room} handed off to {self.ring.owner(room)}')
+
+
+_config = get_config()
+
+room_sharding = RoomShardCoordinator(
+    enabled=_config.CHAT_SHARDING_ENABLED,
+    worker_id=_config.CHAT_WORKER_ID or socket.gethostname(),
+    workers=parse_workers(_config.CHAT_SHARD_WORKERS),
+    vnodes=_config.CHAT_SHARD_VNODES,
+    health_interval=_config.CHAT_SHARD_HEALTH_INTERVAL,
+    failure_threshold=_config.CHAT_SHARD_FAILURE_THRESHOLD,
+    handoff_grace=_config.CHAT_SHARD_HANDOFF_GRACE
+)
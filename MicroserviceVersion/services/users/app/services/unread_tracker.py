@@ -0,0 +1,180 @@
+"""
+Incrementally maintained unread counters for chat rooms
+"""
+from typing import Callable, Dict, Iterable, Set
+import atexit
+import logging
+import threading
+
+from app.config import get_config
+from app.repositories.chat_store import ChatStore, get_chat_store
+
+logger = logging.getLogger("unread_tracker")
+
+
+class UnreadTracker:
+    """
+    Per-room message counters and per-user read markers kept in memory.
+
+    ``record_message`` bumps the room counter and moves the sender's marker,
+    ``mark_read`` moves a user's marker to the current counter. The unread
+    count of a room is ``counter - marker``, so ``unread_for`` costs
+    O(rooms the user follows) instead of scanning messages.
+
+    Every ``flush_interval`` seconds (and at exit) the messages counted
+    since the last flush are added to the stored counters as deltas, dirty
+    markers are written (a stored marker only moves forward) and the
+    in-memory counters are refreshed from the store. Several workers can
+    therefore count the same room without overwriting each other. Counters
+    missing from the store are bootstrapped once from ``count_messages``.
+    """
+
+    def __init__(self, store_factory: Callable[[], ChatStore] = get_chat_store,
+                 flush_interval: float = 5.0):
+        self._store_factory = store_factory
+        self.flush_interval = flush_interval
+
+        self._counters: Dict[str, int] = {}
+        self._pending: Dict[str, int] = {}  # mensajes contados aún no sumados en el almacén
+        self._markers: Dict[str, Dict[str, int]] = {}
+        self._dirty_markers = set()
+        self._lock = threading.Lock()
+        self._flusher_started = False
+
+    @property
+    def store(self) -> ChatStore:
+        return self._store_factory()
+
+    # ------------------------------------------------------------------ updates
+
+    def record_message(self, room: str, sender_id: str = None):
+        """Count a newly stored message; the sender has implicitly read it"""
+        bootstrapped = self._load_counters([room])
+        with self._lock:
+            if room not in bootstrapped:
+                # Un conteo inicial desde la tabla ya incluye este mensaje
+                self._counters[room] += 1
+                self._pending[room] = self._pending.get(room, 0) + 1
+            seq = self._counters[room]
+
+        if sender_id is not None:
+            self._set_marker(str(sender_id), room, seq)
+        self._ensure_flusher()
+
+    def mark_read(self, user_id: str, room: str) -> int:
+        """Move the user's marker to the latest message of room; returns the marker"""
+        self._load_counters([room])
+        with self._lock:
+            seq = self._counters[room]
+        self._set_marker(str(user_id), room, seq)
+        self._ensure_flusher()
+        return seq
+
+    def _set_marker(self, user_id: str, room: str, seq: int):
+        markers = self._user_markers(user_id)
+        with self._lock:
+            if markers.get(room, -1) < seq:
+                markers[room] = seq
+                self._dirty_markers.add((user_id, room))
+
+    # ------------------------------------------------------------------ reads
+
+    def unread_for(self, user_id: str) -> Dict[str, int]:
+        """{room: unread count} for every room the user has a read marker in"""
+        markers = self._user_markers(str(user_id))
+        with self._lock:
+            rooms = list(markers)
+        self._load_counters(rooms)
+
+        with self._lock:
+            return {room: max(0, self._counters.get(room, 0) - markers[room]) for room in rooms}
+
+    def _user_markers(self, user_id: str) -> Dict[str, int]:
+        with self._lock:
+            markers = self._markers.get(user_id)
+        if markers is not None:
+            return markers
+
+        stored = self.store.get_read_markers(user_id)
+        with self._lock:
+            return self._markers.setdefault(user_id, dict(stored))
+
+    def _load_counters(self, rooms: Iterable[str]) -> Set[str]:
+        """Load missing counters; returns the rooms bootstrapped from count_messages"""
+        with self._lock:
+            missing = [room for room in rooms if room not in self._counters]
+        if not missing:
+            return set()
+
+        stored = self.store.get_room_counters(missing)
+        counted = {room: self.store.count_messages(room) for room in missing if room not in stored}
+        if counted:
+            # Si otro worker creó la fila entretanto, se usa la suya
+            self.store.create_room_counters(counted)
+            stored.update(self.store.get_room_counters(list(counted)))
+
+        with self._lock:
+            for room, count in stored.items():
+                self._counters.setdefault(room, count)
+        return set(counted)
+
+    # ------------------------------------------------------------------ persistence
+
+    def flush(self):
+        """Write dirty counters and markers to the chat store"""
+        with self._lock:
+            deltas, self._pending = self._pending, {}
+            keys, self._dirty_markers = self._dirty_markers, set()
+            markers = [(user_id, room, self._markers[user_id][room]) for user_id, room in keys]
+
+        try:
+            self.store.increment_room_counters(deltas)
+        except Exception as e:
+            logger.error(f'Error persisting unread counters: {str(e)}')
+            with self._lock:
+                for room, delta in deltas.items():
+                    self._pending[room] = self._pending.get(room, 0) + delta
+        try:
+            self.store.upsert_read_markers(markers)
+        except Exception as e:
+            logger.error(f'Error persisting read markers: {str(e)}')
+            with self._lock:
+                self._dirty_markers.update(keys)
+        self._refresh_counters()
+
+    def _refresh_counters(self):
+        """Take the stored counters (every worker's messages) plus what is still pending here"""
+        with self._lock:
+            rooms = list(self._counters)
+        if not rooms:
+            return
+        try:
+            stored = self.store.get_room_counters(rooms)
+        except Exception as e:
+            logger.error(f'Error refreshing unread counters: {str(e)}')
+            return
+        with self._lock:
+            for room, count in stored.items():
+                self._counters[room] = count + self._pending.get(room, 0)
+
+    def _ensure_flusher(self):
+        from app import socketio
+
+        with self._lock:
+            if self._flusher_started:
+                return
+            self._flusher_started = True
+        atexit.register(self.flush)
+        socketio.start_background_task(self._flush_loop)
+
+    def _flush_loop(self):
+        from app import socketio
+
+        while True:
+            socketio.sleep(self.flush_interval)
+            self.flush()
+
+
+_config = get_config()
+
+unread_tracker = UnreadTracker(flush_interval=_config.CHAT_UNREAD_FLUSH_INTERVAL)
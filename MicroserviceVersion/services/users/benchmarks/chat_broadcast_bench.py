@@ -0,0 +1,126 @@
+"""
+Benchmark de broadcast del chat: emits por mensaje vs micro-batching por sala.
+
+Conecta N clientes Socket.IO a una sala, un emisor envía mensajes a una tasa
+fija y cada receptor mide la latencia extremo a extremo (envío -> recepción)
+tanto de ``new_message`` como de los lotes ``new_messages``.
+
+Sirve para ambos servidores (mismo protocolo de eventos):
+    users service  (websocket_controller.py)  --url http://localhost:5000
+    monolito       (routes/chat.py)           --url http://localhost:5000
+
+Ejecutar una vez con el servidor arrancado con CHAT_BATCH_WINDOW_MS=0
+(emit por mensaje) y otra con batching activo (p.ej. CHAT_BATCH_WINDOW_MS=15):
+    python benchmarks/chat_broadcast_bench.py --url http://localhost:5000 --clients 200 --rate 200
+"""
+import argparse
+import statistics
+import threading
+import time
+import uuid
+
+import socketio
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Receiver:
+    def __init__(self, url, room, user_id, transports):
+        self.latencies = []
+        self.events = 0
+        self.received = 0
+        self.last_received_at = 0.0
+        self._lock = threading.Lock()
+
+        self.client = socketio.Client(reconnection=False)
+        self.client.on('new_message', self._on_message)
+        self.client.on('new_messages', self._on_batch)
+        self.client.connect(url, transports=transports)
+        self.client.emit('join_room', {'user_id': user_id, 'username': f'bench{user_id}', 'room': room})
+
+    def _record(self, messages):
+        now = time.time()
+        with self._lock:
+            self.events += 1
+            for message in messages:
+                text = message.get('message', '')
+                if not text.startswith('bench '):
+                    continue
+                sent_at = float(text.split(' ')[2])
+                self.latencies.append((now - sent_at) * 1000)
+                self.received += 1
+            self.last_received_at = now
+
+    def _on_message(self, message):
+        self._record([message])
+
+    def _on_batch(self, batch):
+        self._record(batch.get('messages', []))
+
+    def close(self):
+        self.client.disconnect()
+
+
+def run(args):
+    room = f'bench-{uuid.uuid4().hex[:8]}'
+    transports = args.transports
+
+    receivers = [Receiver(args.url, room, 10_000 + i, transports) for i in range(args.clients)]
+    sender = socketio.Client(reconnection=False)
+    sender.connect(args.url, transports=transports)
+    sender.emit('join_room', {'user_id': 9_999, 'username': 'bench-sender', 'room': room})
+    time.sleep(1.0)
+
+    interval = 1.0 / args.rate
+    start = time.time()
+    for seq in range(args.messages):
+        sender.emit('send_message', {
+            'user_id': 9_999,
+            'username': 'bench-sender',
+            'room': room,
+            'message': f'bench {seq} {time.time():.6f}'
+        })
+        next_send = start + (seq + 1) * interval
+        time.sleep(max(0.0, next_send - time.time()))
+    send_done = time.time()
+
+    expected = args.messages * args.clients
+    deadline = send_done + args.drain
+    while time.time() < deadline and sum(r.received for r in receivers) < expected:
+        time.sleep(0.1)
+
+    latencies = [lat for r in receivers for lat in r.latencies]
+    delivered = sum(r.received for r in receivers)
+    events = sum(r.events for r in receivers)
+    last = max((r.last_received_at for r in receivers), default=send_done)
+
+    print(f"url={args.url} clients={args.clients} messages={args.messages} rate={args.rate}/s")
+    print(f"delivered={delivered}/{expected} socket_events={events} "
+          f"messages/event={delivered / max(events, 1):.2f}")
+    print(f"throughput={delivered / max(last - start, 1e-9):.0f} msg/s")
+    if latencies:
+        print(f"latency mean={statistics.mean(latencies):.1f}ms p50={percentile(latencies, 50):.1f}ms "
+              f"p95={percentile(latencies, 95):.1f}ms p99={percentile(latencies, 99):.1f}ms")
+
+    sender.disconnect()
+    for receiver in receivers:
+        receiver.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Chat broadcast benchmark (per-message vs batched)')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--rate', type=float, default=100.0, help='messages per second')
+    parser.add_argument('--drain', type=float, default=10.0, help='seconds to wait for delivery')
+    parser.add_argument('--transports', nargs='+', default=['polling'])
+    run(parser.parse_args())
+
+
+if __name__ == '__main__':
+    main()
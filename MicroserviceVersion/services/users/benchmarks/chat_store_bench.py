@@ -0,0 +1,86 @@
+"""
+Benchmark de los backends de ChatStore (supabase vs sql) lado a lado.
+
+Uso:
+    CHAT_DATABASE_URL=postgresql://... python benchmarks/chat_store_bench.py --backends supabase sql
+    python benchmarks/chat_store_bench.py --backends sql --messages 500
+
+Mide latencia (p50/p95/p99) de insert, lectura de mensajes recientes y
+página keyset para cada backend, usando una sala dedicada al benchmark.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.repositories.chat_store import create_chat_store  # noqa: E402
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def timed(samples, fn):
+    start = time.perf_counter()
+    result = fn()
+    samples.append((time.perf_counter() - start) * 1000)
+    return result
+
+
+def report(backend, operation, samples):
+    print(f"{backend:<10} {operation:<16} n={len(samples):<5} "
+          f"mean={statistics.mean(samples):8.2f}ms p50={percentile(samples, 50):8.2f}ms "
+          f"p95={percentile(samples, 95):8.2f}ms p99={percentile(samples, 99):8.2f}ms")
+
+
+def run_backend(backend, messages, reads):
+    store = create_chat_store(backend)
+    room = f"bench-{uuid.uuid4().hex[:8]}"
+    inserts, recent, keyset = [], [], []
+    inserted_ids = []
+
+    for i in range(messages):
+        row = timed(inserts, lambda: store.insert_message({
+            'user_id': 'bench-user',
+            'username': 'bench',
+            'message': f'benchmark message {i}',
+            'room': room,
+            'timestamp': datetime.utcnow()
+        }))
+        inserted_ids.append(row['id'])
+
+    for _ in range(reads):
+        page = timed(recent, lambda: store.recent_messages(room, 50))
+
+    oldest = page[0]
+    for _ in range(reads):
+        timed(keyset, lambda: store.messages_before(room, oldest['timestamp'], oldest['id'], 20))
+
+    report(backend, 'insert', inserts)
+    report(backend, 'recent(50)', recent)
+    report(backend, 'keyset(20)', keyset)
+
+    for message_id in inserted_ids:
+        store.delete_message(message_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ChatStore backend benchmark')
+    parser.add_argument('--backends', nargs='+', default=['supabase', 'sql'])
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--reads', type=int, default=200)
+    args = parser.parse_args()
+
+    for backend in args.backends:
+        run_backend(backend, args.messages, args.reads)
+
+
+if __name__ == '__main__':
+    main()
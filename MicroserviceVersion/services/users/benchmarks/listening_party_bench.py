@@ -0,0 +1,146 @@
+"""
+Benchmark de listening parties: sincronización de reloj y fan-out de ticks.
+
+Conecta N clientes Socket.IO a una sala. Cada cliente estima su offset con
+el servidor mediante ``clock_sync`` (se queda con la muestra de menor RTT),
+un host inicia la reproducción y los clientes miden, por cada ``party_tick``:
+
+- latencia de entrega: reloj local corregido - server_time del tick
+- error de posición: todos los miembros calculan la posición como
+  position_ms + (server_now - server_time) * rate, así que su error es el
+  del offset estimado. Ejecutando el benchmark en la misma máquina que el
+  servidor (offset real ~0) el |offset| estimado es ese error.
+
+El objetivo es |error| <= 50 ms para todos los miembros.
+
+Sirve para ambos servidores (mismo protocolo de eventos):
+    users service  (websocket_controller.py)  --url http://localhost:5000
+    monolito       (routes/chat.py)           --url http://localhost:5000
+
+    python benchmarks/listening_party_bench.py --url http://localhost:5000 --clients 500 --duration 20
+"""
+import argparse
+import statistics
+import threading
+import time
+import uuid
+
+import socketio
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def now_ms():
+    return time.time() * 1000
+
+
+class Member:
+    def __init__(self, url, room, user_id, transports, sync_rounds):
+        self.room = room
+        self.offset = 0.0
+        self.rtt = None
+        self.state = None
+        self.tick_latencies = []
+        self.ticks_stale = 0
+        self._lock = threading.Lock()
+
+        self.client = socketio.Client(reconnection=False)
+        self.client.on('party_state', self._on_state)
+        self.client.on('party_tick', self._on_tick)
+        self.client.connect(url, transports=transports)
+        self.client.call('join_room', {'user_id': user_id, 'username': f'bench{user_id}', 'room': room},
+                         timeout=10)
+        self.sync_clock(sync_rounds)
+
+    def sync_clock(self, rounds):
+        """offset = ((t1 - t0) + (t2 - t3)) / 2 de la muestra con menor RTT"""
+        best = None
+        for _ in range(rounds):
+            t0 = now_ms()
+            reply = self.client.call('clock_sync', {'t0': t0}, timeout=10)
+            t3 = now_ms()
+            rtt = (t3 - t0) - (reply['t2'] - reply['t1'])
+            offset = ((reply['t1'] - t0) + (reply['t2'] - t3)) / 2
+            if best is None or rtt < best[0]:
+                best = (rtt, offset)
+        self.rtt, self.offset = best
+
+    def server_now(self):
+        return now_ms() + self.offset
+
+    def _on_state(self, state):
+        if state.get('room') == self.room and 'version' in state:
+            self.state = state
+
+    def _on_tick(self, tick):
+        room, version, server_time, _ = tick
+        if room != self.room:
+            return
+        with self._lock:
+            self.tick_latencies.append(self.server_now() - server_time)
+            if not self.state or self.state['version'] != version:
+                self.ticks_stale += 1
+
+    def close(self):
+        self.client.disconnect()
+
+
+def run(args):
+    room = f'party-{uuid.uuid4().hex[:8]}'
+    transports = args.transports
+
+    started = time.time()
+    members = [Member(args.url, room, 20_000 + i, transports, args.sync_rounds) for i in range(args.clients)]
+    print(f"connected+synced {len(members)} clients in {time.time() - started:.1f}s")
+
+    host = members[0]
+    host.client.call('party_start', {
+        'room': room, 'user_id': 20_000, 'song_id': 1, 'position_ms': 0, 'rate': 1.0
+    }, timeout=10)
+
+    time.sleep(args.duration)
+
+    host.client.call('party_control', {'room': room, 'user_id': 20_000, 'action': 'pause'}, timeout=10)
+    time.sleep(0.5)
+
+    offsets = [m.offset for m in members]
+    errors = [abs(offset) for offset in offsets]
+    rtts = [m.rtt for m in members]
+    latencies = [lat for m in members for lat in m.tick_latencies]
+    ticks = [len(m.tick_latencies) for m in members]
+    stale = sum(m.ticks_stale for m in members)
+    within = sum(1 for error in errors if error <= args.target)
+
+    print(f"url={args.url} clients={args.clients} duration={args.duration}s transports={transports}")
+    print(f"clock rtt ms: p50={percentile(rtts, 50):.1f} p99={percentile(rtts, 99):.1f}")
+    print(f"position error ms (|offset|, same host): p50={percentile(errors, 50):.2f} "
+          f"p95={percentile(errors, 95):.2f} p99={percentile(errors, 99):.2f} max={max(errors):.2f} "
+          f"spread={max(offsets) - min(offsets):.2f}")
+    print(f"ticks/client: min={min(ticks)} mean={statistics.mean(ticks):.1f} max={max(ticks)} "
+          f"stale_version={stale}")
+    if latencies:
+        print(f"tick latency ms: p50={percentile(latencies, 50):.1f} p95={percentile(latencies, 95):.1f} "
+              f"p99={percentile(latencies, 99):.1f}")
+    print(f"members within {args.target:.0f}ms: {within}/{len(members)}")
+
+    for member in members:
+        member.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Listening party clock sync and tick fan-out benchmark')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds of playback')
+    parser.add_argument('--sync-rounds', type=int, default=5, help='clock_sync samples per client')
+    parser.add_argument('--target', type=float, default=50.0, help='sync target in ms')
+    parser.add_argument('--transports', nargs='+', default=['polling'])
+    run(parser.parse_args())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark de serializadores Socket.IO: JSON vs MessagePack (timestamps epoch ms).
+
+Uso:
+    python benchmarks/socket_serializer_bench.py
+    python benchmarks/socket_serializer_bench.py --recipients 500 --iterations 5000
+
+Para cada payload típico del chat (new_message, lote new_messages y
+recent_messages) reporta los bytes en el cable por destinatario y por
+broadcast, tanto en websocket como en long-polling (donde los frames binarios
+viajan en base64), y el CPU de codificación por broadcast. El broadcast se
+codifica una sola vez por formato, así que el CPU no depende de los
+destinatarios.
+"""
+import argparse
+import base64
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socketio import packet  # noqa: E402
+
+from app.core.socket_serializer import CompactMsgPackPacket, msgpack_available  # noqa: E402
+
+
+def make_message(i, base=datetime(2024, 1, 1, 12, 0, 0)):
+    return {
+        'id': 100_000 + i,
+        'user_id': f'user-{i % 37}',
+        'username': f'listener{i % 37}',
+        'message': 'que buena canción, alguien sabe el nombre del artista?',
+        'timestamp': (base + timedelta(milliseconds=250 * i)).isoformat(),
+        'room': 'general'
+    }
+
+
+def payloads():
+    batch = [make_message(i) for i in range(20)]
+    recent = [make_message(i) for i in range(50)]
+    return {
+        'new_message': ['new_message', make_message(0)],
+        'new_messages(20)': ['new_messages', {'room': 'general', 'messages': batch, 'missed': 0}],
+        'recent_messages(50)': ['recent_messages', {'messages': recent}]
+    }
+
+
+def wire_sizes(encoded):
+    """Bytes de un paquete Engine.IO MESSAGE en websocket y en polling"""
+    if isinstance(encoded, bytes):
+        return len(encoded), 1 + len(base64.b64encode(encoded))  # 'b' + base64
+    raw = len(encoded.encode('utf-8'))
+    return 1 + raw, 1 + raw  # tipo '4' de Engine.IO
+
+
+def encode_cpu_us(make_packet, iterations):
+    start = time.process_time()
+    for _ in range(iterations):
+        make_packet().encode()
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Socket.IO serializer benchmark')
+    parser.add_argument('--recipients', type=int, default=200)
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    if not msgpack_available():
+        sys.exit('msgpack is not installed')
+
+    serializers = {
+        'json': lambda data: packet.Packet(packet.EVENT, namespace='/', data=data),
+        'msgpack': lambda data: CompactMsgPackPacket(packet.EVENT, namespace='/', data=data)
+    }
+
+    print(f"recipients={args.recipients} iterations={args.iterations}")
+    print(f"{'payload':<22} {'format':<8} {'ws B':>7} {'poll B':>7} "
+          f"{'ws KB/bcast':>12} {'poll KB/bcast':>14} {'encode us':>10}")
+    for name, data in payloads().items():
+        for serializer, make in serializers.items():
+            ws, poll = wire_sizes(make(data).encode())
+            cpu = encode_cpu_us(lambda: make(data), args.iterations)
+            print(f"{name:<22} {serializer:<8} {ws:>7} {poll:>7} "
+                  f"{ws * args.recipients / 1024:>12.1f} {poll * args.recipients / 1024:>14.1f} "
+                  f"{cpu:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
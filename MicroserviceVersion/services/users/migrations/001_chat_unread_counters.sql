@@ -0,0 +1,19 @@
+-- Contadores de mensajes por sala y marcadores de lectura por usuario
+-- Ejecutar en el SQL editor de Supabase (o en la base de CHAT_DATABASE_URL)
+
+CREATE TABLE IF NOT EXISTS chat_room_counters (
+    room VARCHAR(50) PRIMARY KEY,
+    message_count BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS chat_read_markers (
+    user_id VARCHAR(64) NOT NULL,
+    room VARCHAR(50) NOT NULL,
+    last_read_seq BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, room)
+);
+
+-- Mensaje de confirmación
+SELECT 'Migración completada: tablas de no leídos creadas' AS result;
@@ -0,0 +1,122 @@
+-- Particionar chat_messages por mes (RANGE sobre timestamp) con retención
+-- Ejecutar en el SQL editor de Supabase (o en la base de CHAT_DATABASE_URL)
+-- con el servicio detenido. Requiere Postgres 11+.
+
+BEGIN;
+
+ALTER TABLE chat_messages RENAME TO chat_messages_legacy;
+
+-- La PK de una tabla particionada debe incluir la clave de partición
+CREATE TABLE chat_messages (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY,
+    user_id VARCHAR(64) NOT NULL,
+    username VARCHAR(100),
+    message TEXT NOT NULL,
+    room VARCHAR(50) NOT NULL DEFAULT 'general',
+    timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+-- Se propaga a cada partición: WHERE room = ? ORDER BY timestamp DESC, id DESC
+CREATE INDEX IF NOT EXISTS ix_chat_messages_room_timestamp_id
+    ON chat_messages (room, timestamp, id);
+
+-- Crea el mes actual y los months_ahead siguientes; desvincula los meses
+-- anteriores a retention_months y los borra (o los renombra a
+-- chat_messages_archive_yYYYYmMM si archive). Sin DELETE masivos.
+-- El servicio la invoca por RPC (SupabaseChatStore.maintain_partitions).
+CREATE OR REPLACE FUNCTION chat_messages_maintain(
+    months_ahead INTEGER DEFAULT 2,
+    retention_months INTEGER DEFAULT 0,
+    archive BOOLEAN DEFAULT FALSE
+) RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    current_month DATE := date_trunc('month', CURRENT_TIMESTAMP)::date;
+    month DATE;
+    part RECORD;
+    created TEXT[] := '{}';
+    expired TEXT[] := '{}';
+BEGIN
+    FOR i IN 0..months_ahead LOOP
+        month := (current_month + i * INTERVAL '1 month')::date;
+        IF to_regclass('chat_messages_y' || to_char(month, 'YYYY') || 'm' || to_char(month, 'MM')) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF chat_messages FOR VALUES FROM (%L) TO (%L)',
+                'chat_messages_y' || to_char(month, 'YYYY') || 'm' || to_char(month, 'MM'),
+                month, (month + INTERVAL '1 month')::date
+            );
+            created := created || ('chat_messages_y' || to_char(month, 'YYYY') || 'm' || to_char(month, 'MM'));
+        END IF;
+    END LOOP;
+
+    IF retention_months > 0 THEN
+        FOR part IN
+            SELECT child.relname AS name,
+                   to_date(substring(child.relname FROM 'y(\d{4})m(\d{2})$'), 'YYYYMM') AS month
+            FROM pg_inherits i
+            JOIN pg_class parent ON parent.oid = i.inhparent
+            JOIN pg_class child ON child.oid = i.inhrelid
+            WHERE parent.relname = 'chat_messages'
+              AND child.relname ~ '^chat_messages_y\d{4}m\d{2}$'
+            ORDER BY 2
+        LOOP
+            EXIT WHEN part.month + INTERVAL '1 month' > current_month - retention_months * INTERVAL '1 month';
+            EXECUTE format('ALTER TABLE chat_messages DETACH PARTITION %I', part.name);
+            IF archive THEN
+                EXECUTE format('ALTER TABLE %I RENAME TO %I', part.name,
+                               replace(part.name, 'chat_messages_', 'chat_messages_archive_'));
+            ELSE
+                EXECUTE format('DROP TABLE %I', part.name);
+            END IF;
+            expired := expired || part.name::TEXT;
+        END LOOP;
+    END IF;
+
+    RETURN jsonb_build_object('created', to_jsonb(created), 'expired', to_jsonb(expired));
+END;
+$$;
+
+-- Particiones desde el mensaje más antiguo hasta dos meses adelante
+DO $$
+DECLARE
+    month DATE := date_trunc('month', COALESCE(
+        (SELECT MIN(timestamp) FROM chat_messages_legacy), CURRENT_TIMESTAMP))::date;
+BEGIN
+    WHILE month < date_trunc('month', CURRENT_TIMESTAMP)::date LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF chat_messages FOR VALUES FROM (%L) TO (%L)',
+            'chat_messages_y' || to_char(month, 'YYYY') || 'm' || to_char(month, 'MM'),
+            month, (month + INTERVAL '1 month')::date
+        );
+        month := (month + INTERVAL '1 month')::date;
+    END LOOP;
+END $$;
+
+SELECT chat_messages_maintain(2, 0, FALSE);
+
+INSERT INTO chat_messages (id, user_id, username, message, room, timestamp)
+SELECT id, user_id, username, message, COALESCE(room, 'general'), COALESCE(timestamp, CURRENT_TIMESTAMP)
+FROM chat_messages_legacy;
+
+SELECT setval(pg_get_serial_sequence('chat_messages', 'id'),
+              COALESCE((SELECT MAX(id) FROM chat_messages), 0) + 1, false);
+
+DROP TABLE chat_messages_legacy;
+
+COMMIT;
+
+ANALYZE chat_messages;
+
+-- Con pg_cron (Supabase: Database > Extensions) el mantenimiento corre en la base:
+-- SELECT cron.schedule('chat-partitions', '0 3 * * *',
+--                      'SELECT chat_messages_maintain(2, 12, FALSE)');
+
+-- Comprobar la poda (solo las particiones recientes deben ejecutarse):
+-- EXPLAIN (ANALYZE, COSTS OFF)
+-- SELECT * FROM chat_messages WHERE room = 'general' ORDER BY timestamp DESC, id DESC LIMIT 50;
+
+-- Mensaje de confirmación
+SELECT 'Migración completada: chat_messages particionada por mes' AS result;
@@ -0,0 +1,53 @@
+-- Búsqueda de texto en el chat: índice GIN sobre tsvector y función RPC
+-- Ejecutar en el SQL editor de Supabase (o en la base de CHAT_DATABASE_URL)
+
+-- Sobre la tabla particionada el índice se crea en cada partición.
+-- La expresión debe coincidir exactamente con la de las consultas.
+CREATE INDEX IF NOT EXISTS ix_chat_messages_message_fts
+    ON chat_messages USING gin (to_tsvector('simple'::regconfig, message));
+
+-- Búsqueda por sala, más recientes primero, paginada por (timestamp, id).
+-- ts_headline se calcula solo para las filas de la página; los aciertos
+-- vienen entre chr(2) y chr(3) y el servicio los convierte en <mark>.
+CREATE OR REPLACE FUNCTION chat_search_messages(
+    search_room TEXT,
+    search_query TEXT,
+    before_ts TIMESTAMP DEFAULT NULL,
+    before_id BIGINT DEFAULT NULL,
+    max_rows INTEGER DEFAULT 20
+) RETURNS TABLE (
+    id BIGINT,
+    user_id VARCHAR,
+    username VARCHAR,
+    message TEXT,
+    room VARCHAR,
+    "timestamp" TIMESTAMP,
+    headline TEXT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH query AS (
+        SELECT websearch_to_tsquery('simple'::regconfig, search_query) AS q
+    ), page AS (
+        SELECT m.*
+        FROM chat_messages m, query
+        WHERE m.room = search_room
+          AND to_tsvector('simple'::regconfig, m.message) @@ query.q
+          AND (before_ts IS NULL
+               OR m.timestamp < before_ts
+               OR (m.timestamp = before_ts AND m.id < before_id))
+        ORDER BY m.timestamp DESC, m.id DESC
+        LIMIT LEAST(GREATEST(max_rows, 1), 101)
+    )
+    SELECT page.id::BIGINT, page.user_id::VARCHAR, page.username::VARCHAR, page.message::TEXT,
+           page.room::VARCHAR, page.timestamp::TIMESTAMP,
+           ts_headline('simple'::regconfig, page.message, query.q,
+                       'StartSel=' || chr(2) || ', StopSel=' || chr(3) ||
+                       ', MaxWords=30, MinWords=10, MaxFragments=2')
+    FROM page, query
+    ORDER BY page.timestamp DESC, page.id DESC;
+$$;
+
+-- Mensaje de confirmación
+SELECT 'Migración completada: búsqueda de mensajes del chat' AS result;
@@ -0,0 +1,32 @@
+-- Contadores de no leídos con varios workers: cada uno suma sus incrementos
+-- y los marcadores de lectura solo avanzan
+-- Ejecutar en el SQL editor de Supabase (o en la base de CHAT_DATABASE_URL)
+
+-- deltas: {"sala": mensajes contados desde el último flush, ...}
+CREATE OR REPLACE FUNCTION chat_increment_room_counters(deltas JSONB)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    INSERT INTO chat_room_counters (room, message_count, updated_at)
+    SELECT key, value::BIGINT, CURRENT_TIMESTAMP
+    FROM jsonb_each_text(deltas)
+    ON CONFLICT (room) DO UPDATE
+        SET message_count = chat_room_counters.message_count + EXCLUDED.message_count,
+            updated_at = EXCLUDED.updated_at;
+$$;
+
+-- markers: [{"user_id": ..., "room": ..., "last_read_seq": ...}, ...]
+CREATE OR REPLACE FUNCTION chat_advance_read_markers(markers JSONB)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    INSERT INTO chat_read_markers (user_id, room, last_read_seq, updated_at)
+    SELECT m.user_id, m.room, m.last_read_seq, CURRENT_TIMESTAMP
+    FROM jsonb_to_recordset(markers) AS m(user_id VARCHAR, room VARCHAR, last_read_seq BIGINT)
+    ON CONFLICT (user_id, room) DO UPDATE
+        SET last_read_seq = GREATEST(chat_read_markers.last_read_seq, EXCLUDED.last_read_seq),
+            updated_at = EXCLUDED.updated_at;
+$$;
+
+-- Mensaje de confirmación
+SELECT 'Migración completada: funciones de contadores incrementales creadas' AS result;
@@ -1,4 +1,5 @@
-from flask import Flask, jsonify, send_file
+from flask import Flask, jsonify
+from werkzeug.exceptions import NotFound
 from flask_cors import CORS
 from flask_socketio import SocketIO
 from dotenv import load_dotenv
@@ -7,6 +8,23 @@ from app.routes.users import users_bp
 from app.routes.music import music_bp
 from app.routes.favorites import favorites_bp
 from app.routes.chat import chat_bp
+from app.services.room_batcher import room_batcher
+from app.services.unread_tracker import unread_tracker
+from app.services.chat_partitions import chat_partitions
+from app.services.listening_party import listening_party
+from app.services.catalog_cache import catalog_cache
+from app.utils.single_flight import catalog_flight
+from app.utils.json_provider import FastJSONProvider
+from app.utils.streaming import collection_streamer
+from app.utils.compression import response_compressor, static_assets
+from app.utils.media import media_sender
+from app.services.content_store import content_store
+from app.services.upload_sessions import upload_sessions
+from app.services.catalog_sync import catalog_sync
+from app.services.catalog_events import catalog_events
+from app.utils.socket_serializer import (
+    AdaptivePacket, NegotiatingManager, install_negotiated_serializer
+)
 from app.models.database import db
 # Load environment variables
 load_dotenv()
@@ -16,6 +34,8 @@ def create_app():
     static_folder = os.path.join(os.path.dirname(
         __file__), 'app', 'static', 'browser')
     app = Flask(__name__, static_folder=static_folder, static_url_path='')
+    # JSON con orjson (mismo formato que el proveedor por defecto de Flask)
+    app.json = FastJSONProvider(app)
 
     # Configuration
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
@@ -47,8 +67,72 @@ def create_app():
                         engineio_logger=False,
                         transports=['polling'],
                         ping_timeout=60,
-                        ping_interval=25
+                        ping_interval=25,
+                        # JSON por defecto, MessagePack negociado por cliente
+                        serializer=AdaptivePacket,
+                        client_manager=NegotiatingManager(
+                            allow_msgpack=os.getenv('CHAT_SOCKET_MSGPACK', 'true').lower() == 'true')
                         )
+    install_negotiated_serializer(socketio)
+
+    # Micro-batching de broadcasts del chat (0 desactiva)
+    room_batcher.init_app(socketio,
+                          window_ms=int(os.getenv('CHAT_BATCH_WINDOW_MS', '15')),
+                          max_batch=int(os.getenv('CHAT_BATCH_MAX_SIZE', '100')))
+
+    # Contadores de no leídos (persistencia periódica)
+    unread_tracker.init_app(app, socketio,
+                            flush_interval=float(os.getenv('CHAT_UNREAD_FLUSH_INTERVAL', '5')))
+
+    # Listening parties: ticks de corrección de deriva (segundos)
+    listening_party.init_app(socketio,
+                             tick_interval=float(os.getenv('CHAT_PARTY_TICK_INTERVAL', '1')))
+
+    # Particiones mensuales de chat_messages y retención (0 meses = conservar todo)
+    chat_partitions.init_app(app, socketio,
+                             months_ahead=int(os.getenv('CHAT_PARTITION_MONTHS_AHEAD', '2')),
+                             retention_months=int(os.getenv('CHAT_RETENTION_MONTHS', '0')),
+                             archive=os.getenv('CHAT_RETENTION_MODE', 'drop').lower() == 'archive',
+                             maintenance_interval=float(os.getenv('CHAT_PARTITION_MAINTENANCE_INTERVAL', '21600')))
+
+    # Caché de respuestas del catálogo (0 entradas desactiva; Redis opcional para compartir entre workers)
+    catalog_cache.init_app(app,
+                           max_entries=int(os.getenv('CATALOG_CACHE_MAX_ENTRIES', '512')),
+                           ttl=int(os.getenv('CATALOG_CACHE_TTL', '300')),
+                           redis_url=os.getenv('CATALOG_CACHE_REDIS_URL'))
+    # Consultas idénticas concurrentes comparten una sola ejecución (segundos de espera máxima)
+    catalog_flight.init_app(timeout=float(os.getenv('CATALOG_SINGLE_FLIGHT_TIMEOUT', '10')))
+    # Listados: por encima del umbral (o con NDJSON) se transmiten por lotes con cursor de servidor
+    collection_streamer.init_app(threshold=int(os.getenv('LIST_STREAM_THRESHOLD', '2000')),
+                                 batch_size=int(os.getenv('LIST_STREAM_BATCH_SIZE', '500')))
+    # Sincronización incremental: margen para transacciones lentas y días de tombstones
+    catalog_sync.init_app(lag_seconds=float(os.getenv('CATALOG_SYNC_LAG_SECONDS', '5')),
+                          retention_days=int(os.getenv('CATALOG_TOMBSTONE_RETENTION_DAYS', '30')))
+    # Feed SSE de cambios (/api/music/events): eventos recientes en memoria para Last-Event-ID
+    catalog_events.init_app(app, socketio,
+                            ring_size=int(os.getenv('CATALOG_EVENTS_RING_SIZE', '1000')),
+                            poll_interval=float(os.getenv('CATALOG_EVENTS_POLL_INTERVAL', '2')),
+                            retention_hours=int(os.getenv('CATALOG_EVENTS_RETENTION_HOURS', '24')))
+    # Compresión gzip/brotli de respuestas JSON; el bundle de Angular se sirve precomprimido
+    response_compressor.init_app(app,
+                                 min_size=int(os.getenv('COMPRESSION_MIN_SIZE', '1024')),
+                                 gzip_level=int(os.getenv('COMPRESSION_GZIP_LEVEL', '6')),
+                                 brotli_quality=int(os.getenv('COMPRESSION_BROTLI_QUALITY', '4')))
+    static_assets.init_app(app)
+
+    # Archivos de audio: rangos, peticiones condicionales y envío sin copia (o X-Accel-Redirect)
+    media_sender.init_app(max_ranges=int(os.getenv('ASSET_MAX_RANGES', '8')),
+                          max_age=int(os.getenv('ASSET_CACHE_MAX_AGE', '3600')),
+                          accel_prefix=os.getenv('ASSET_ACCEL_REDIRECT_PREFIX'))
+
+    # Subidas en streaming al almacén por contenido (UPLOAD_FOLDER/ab/cd/<sha256>.<ext>)
+    content_store.init_app(app)
+
+    # Subidas reanudables por partes: caducidad de sesiones inactivas y tamaño máximo del archivo
+    upload_sessions.init_app(app, socketio,
+                             ttl=int(os.getenv('UPLOAD_SESSION_TTL', '86400')),
+                             max_size=int(os.getenv('UPLOAD_SESSION_MAX_SIZE', str(1024 * 1024 * 1024))),
+                             sweep_interval=float(os.getenv('UPLOAD_SESSION_SWEEP_INTERVAL', '3600')))
 
     app.register_blueprint(users_bp, url_prefix='/api/users')
     app.register_blueprint(music_bp, url_prefix='/api/music')
@@ -59,7 +143,8 @@ def create_app():
     from app.routes.chat import (
         handle_connect, handle_disconnect, handle_join_room,
         handle_leave_room, handle_send_message, handle_get_message_history,
-        handle_typing
+        handle_typing, handle_get_unread, handle_mark_read, handle_clock_sync,
+        handle_party_start, handle_party_control, handle_party_stop, handle_party_state
     )
 
     socketio.on_event('connect', handle_connect)
@@ -69,10 +154,19 @@ def create_app():
     socketio.on_event('send_message', handle_send_message)
     socketio.on_event('get_message_history', handle_get_message_history)
     socketio.on_event('typing', handle_typing)
+    socketio.on_event('get_unread', handle_get_unread)
+    socketio.on_event('mark_read', handle_mark_read)
+    socketio.on_event('clock_sync', handle_clock_sync)
+    socketio.on_event('party_start', handle_party_start)
+    socketio.on_event('party_control', handle_party_control)
+    socketio.on_event('party_stop', handle_party_stop)
+    socketio.on_event('party_state', handle_party_state)
 
     # Create database tables
     with app.app_context():
         db.create_all()
+        if chat_partitions.prepare():
+            chat_partitions.start()
 
     # Health check endpoint
     @app.route('/api/health')
@@ -88,8 +182,8 @@ def create_app():
     @app.route('/')
     def root():
         try:
-            return send_file(os.path.join(app.static_folder, 'index.html'))
-        except (FileNotFoundError, TypeError, AttributeError):
+            return static_assets.send('index.html')
+        except (NotFound, TypeError, AttributeError):
             return jsonify({
                 'message': 'Frontend not built yet. Run "ng build" in fronted folder.',
                 'status': 'warning',
@@ -110,18 +204,8 @@ def create_app():
             else:
                 upload_path = upload_folder
 
-            file_path = os.path.join(upload_path, filename)
-
-            # Verificar que el archivo existe
-            if not os.path.exists(file_path):
-                return jsonify({
-                    'success': False,
-                    'message': f'Asset file not found: {filename}',
-                    'error_code': 'ASSET_FILE_NOT_FOUND'
-                }), 404
-
-            return send_file(file_path)
-        except FileNotFoundError:
+            return media_sender.send(upload_path, filename)
+        except (NotFound, FileNotFoundError):
             return jsonify({
                 'success': False,
                 'message': f'Asset file not found: {filename}',
@@ -135,6 +219,11 @@ def create_app():
                 'error_code': 'ASSET_SERVE_ERROR'
             }), 500
 
+    @app.route('/api/assets/stats')
+    def asset_stats():
+        """Requests and bytes served per audio format and kind (full, partial, multipart, accel)"""
+        return jsonify({'success': True, 'data': media_sender.stats()})
+
     # Error handlers
     @app.errorhandler(404)
     def not_found(error):
@@ -28,6 +28,10 @@ class User(db.Model):
 
 class Song(db.Model):
     __tablename__ = 'songs'
+    # Sincronización incremental (/songs/changes): keyset sobre (updated_at, id)
+    __table_args__ = (
+        db.Index('ix_songs_updated_at_id', 'updated_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)          # "name" del JSON
@@ -45,7 +49,10 @@ class Song(db.Model):
     # Relationships
     favorited_by = db.relationship('FavoriteSong', backref='song', lazy=True, cascade='all, delete-orphan')
     
-    def to_dict(self):
+    def to_dict(self, fields=None):
+        if fields is not None:
+            # Proyección (?fields=): solo se leen esos atributos, el resto puede estar diferido
+            return {name: self._json_value(getattr(self, name)) for name in fields}
         return {
             'id': self.id,
             'title': self.title,
@@ -61,6 +68,10 @@ class Song(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+    @staticmethod
+    def _json_value(value):
+        return value.isoformat() if isinstance(value, datetime) else value
+
 class FavoriteSong(db.Model):
     __tablename__ = 'favorite_songs'
     
@@ -72,17 +83,57 @@ class FavoriteSong(db.Model):
     # Constraint para evitar duplicados
     __table_args__ = (db.UniqueConstraint('user_id', 'song_id', name='unique_user_song'),)
     
-    def to_dict(self):
+    def to_dict(self, song_fields=None):
         return {
             'id': self.id,
             'user_id': self.user_id,
             'song_id': self.song_id,
             'added_at': self.added_at.isoformat() if self.added_at else None,
-            'song': self.song.to_dict() if self.song else None
+            'song': self.song.to_dict(song_fields) if self.song else None
         }
 
+class StoredFile(db.Model):
+    __tablename__ = 'stored_files'
+    # Audio direccionado por contenido (ver app/services/content_store.py): las canciones
+    # con el mismo contenido comparten el archivo y ref_count cuenta cuántas lo usan
+    
+    path = db.Column(db.String(255), primary_key=True)    # ab/cd/<sha256>.mp3, relativo a UPLOAD_FOLDER
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class SongTombstone(db.Model):
+    __tablename__ = 'song_tombstones'
+    # Registro de canciones eliminadas para /songs/changes (se purga tras la retención)
+    __table_args__ = (
+        db.Index('ix_song_tombstones_deleted_at_id', 'deleted_at', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    song_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class CatalogEvent(db.Model):
+    __tablename__ = 'catalog_events'
+    # Feed de cambios (SSE /api/music/events): se escribe en la misma transacción que el cambio
+    __table_args__ = (
+        db.Index('ix_catalog_events_created_at', 'created_at'),
+    )
+    
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    event = db.Column(db.String(32), nullable=False)     # song.created, favorite.added, ...
+    user_id = db.Column(db.Integer, nullable=True)        # solo eventos de favoritos
+    payload = db.Column(db.Text, nullable=False)          # JSON
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
 class ChatMessage(db.Model):
     __tablename__ = 'chat_messages'
+    # En PostgreSQL la tabla está particionada por mes en timestamp y su PK real
+    # es (id, timestamp); ver app/services/chat_partitions.py
+    __table_args__ = (
+        db.Index('ix_chat_messages_room_timestamp_id', 'room', 'timestamp', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -99,3 +150,25 @@ class ChatMessage(db.Model):
             'timestamp': self.timestamp.isoformat() if self.timestamp else None,
             'room': self.room
         }
+
+class ChatRoomCounter(db.Model):
+    __tablename__ = 'chat_room_counters'
+    
+    room = db.Column(db.String(50), primary_key=True)
+    message_count = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ChatReadMarker(db.Model):
+    __tablename__ = 'chat_read_markers'
+    
+    user_id = db.Column(db.Integer, primary_key=True)
+    room = db.Column(db.String(50), primary_key=True)
+    last_read_seq = db.Column(db.BigInteger, nullable=False, default=0)  # message_count de la sala al leer
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ResourceVersion(db.Model):
+    __tablename__ = 'resource_versions'
+    
+    scope = db.Column(db.String(64), primary_key=True)  # 'catalog' o 'favorites:<user_id>'
+    version = db.Column(db.BigInteger, nullable=False, default=0)  # se incrementa en cada escritura
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
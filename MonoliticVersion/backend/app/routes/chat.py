@@ -1,9 +1,12 @@
-from flask import Blueprint, request
+from flask import Blueprint, request, current_app
 from flask_socketio import emit, join_room, leave_room, disconnect
 from werkzeug.security import generate_password_hash
 from app.services.chat_service import ChatService
+from app.services.room_batcher import room_batcher
+from app.services.listening_party import listening_party, server_time_ms
 from app.models.database import db, User
 from app.utils.responses import ApiResponse
+from app.utils.socket_serializer import socket_config
 import logging
 
 chat_bp = Blueprint('chat', __name__)
@@ -76,10 +79,19 @@ def handle_join_room(data):
         
         # Get recent messages for the room
         recent_messages = ChatService.get_recent_messages(room)
+        try:
+            ChatService.mark_room_read(user_id, room)
+        except Exception as e:
+            print(f'⚠️ Could not mark room {room} as read: {str(e)}')
         
         # Send recent messages to the user
         emit('recent_messages', {'messages': recent_messages})
         
+        # Sincronizar al recién llegado con la listening party en curso
+        party = listening_party.state(room)
+        if party:
+            emit('party_state', party)
+        
         # Notify others in the room
         emit('user_joined', {
             'user_id': user_id,
@@ -166,7 +178,7 @@ def handle_send_message(data):
             'room': room
         }
         
-        emit('new_message', message_data, room=room)
+        room_batcher.add(room, message_data)
         print(f'💬 Message sent in room {room} by {user.username if hasattr(user, "username") else f"User_{user_id}"}: {message_text}')
         
     except Exception as e:
@@ -187,6 +199,36 @@ def handle_get_message_history(data):
         print(f'Error getting message history: {str(e)}')
         emit('error', {'message': 'Failed to get message history'})
 
+def handle_get_unread(data):
+    """Handle request for unread counts across rooms"""
+    try:
+        user_id = data.get('user_id')
+        if not user_id:
+            emit('error', {'message': 'User ID is required'})
+            return
+        
+        emit('unread_counts', ChatService.get_unread_counts(user_id))
+        
+    except Exception as e:
+        print(f'❌ Error getting unread counts: {str(e)}')
+        emit('error', {'message': 'Failed to get unread counts'})
+
+def handle_mark_read(data):
+    """Handle a client marking a room as read"""
+    try:
+        user_id = data.get('user_id')
+        room = data.get('room', 'general')
+        if not user_id:
+            emit('error', {'message': 'User ID is required'})
+            return
+        
+        last_read_seq = ChatService.mark_room_read(user_id, room)
+        return {'room': room, 'last_read_seq': last_read_seq, 'unread': 0}
+        
+    except Exception as e:
+        print(f'❌ Error marking room as read: {str(e)}')
+        emit('error', {'message': 'Failed to mark room as read'})
+
 def handle_typing(data):
     """Handle typing indicator"""
     try:
@@ -206,6 +248,73 @@ def handle_typing(data):
     except Exception as e:
         print(f'❌ Error in typing handler: {str(e)}')
 
+def handle_clock_sync(data):
+    """NTP-style clock handshake; replies through the ack with (t0, t1, t2)"""
+    received_at = server_time_ms()
+    return listening_party.clock_sync((data or {}).get('t0'), received_at)
+
+def handle_party_start(data):
+    """Start (or restart) a synchronized playback session in a room"""
+    try:
+        room = data.get('room', 'general')
+        user_id = data.get('user_id')
+        if not user_id:
+            emit('error', {'message': 'User ID is required'})
+            return
+        
+        state = listening_party.start(room, user_id, data.get('song_id'),
+                                      position_ms=data.get('position_ms', 0),
+                                      rate=data.get('rate', 1.0),
+                                      paused=data.get('paused', False))
+        emit('party_state', state, room=room)
+        return {'status': 'ok', 'state': state}
+    except (ValueError, PermissionError) as e:
+        emit('error', {'message': str(e)})
+        return {'status': 'error', 'message': str(e)}
+    except Exception as e:
+        print(f'❌ Error starting listening party: {str(e)}')
+        emit('error', {'message': 'Failed to start listening party'})
+
+def handle_party_control(data):
+    """Host playback command: play, pause, seek, rate, song or host"""
+    try:
+        room = data.get('room', 'general')
+        state = listening_party.control(room, data.get('user_id'), data.get('action'), data)
+        emit('party_state', state, room=room)
+        return {'status': 'ok', 'state': state}
+    except (ValueError, PermissionError) as e:
+        emit('error', {'message': str(e)})
+        return {'status': 'error', 'message': str(e)}
+    except Exception as e:
+        print(f'❌ Error in party_control: {str(e)}')
+        emit('error', {'message': 'Failed to update listening party'})
+
+def handle_party_stop(data):
+    """End the listening party of a room (host only)"""
+    try:
+        room = data.get('room', 'general')
+        user_id = data.get('user_id')
+        if not user_id:
+            emit('error', {'message': 'User ID is required'})
+            return
+        
+        if listening_party.stop(room, user_id):
+            emit('party_ended', {'room': room}, room=room)
+        return {'status': 'ok'}
+    except PermissionError as e:
+        emit('error', {'message': str(e)})
+        return {'status': 'error', 'message': str(e)}
+    except Exception as e:
+        print(f'❌ Error in party_stop: {str(e)}')
+        emit('error', {'message': 'Failed to stop listening party'})
+
+def handle_party_state(data):
+    """Current playback state of a room (also returned through the ack)"""
+    room = (data or {}).get('room', 'general')
+    state = listening_party.state(room)
+    emit('party_state', state or {'room': room, 'active': False})
+    return state
+
 # REST API endpoints for chat
 @chat_bp.route('/rooms', methods=['GET'])
 def get_active_rooms():
@@ -216,6 +325,54 @@ def get_active_rooms():
     except Exception as e:
         return ApiResponse.server_error('Failed to get rooms')
 
+@chat_bp.route('/rooms/<room>/search', methods=['GET'])
+def search_room_messages(room):
+    """Full-text search in a room: ?q=<text>&limit=20&cursor=<next_cursor>"""
+    try:
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 50)
+        result = ChatService.search_messages(room, request.args.get('q', ''),
+                                             request.args.get('cursor') or None, limit)
+        return ApiResponse.success(result)
+    except ValueError as e:
+        return ApiResponse.validation_error(str(e))
+    except Exception as e:
+        return ApiResponse.server_error('Failed to search messages')
+
+@chat_bp.route('/unread', methods=['GET'])
+def get_unread_counts():
+    """Get unread message counts per room for a user"""
+    try:
+        user_id = request.args.get('user_id', type=int)
+        if not user_id:
+            return ApiResponse.validation_error('User ID is required')
+        
+        return ApiResponse.success(ChatService.get_unread_counts(user_id))
+    except Exception as e:
+        return ApiResponse.server_error('Failed to get unread counts')
+
+@chat_bp.route('/rooms/<room>/read', methods=['POST'])
+def mark_room_read(room):
+    """Mark all messages of a room as read"""
+    try:
+        data = request.get_json(silent=True) or {}
+        user_id = data.get('user_id')
+        if not user_id:
+            return ApiResponse.validation_error('User ID is required')
+        
+        last_read_seq = ChatService.mark_room_read(user_id, room)
+        return ApiResponse.success({'room': room, 'last_read_seq': last_read_seq, 'unread': 0})
+    except Exception as e:
+        return ApiResponse.server_error('Failed to mark room as read')
+
+@chat_bp.route('/socket-config', methods=['GET'])
+def get_socket_config():
+    """Socket.IO serializers a client may negotiate before connecting"""
+    try:
+        socketio = current_app.extensions['socketio']
+        return ApiResponse.success(socket_config(socketio.server.manager))
+    except Exception as e:
+        return ApiResponse.server_error('Failed to get socket config')
+
 @chat_bp.route('/debug', methods=['GET'])
 def debug_websocket():
     """Debug endpoint for WebSocket status"""
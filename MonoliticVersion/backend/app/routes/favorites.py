@@ -1,21 +1,38 @@
 from flask import Blueprint, request, jsonify
 from app.models.database import db, User, Song, FavoriteSong
 from app.utils.responses import ApiResponse
+from app.utils.projection import selected_columns
+from app.services.resource_versions import resource_versions
+from app.services.catalog_events import catalog_events
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 
 favorites_bp = Blueprint('favorites', __name__)
 
 @favorites_bp.route('/user/<int:user_id>', methods=['GET'])
+# La respuesta incluye los datos de cada canción: depende también del catálogo
+@resource_versions.conditional(
+    lambda user_id: [resource_versions.favorites(user_id), resource_versions.CATALOG], private=True)
 def get_user_favorites(user_id):
-    """Get all favorite songs for a user"""
+    """Get all favorite songs for a user (?fields= limits the song fields)"""
+    fields = request.args.get('fields')
+    try:
+        song_columns = selected_columns(Song.__table__.columns, fields)
+    except ValueError as e:
+        return ApiResponse.validation_error(str(e))
+    song_fields = [column.key for column in song_columns] if fields else None
+
     try:
         user = User.query.get_or_404(user_id)
-        favorites = FavoriteSong.query.filter_by(user_id=user_id).order_by(FavoriteSong.added_at.desc()).all()
+        # Canciones en la misma consulta (sin N+1) y solo con las columnas pedidas
+        favorites = FavoriteSong.query.filter_by(user_id=user_id)\
+            .options(joinedload(FavoriteSong.song).load_only(*[getattr(Song, column.key) for column in song_columns]))\
+            .order_by(FavoriteSong.added_at.desc()).all()
         
         return ApiResponse.success({
             'user_id': user_id,
             'email': user.email,
-            'favorites': [favorite.to_dict() for favorite in favorites],
+            'favorites': [favorite.to_dict(song_fields) for favorite in favorites],
             'total_favorites': len(favorites)
         })
     except Exception as e:
@@ -37,6 +54,13 @@ def add_favorite(user_id, song_id):
         # Crear nuevo favorito
         favorite = FavoriteSong(user_id=user_id, song_id=song_id)
         db.session.add(favorite)
+        db.session.flush()
+        catalog_events.record('favorite.added', {
+            'user_id': user_id,
+            'song_id': song_id,
+            'added_at': favorite.added_at.isoformat() if favorite.added_at else None
+        }, user_id=user_id)
+        resource_versions.bump(resource_versions.favorites(user_id))
         db.session.commit()
         
         return ApiResponse.success({
@@ -61,6 +85,8 @@ def remove_favorite(user_id, song_id):
             return ApiResponse.error("Song not found in favorites", 404)
         
         db.session.delete(favorite)
+        catalog_events.record('favorite.removed', {'user_id': user_id, 'song_id': song_id}, user_id=user_id)
+        resource_versions.bump(resource_versions.favorites(user_id))
         db.session.commit()
         
         return ApiResponse.success({
@@ -74,6 +100,9 @@ def remove_favorite(user_id, song_id):
         return ApiResponse.error(f"Error removing favorite: {str(e)}", 500)
 
 @favorites_bp.route('/user/<int:user_id>/song/<int:song_id>/check', methods=['GET'])
+# Borrar una canción elimina sus favoritos en cascada: depende también del catálogo
+@resource_versions.conditional(
+    lambda user_id, song_id: [resource_versions.favorites(user_id), resource_versions.CATALOG], private=True)
 def check_favorite(user_id, song_id):
     """Check if a song is in user's favorites"""
     try:
@@ -1,19 +1,30 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app
 from app.models.database import db, Song
 from app.services.music_service import MusicService
+from app.services.catalog_cache import catalog_cache
+from app.services.resource_versions import resource_versions
+from app.services.catalog_sync import catalog_sync
+from app.services.catalog_events import catalog_events
+from app.services.content_store import content_store
+from app.services.upload_sessions import upload_sessions, UploadSessionError
 from app.utils.responses import ApiResponse
+from app.utils.single_flight import catalog_flight
+from app.utils.streaming import collection_streamer
 from sqlalchemy import or_
-import os
+from datetime import datetime
+from werkzeug.http import http_date
 
 music_bp = Blueprint('music', __name__)
 
 
 @music_bp.route('/songs', methods=['GET'])
+@resource_versions.conditional(lambda **_: [resource_versions.CATALOG], negotiated=True)
+@catalog_cache.cached(lambda: ['songs'])
 def get_songs():
     """Get all songs"""
     try:
-        songs = Song.query.order_by(Song.created_at.desc()).all()
-        return ApiResponse.success([song.to_dict() for song in songs])
+        return collection_streamer.respond(Song.query.order_by(Song.created_at.desc()),
+                                           Song.__table__.columns, key='songs')
     except Exception as e:
         return ApiResponse.error(f"Error retrieving songs: {str(e)}", 500)
 
@@ -55,7 +66,11 @@ def create_song():
         )
 
         db.session.add(song)
+        db.session.flush()
+        catalog_events.record('song.created', song.to_dict())
+        resource_versions.bump(resource_versions.CATALOG)
         db.session.commit()
+        catalog_cache.invalidate_song(after=catalog_cache.song_snapshot(song))
 
         return ApiResponse.success(song.to_dict(), 'Song created successfully')
 
@@ -65,11 +80,13 @@ def create_song():
 
 
 @music_bp.route('/songs/<int:song_id>', methods=['GET'])
+@resource_versions.conditional(lambda **_: [resource_versions.CATALOG])
+@catalog_cache.cached(lambda song_id: [f'song:{song_id}'])
 def get_song(song_id):
     """Get a specific song by ID"""
     try:
-        song = Song.query.get_or_404(song_id)
-        return ApiResponse.success(song.to_dict())
+        song = catalog_flight.do(f'song|{song_id}', lambda: Song.query.get_or_404(song_id).to_dict())
+        return ApiResponse.success(song)
     except Exception as e:
         return ApiResponse.error(f"Song not found: {str(e)}", 404)
 
@@ -78,6 +95,7 @@ def get_song(song_id):
 def update_song(song_id):
     """Update a song"""
     song = Song.query.get_or_404(song_id)
+    before = catalog_cache.song_snapshot(song)
     data = request.get_json()
 
     if not data:
@@ -102,7 +120,11 @@ def update_song(song_id):
             if field in clean_data:
                 setattr(song, field, clean_data[field])
 
+        song.updated_at = datetime.utcnow()
+        catalog_events.record('song.updated', song.to_dict())
+        resource_versions.bump(resource_versions.CATALOG)
         db.session.commit()
+        catalog_cache.invalidate_song(before, catalog_cache.song_snapshot(song))
         return ApiResponse.success(song.to_dict(), 'Song updated successfully')
 
     except Exception as e:
@@ -115,13 +137,17 @@ def delete_song(song_id):
     """Delete a song"""
     try:
         song = Song.query.get_or_404(song_id)
+        before = catalog_cache.song_snapshot(song)
 
-        # Opcional: eliminar archivo físico si existe
-        # if song.file_path and os.path.exists(song.file_path):
-        #     os.remove(song.file_path)
+        # El archivo se borra cuando ninguna otra canción lo referencia
+        content_store.release_url(song.file_path)
 
         db.session.delete(song)
+        catalog_sync.record_deletion(song_id)
+        catalog_events.record('song.deleted', {'id': song_id})
+        resource_versions.bump(resource_versions.CATALOG)
         db.session.commit()
+        catalog_cache.invalidate_song(before)
 
         return ApiResponse.success({'deleted_song_id': song_id}, 'Song deleted successfully')
 
@@ -131,6 +157,7 @@ def delete_song(song_id):
 
 
 @music_bp.route('/songs/search', methods=['GET'])
+@resource_versions.conditional(lambda **_: [resource_versions.CATALOG], negotiated=True)
 def search_songs():
     """Search songs by various criteria"""
     # Parámetros de búsqueda
@@ -153,45 +180,95 @@ def search_songs():
         return ApiResponse.error('Artist search must be at least 2 characters', 400)
 
     try:
-        songs = MusicService.search_songs_by_criteria(
-            db, Song, title=title, artist=artist, query=query
+        # ILIKE no distingue mayúsculas: búsquedas que solo difieren en ellas comparten consulta
+        key = f'search|{query.lower()}|{title.lower()}|{artist.lower()}'
+        return collection_streamer.respond(
+            MusicService.search_songs_query(Song, title=title, artist=artist, query=query),
+            Song.__table__.columns, key=key, message=lambda count: f'Found {count} songs'
         )
 
-        return ApiResponse.success([song.to_dict() for song in songs],
-                                   f'Found {len(songs)} songs')
-
     except Exception as e:
         return ApiResponse.error(f"Error searching songs: {str(e)}", 500)
 
 
+@music_bp.route('/songs/changes', methods=['GET'])
+def get_song_changes():
+    """Songs created/updated and deleted since a sync token (incremental sync)"""
+    since = request.args.get('since', '').strip() or None
+    try:
+        limit = int(request.args.get('limit', 500))
+    except ValueError:
+        return ApiResponse.validation_error('limit must be an integer')
+
+    try:
+        changes = catalog_sync.changes(since, limit)
+    except ValueError as e:
+        return ApiResponse.validation_error(str(e))
+    except Exception as e:
+        return ApiResponse.error(f"Error getting song changes: {str(e)}", 500)
+
+    if changes['resync_required']:
+        return ApiResponse.error('Sync token expired, fetch the full catalog again', 410, 'RESYNC_REQUIRED')
+    return ApiResponse.success(changes, f"{len(changes['songs'])} changed, {len(changes['deleted'])} deleted")
+
+
+@music_bp.route('/events', methods=['GET'])
+def catalog_event_stream():
+    """Server-Sent Events feed of song changes (plus the favorites of ?user_id=)"""
+    user_id = request.args.get('user_id', type=int)
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return ApiResponse.validation_error('Invalid Last-Event-ID')
+
+    try:
+        subscriber, backlog = catalog_events.subscribe(user_id, last_event_id)
+    except Exception as e:
+        return ApiResponse.error(f"Error opening event stream: {str(e)}", 500)
+
+    response = Response(catalog_events.stream(subscriber, backlog), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx: no bufferizar el stream
+    return response
+
+
 @music_bp.route('/songs/by-artist/<artist_name>', methods=['GET'])
+@resource_versions.conditional(lambda **_: [resource_versions.CATALOG], negotiated=True)
+@catalog_cache.cached(lambda artist_name: [f'artist:{artist_name}'],
+                      artist_for=lambda artist_name: artist_name)
 def get_songs_by_artist(artist_name):
     """Get all songs by a specific artist"""
     if len(artist_name.strip()) < 2:
         return ApiResponse.error('Artist name must be at least 2 characters', 400)
 
     try:
-        songs = Song.query.filter(
-            or_(
-                Song.artist.ilike(f'%{artist_name}%'),
-                Song.artist_name.ilike(f'%{artist_name}%'),
-                Song.artist_nickname.ilike(f'%{artist_name}%')
-            )
-        ).all()
-
-        return ApiResponse.success([song.to_dict() for song in songs],
-                                   f'Found {len(songs)} songs by {artist_name}')
+        return collection_streamer.respond(
+            Song.query.filter(
+                or_(
+                    Song.artist.ilike(f'%{artist_name}%'),
+                    Song.artist_name.ilike(f'%{artist_name}%'),
+                    Song.artist_nickname.ilike(f'%{artist_name}%')
+                )
+            ),
+            Song.__table__.columns, key=f'artist|{artist_name.lower()}',
+            message=lambda count: f'Found {count} songs by {artist_name}'
+        )
     except Exception as e:
         return ApiResponse.error(f"Error getting songs by artist: {str(e)}", 500)
 
 
 @music_bp.route('/songs/by-nationality/<nationality>', methods=['GET'])
+@resource_versions.conditional(lambda **_: [resource_versions.CATALOG], negotiated=True)
+@catalog_cache.cached(lambda nationality: [f'nationality:{nationality.upper()}'])
 def get_songs_by_nationality(nationality):
     """Get all songs by artist nationality"""
     try:
-        songs = Song.query.filter_by(nationality=nationality.upper()).all()
-        return ApiResponse.success([song.to_dict() for song in songs],
-                                   f'Found {len(songs)} songs from {nationality}')
+        return collection_streamer.respond(
+            Song.query.filter_by(nationality=nationality.upper()),
+            Song.__table__.columns, key=f'nationality|{nationality.upper()}',
+            message=lambda count: f'Found {count} songs from {nationality}'
+        )
     except Exception as e:
         return ApiResponse.error(f"Error getting songs by nationality: {str(e)}", 500)
 
@@ -226,64 +303,23 @@ def upload_song():
         if not MusicService.allowed_file(file.filename):
             return ApiResponse.error('Invalid file type. Allowed: mp3, wav, flac, ogg, m4a, aac', 400)
 
-        # Get form data
-        title = request.form.get('title', '').strip()
-        artist = request.form.get('artist', '').strip()
-
-        if not title:
-            return ApiResponse.error('Title is required', 400)
-        if not artist:
-            return ApiResponse.error('Artist is required', 400)
-
-        # Optional fields
-        album = request.form.get('album', '').strip() or None
-        duration = request.form.get('duration')
-        cover_url = request.form.get('cover_url', '').strip() or None
-        artist_name = request.form.get('artist_name', '').strip() or artist
-        artist_nickname = request.form.get(
-            'artist_nickname', '').strip() or None
-        nationality = request.form.get('nationality', '').strip() or None
-
-        # Convert duration to int if provided
-        if duration:
-            try:
-                duration = int(float(duration))
-            except (ValueError, TypeError):
-                duration = None
+        fields, error = MusicService.upload_fields(request.form)
+        if error:
+            return ApiResponse.error(error, 400)
 
         # Check for duplicates
         existing_song = MusicService.check_duplicate_song(
-            db, Song, title, artist)
+            db, Song, fields['title'], fields['artist'])
         if existing_song:
             return ApiResponse.error('Song already exists with same title and artist', 409)
 
-        # Save file
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        file_path = MusicService.save_file(file, upload_folder)
+        # Save file (por contenido: un archivo idéntico ya subido se reutiliza)
+        relative_path = MusicService.save_file(file)
 
-        if not file_path:
+        if not relative_path:
             return ApiResponse.error('Failed to save file', 500)
-          # Create relative path for URL
-        relative_path = file_path.replace(
-            upload_folder, '').lstrip(os.sep).replace(os.sep, '/')
-        file_url = f"http://localhost:5000/assets/{relative_path}"
-
-        # Create song record
-        song = Song(
-            title=title,
-            artist=artist,
-            album=album,
-            duration=duration,
-            file_path=file_url,  # Store the full URL
-            cover_url=cover_url,
-            artist_name=artist_name,
-            artist_nickname=artist_nickname,
-            nationality=nationality
-        )
-
-        db.session.add(song)
-        db.session.commit()
 
+        song = create_uploaded_song(fields, relative_path)
         return ApiResponse.success(song.to_dict(), 'Song uploaded successfully')
 
     except Exception as e:
@@ -291,11 +327,131 @@ def upload_song():
         return ApiResponse.error(f"Error uploading song: {str(e)}", 500)
 
 
+def create_uploaded_song(fields, relative_path):
+    """Create and commit the song for a file stored at ``relative_path``"""
+    song = Song(
+        file_path=f"http://localhost:5000/assets/{relative_path}",  # Store the full URL
+        **fields
+    )
+
+    db.session.add(song)
+    db.session.flush()
+    catalog_events.record('song.created', song.to_dict())
+    resource_versions.bump(resource_versions.CATALOG)
+    db.session.commit()
+    catalog_cache.invalidate_song(after=catalog_cache.song_snapshot(song))
+    return song
+
+
+# Subidas reanudables por partes (estilo tus): crear sesión, PATCH con Upload-Offset, completar
+
+def upload_session_response(status, status_code=200, message='Success'):
+    response, status_code = ApiResponse.success(status, message, status_code)
+    response.headers['Upload-Offset'] = str(status['offset'])
+    response.headers['Upload-Length'] = str(status['length'])
+    response.headers['Upload-Expires'] = http_date(status['expires_at'])
+    response.headers['Cache-Control'] = 'no-store'
+    return response, status_code
+
+
+@music_bp.route('/uploads', methods=['POST'])
+def create_upload_session():
+    """Start a resumable upload: {"filename": "song.mp3", "length": <bytes>}"""
+    data = request.get_json(silent=True) or {}
+    filename = (data.get('filename') or '').strip()
+    length = data.get('length', request.headers.get('Upload-Length'))
+
+    if not filename or not MusicService.allowed_file(filename):
+        return ApiResponse.error('Invalid file type. Allowed: mp3, wav, flac, ogg, m4a, aac', 400)
+    try:
+        length = int(length)
+    except (TypeError, ValueError):
+        return ApiResponse.error('Upload length is required', 400)
+
+    try:
+        status = upload_sessions.create(filename, length)
+    except UploadSessionError as e:
+        return ApiResponse.error(str(e), e.status_code)
+
+    response, status_code = upload_session_response(status, 201, 'Upload created')
+    response.headers['Location'] = f"/api/music/uploads/{status['id']}"
+    return response, status_code
+
+
+@music_bp.route('/uploads/<upload_id>', methods=['GET'])
+def get_upload_session(upload_id):
+    """Offset to resume from (HEAD returns it in Upload-Offset only)"""
+    try:
+        return upload_session_response(upload_sessions.status(upload_id))
+    except UploadSessionError as e:
+        return ApiResponse.error(str(e), e.status_code)
+
+
+@music_bp.route('/uploads/<upload_id>', methods=['PATCH'])
+def append_upload_chunk(upload_id):
+    """Append the raw request body at the offset in Upload-Offset"""
+    if request.mimetype != 'application/offset+octet-stream':
+        return ApiResponse.error('Content-Type must be application/offset+octet-stream', 415)
+    try:
+        offset = int(request.headers['Upload-Offset'])
+    except (KeyError, ValueError):
+        return ApiResponse.error('Upload-Offset header is required', 400)
+
+    try:
+        offset = upload_sessions.append(upload_id, offset, request.stream)
+    except UploadSessionError as e:
+        return ApiResponse.error(str(e), e.status_code)
+
+    response = current_app.response_class(status=204)
+    response.headers['Upload-Offset'] = str(offset)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+@music_bp.route('/uploads/<upload_id>/complete', methods=['POST'])
+def complete_upload_session(upload_id):
+    """Create the song of a fully uploaded file (same form fields as /songs/upload)"""
+    try:
+        fields, error = MusicService.upload_fields(request.get_json(silent=True) or request.form)
+        if error:
+            return ApiResponse.error(error, 400)
+
+        def create_song(path, filename):
+            if MusicService.check_duplicate_song(db, Song, fields['title'], fields['artist']):
+                raise UploadSessionError('Song already exists with same title and artist', 409)
+            return create_uploaded_song(fields, content_store.store_file(path, filename)).id
+
+        song_id, created = upload_sessions.finalize(upload_id, create_song)
+        song = db.session.get(Song, song_id)
+        if song is None:
+            return ApiResponse.error('Song of this upload was deleted', 410)
+        return ApiResponse.success(song.to_dict(), 'Song uploaded successfully' if created
+                                   else 'Upload already completed')
+
+    except UploadSessionError as e:
+        db.session.rollback()
+        return ApiResponse.error(str(e), e.status_code)
+    except Exception as e:
+        db.session.rollback()
+        return ApiResponse.error(f"Error completing upload: {str(e)}", 500)
+
+
+@music_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+def cancel_upload_session(upload_id):
+    """Abandon a resumable upload and free its space"""
+    try:
+        upload_sessions.cancel(upload_id)
+        return ApiResponse.success({'deleted_upload_id': upload_id}, 'Upload cancelled')
+    except UploadSessionError as e:
+        return ApiResponse.error(str(e), e.status_code)
+
+
 @music_bp.route('/songs/<int:song_id>/upload', methods=['PUT'])
 def update_song_with_file(song_id):
     """Update a song with optional file upload"""
     try:
         song = Song.query.get_or_404(song_id)
+        before = catalog_cache.song_snapshot(song)
 
         # Handle file upload if present
         file_url = song.file_path  # Keep existing file by default
@@ -306,13 +462,10 @@ def update_song_with_file(song_id):
                 if not MusicService.allowed_file(file.filename):
                     return ApiResponse.error('Invalid file type. Allowed: mp3, wav, flac, ogg, m4a, aac', 400)
 
-                # Save new file
-                upload_folder = current_app.config['UPLOAD_FOLDER']
-                file_path = MusicService.save_file(file, upload_folder)
-                if file_path:
-                    # Create relative path for URL
-                    relative_path = file_path.replace(
-                        upload_folder, '').lstrip(os.sep).replace(os.sep, '/')
+                # Save new file and drop the reference to the previous one
+                relative_path = MusicService.save_file(file)
+                if relative_path:
+                    content_store.release_url(song.file_path)
                     file_url = f"http://localhost:5000/assets/{relative_path}"
 
         # Get form data and update fields if provided
@@ -339,8 +492,12 @@ def update_song_with_file(song_id):
 
         # Update file path if changed
         song.file_path = file_url
+        song.updated_at = datetime.utcnow()
 
+        catalog_events.record('song.updated', song.to_dict())
+        resource_versions.bump(resource_versions.CATALOG)
         db.session.commit()
+        catalog_cache.invalidate_song(before, catalog_cache.song_snapshot(song))
         return ApiResponse.success(song.to_dict(), 'Song updated successfully')
 
     except Exception as e:
@@ -353,6 +510,7 @@ def update_song_metadata(song_id):
     """Update song metadata only (no file upload required)"""
     try:
         song = Song.query.get_or_404(song_id)
+        before = catalog_cache.song_snapshot(song)
         data = request.get_json()
 
         if not data:
@@ -372,9 +530,21 @@ def update_song_metadata(song_id):
                 else:
                     setattr(song, field, data[field])
 
+        song.updated_at = datetime.utcnow()
+        catalog_events.record('song.updated', song.to_dict())
+        resource_versions.bump(resource_versions.CATALOG)
         db.session.commit()
+        catalog_cache.invalidate_song(before, catalog_cache.song_snapshot(song))
         return ApiResponse.success(song.to_dict(), 'Song metadata updated successfully')
 
     except Exception as e:
         db.session.rollback()
         return ApiResponse.error(f"Error updating song metadata: {str(e)}", 500)
+
+
+@music_bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Catalog response cache and request coalescing metrics"""
+    stats = catalog_cache.stats()
+    stats['single_flight'] = catalog_flight.stats()
+    return ApiResponse.success(stats)
@@ -1,17 +1,21 @@
 from flask import Blueprint, request, jsonify
 from app.models.database import db, User
 from app.services.user_service import UserService
+from app.services.resource_versions import resource_versions
 from app.utils.responses import ApiResponse
+from app.utils.streaming import collection_streamer
 from app.utils.validators import Validators
 from werkzeug.security import generate_password_hash, check_password_hash
 
 users_bp = Blueprint('users', __name__)
 
+# Columnas de User.to_dict() para los listados (nunca el password)
+USER_COLUMNS = (User.id, User.email, User.username, User.created_at, User.updated_at)
+
 @users_bp.route('/', methods=['GET'])
 def get_users():
     """Get all users"""
-    users = User.query.all()
-    return ApiResponse.success([user.to_dict() for user in users])
+    return collection_streamer.respond(User.query.order_by(User.id), USER_COLUMNS)
 
 @users_bp.route('/', methods=['POST'])
 def create_user():
@@ -70,6 +74,9 @@ def update_user(user_id):
             existing_user = User.query.filter_by(email=data['email']).first()
             if existing_user and existing_user.id != user_id:
                 return ApiResponse.error('Email already exists', 400)
+            if user.email != data['email']:
+                # Los favoritos del usuario incluyen su email
+                resource_versions.bump(resource_versions.favorites(user_id))
             user.email = data['email']
         
         if 'password' in data:
@@ -91,6 +98,7 @@ def delete_user(user_id):
     
     try:
         db.session.delete(user)
+        resource_versions.bump(resource_versions.favorites(user_id))
         db.session.commit()
         return ApiResponse.success({}, 'User deleted successfully')
         
@@ -139,9 +147,7 @@ def search_users():
     if len(query) < 2:
         return ApiResponse.error('Search query must be at least 2 characters', 400)
     
-    users = User.query.filter(User.email.contains(query)).all()
-    
-    return ApiResponse.success([user.to_dict() for user in users])
+    return collection_streamer.respond(User.query.filter(User.email.contains(query)), USER_COLUMNS)
 
 @users_bp.route('/verify-email', methods=['POST'])
 def verify_email():
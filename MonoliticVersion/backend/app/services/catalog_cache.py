@@ -0,0 +1,373 @@
+import functools
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, request
+
+from app.utils.streaming import wants_ndjson
+
+CATALOG_PREFIX = 'catalog:'
+
+
+def like_matches(pattern, value):
+    """Python equivalent of ``value ILIKE '%pattern%'`` (``%`` and ``_`` are wildcards)"""
+    if not value:
+        return False
+    regex = ''.join('.*' if ch == '%' else '.' if ch == '_' else re.escape(ch) for ch in pattern)
+    return re.search(regex, value, re.IGNORECASE | re.DOTALL) is not None
+
+
+class LocalCacheBackend:
+    """In-process LRU of serialized responses with tag sets for invalidation"""
+
+    def __init__(self, max_entries, ttl, on_evict):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._on_evict = on_evict
+        self._entries = OrderedDict()   # key -> (expires_at, body, tags)
+        self._tags = {}                 # tag -> {key}
+        self._artists = set()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, body, tags, artist, generation):
+        with self._lock:
+            # Una escritura ocurrió mientras se generaba la respuesta: no guardar datos viejos
+            if generation != self._generation:
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, body, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            if artist is not None:
+                self._artists.add(artist)
+
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                evicted += 1
+        if evicted:
+            self._on_evict(evicted)
+        return True
+
+    def artists(self):
+        with self._lock:
+            return list(self._artists)
+
+    def invalidate(self, tags, artists=()):
+        with self._lock:
+            self._generation += 1
+            self._artists.difference_update(artists)
+            keys = set()
+            for tag in tags:
+                keys |= self._tags.pop(tag, set())
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+            self._artists.clear()
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+                    if tag.startswith('artist:'):
+                        self._artists.discard(tag[len('artist:'):])
+
+
+class RedisCacheBackend:
+    """
+    Shared backend: every worker sees the same entries and invalidations.
+    Eviction is left to Redis (maxmemory-policy allkeys-lru) and the TTL.
+    """
+
+    def __init__(self, client, ttl):
+        self.client = client
+        self.ttl = ttl
+
+    def _key(self, *parts):
+        return CATALOG_PREFIX + ':'.join(parts)
+
+    def generation(self):
+        return int(self.client.get(self._key('generation')) or 0)
+
+    def get(self, key):
+        return self.client.get(self._key('entry', key))
+
+    def set(self, key, body, tags, artist, generation):
+        from redis.exceptions import WatchError
+
+        generation_key = self._key('generation')
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(generation_key)
+                if int(pipe.get(generation_key) or 0) != generation:
+                    return False
+                pipe.multi()
+                pipe.set(self._key('entry', key), body, ex=self.ttl)
+                for tag in tags:
+                    pipe.sadd(self._key('tag', tag), key)
+                    pipe.expire(self._key('tag', tag), self.ttl)
+                if artist is not None:
+                    pipe.sadd(self._key('artists'), artist)
+                pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+    def artists(self):
+        return [artist.decode() if isinstance(artist, bytes) else artist
+                for artist in self.client.smembers(self._key('artists'))]
+
+    def invalidate(self, tags, artists=()):
+        tag_keys = [self._key('tag', tag) for tag in tags]
+        with self.client.pipeline() as pipe:
+            pipe.incr(self._key('generation'))
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            results = pipe.execute()
+
+        keys = set()
+        for members in results[1:]:
+            keys |= {m.decode() if isinstance(m, bytes) else m for m in members}
+
+        with self.client.pipeline() as pipe:
+            if keys:
+                pipe.delete(*[self._key('entry', key) for key in keys])
+            if tag_keys:
+                pipe.delete(*tag_keys)
+            if artists:
+                pipe.srem(self._key('artists'), *artists)
+            pipe.execute()
+        return len(keys)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=CATALOG_PREFIX + '*'))
+        if keys:
+            self.client.delete(*keys)
+        self.client.incr(self._key('generation'))
+
+    def size(self):
+        return sum(1 for _ in self.client.scan_iter(match=self._key('entry', '*')))
+
+
+class CatalogCache:
+    """
+    Response cache for the catalog read endpoints.
+
+    Entries are the serialized JSON body of successful responses, keyed on
+    the endpoint plus its normalized view and query args, and tagged with
+    what they contain (``songs``, ``song:<id>``, ``nationality:<code>``,
+    ``artist:<term>``). Writes call ``invalidate_song`` with the song as it
+    was before and after the change, which drops only the entries that
+    could include it. A generation counter keeps a read that raced with a
+    write from storing the stale response.
+
+    The LRU is per process; with ``redis_url`` every worker shares entries
+    and invalidations. ``max_entries`` = 0 disables caching.
+    """
+
+    def __init__(self, max_entries=512, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.backend = None
+
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0, 'skipped_stores': 0,
+                       'evictions': 0, 'invalidations': 0, 'invalidated_entries': 0, 'errors': 0}
+        self._stats_lock = threading.Lock()
+
+    def init_app(self, app, max_entries=None, ttl=None, redis_url=None):
+        if max_entries is not None:
+            self.max_entries = max_entries
+        if ttl is not None:
+            self.ttl = ttl
+
+        self.backend = None
+        if self.max_entries <= 0:
+            print('📦 Catalog cache disabled')
+            return
+
+        if redis_url:
+            try:
+                import redis
+                client = redis.Redis.from_url(redis_url)
+                client.ping()
+                self.backend = RedisCacheBackend(client, self.ttl)
+                print(f'📦 Catalog cache using Redis ({redis_url})')
+            except Exception as e:
+                print(f'⚠️ Catalog cache: Redis unavailable ({str(e)}), using in-process LRU')
+
+        if self.backend is None:
+            self.backend = LocalCacheBackend(self.max_entries, self.ttl, self._record_evictions)
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    # ------------------------------------------------------------------ reads
+
+    @staticmethod
+    def make_key(endpoint, view_args, args):
+        view = '&'.join(f'{name}={value}' for name, value in sorted((view_args or {}).items()))
+        query = '&'.join(f'{name}={value}' for name, values in sorted(args.lists())
+                         for value in sorted(values))
+        return f'{endpoint}|{view}|{query}'
+
+    def cached(self, tags_for, artist_for=None):
+        """
+        Cache a GET view. ``tags_for(**view_args)`` returns the entry tags;
+        ``artist_for(**view_args)`` the artist search term, if any.
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                # NDJSON siempre se transmite en streaming: no se guarda
+                if not self.enabled or request.method != 'GET' or wants_ndjson():
+                    return view(*args, **kwargs)
+
+                key = self.make_key(request.endpoint, kwargs, request.args)
+                # Bajo un GET condicional la clave incluye la versión leída para el
+                # ETag: un cuerpo anterior nunca se sirve con el ETag de una versión nueva
+                if g.get('resource_etag'):
+                    key += f"|v{g.resource_etag}"
+                try:
+                    body = self.backend.get(key)
+                    generation = self.backend.generation()
+                except Exception as e:
+                    self._bump('errors')
+                    print(f'⚠️ Catalog cache read failed: {str(e)}')
+                    return view(*args, **kwargs)
+
+                if body is not None:
+                    self._bump('hits')
+                    response = current_app.response_class(body, status=200, mimetype='application/json')
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                self._bump('misses')
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code == 200 and response.mimetype == 'application/json' \
+                        and not response.is_streamed:
+                    artist = artist_for(**kwargs) if artist_for else None
+                    try:
+                        stored = self.backend.set(key, response.get_data(), tags_for(**kwargs),
+                                                  artist, generation)
+                        self._bump('stores' if stored else 'skipped_stores')
+                    except Exception as e:
+                        self._bump('errors')
+                        print(f'⚠️ Catalog cache write failed: {str(e)}')
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+    # ------------------------------------------------------------------ writes
+
+    @staticmethod
+    def song_snapshot(song):
+        """Fields that decide which cached responses include a song"""
+        if song is None:
+            return None
+        return {
+            'id': song.id,
+            'nationality': song.nationality,
+            'artists': [song.artist, song.artist_name, song.artist_nickname]
+        }
+
+    def invalidate_song(self, before=None, after=None):
+        """
+        Drop every entry that contained the song before the write or would
+        contain it after: the full list, the song itself, its nationality
+        and the artist searches matching any of its artist fields.
+        """
+        if not self.enabled:
+            return 0
+
+        tags = {'songs'}
+        values = []
+        for snapshot in (before, after):
+            if snapshot is None:
+                continue
+            tags.add(f"song:{snapshot['id']}")
+            if snapshot['nationality']:
+                tags.add(f"nationality:{snapshot['nationality']}")
+            values.extend(value for value in snapshot['artists'] if value)
+
+        try:
+            artists = [term for term in self.backend.artists()
+                       if any(like_matches(term, value) for value in values)]
+            tags.update(f'artist:{term}' for term in artists)
+            dropped = self.backend.invalidate(tags, artists)
+        except Exception as e:
+            # Sin invalidación el TTL acota cuánto tiempo se sirven datos viejos
+            self._bump('errors')
+            print(f'❌ Catalog cache invalidation failed: {str(e)}')
+            return 0
+
+        with self._stats_lock:
+            self._stats['invalidations'] += 1
+            self._stats['invalidated_entries'] += dropped
+        return dropped
+
+    def clear(self):
+        if self.enabled:
+            self.backend.clear()
+
+    # ------------------------------------------------------------------ metrics
+
+    def _bump(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def _record_evictions(self, count):
+        with self._stats_lock:
+            self._stats['evictions'] += count
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['enabled'] = self.enabled
+        stats['backend'] = type(self.backend).__name__ if self.backend else None
+        stats['max_entries'] = self.max_entries
+        stats['ttl'] = self.ttl
+        try:
+            stats['entries'] = self.backend.size() if self.backend else 0
+        except Exception:
+            stats['entries'] = None
+        return stats
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,295 @@
+import json
+import queue
+import select
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from sqlalchemy import event as sa_event, text
+
+from app.models.database import db, CatalogEvent
+
+NOTIFY_CHANNEL = 'catalog_events'
+
+
+class Subscriber:
+    """One SSE connection: receives song events and the favorites of ``user_id``"""
+
+    def __init__(self, user_id, max_queue):
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def wants(self, item):
+        return item['user_id'] is None or item['user_id'] == self.user_id
+
+    def offer(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            # Cliente lento: se cierra su stream y reanuda con Last-Event-ID
+            self.overflowed = True
+
+
+class CatalogEventBus:
+    """
+    Change feed behind ``GET /api/music/events`` (Server-Sent Events).
+
+    Writers call ``record`` in the same transaction as the change, so the
+    ``catalog_events`` table is the ordered source of truth and every event
+    has a global id. A dispatcher thread per process reads new rows and fans
+    them out to the local subscribers. It is woken up by the commit of a
+    local write and, on PostgreSQL, by ``NOTIFY catalog_events`` sent from
+    the writing transaction, so events written by any worker reach the
+    streams of every worker. Other databases fall back to polling every
+    ``poll_interval`` seconds.
+
+    Ids are assigned before commit, so a transaction that commits late
+    leaves a temporary gap. The dispatcher holds later events back for up
+    to ``gap_timeout`` seconds to keep delivery in id order, which is what
+    makes ``Last-Event-ID`` resumption exact. Recent events stay in a ring
+    buffer for replay; older ones are read from the table, and a client too
+    far behind gets a ``reset`` event (refetch or use /songs/changes).
+    """
+
+    def __init__(self, ring_size=1000, max_queue=256, poll_interval=2.0, gap_timeout=2.0,
+                 retention_hours=24, max_replay=1000):
+        self.ring_size = ring_size
+        self.max_queue = max_queue
+        self.poll_interval = poll_interval
+        self.gap_timeout = gap_timeout
+        self.retention = timedelta(hours=retention_hours)
+        self.max_replay = max_replay
+        self.app = None
+        self.socketio = None
+
+        self._ring = deque(maxlen=ring_size)
+        self._subscribers = set()
+        self._delivered_id = None
+        self._gap_since = None
+        self._last_prune = 0.0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._started = False
+
+    def init_app(self, app, socketio, ring_size=None, poll_interval=None, retention_hours=None):
+        self.app = app
+        self.socketio = socketio
+        if ring_size is not None:
+            self.ring_size = ring_size
+            self._ring = deque(maxlen=ring_size)
+        if poll_interval is not None:
+            self.poll_interval = poll_interval
+        if retention_hours is not None:
+            self.retention = timedelta(hours=retention_hours)
+
+        @sa_event.listens_for(db.session, 'after_commit')
+        def wake_dispatcher(session):
+            if session.info.pop('catalog_events', False):
+                self._wakeup.set()
+
+        @sa_event.listens_for(db.session, 'after_rollback')
+        def forget_events(session):
+            session.info.pop('catalog_events', None)
+
+    # ------------------------------------------------------------------ writes
+
+    def record(self, event, payload, user_id=None):
+        """Add an event to the current transaction (the caller commits)"""
+        db.session.add(CatalogEvent(event=event, user_id=user_id, payload=json.dumps(payload)))
+        db.session.info['catalog_events'] = True
+        if db.engine.dialect.name == 'postgresql':
+            # Se entrega al hacer commit (y se descarta con rollback)
+            db.session.execute(text('SELECT pg_notify(:channel, :event)'),
+                               {'channel': NOTIFY_CHANNEL, 'event': event})
+
+    # ------------------------------------------------------------------ subscribers
+
+    def subscribe(self, user_id=None, last_event_id=None):
+        """
+        Register a stream and return (subscriber, backlog). The backlog holds
+        the events after ``last_event_id``, or a single ``reset`` item when
+        they can't all be replayed.
+        """
+        self.start()
+        subscriber = Subscriber(user_id, self.max_queue)
+
+        with self._lock:
+            delivered = self._delivered_id
+            ring = list(self._ring)
+            self._subscribers.add(subscriber)
+
+        if last_event_id is None or delivered is None or last_event_id >= delivered:
+            return subscriber, []
+
+        if ring and ring[0]['id'] <= last_event_id + 1:
+            backlog = [item for item in ring if item['id'] > last_event_id]
+        elif self._before_retention(last_event_id):
+            return subscriber, [self._reset_item(delivered)]
+        else:
+            rows = CatalogEvent.query.filter(CatalogEvent.id > last_event_id, CatalogEvent.id <= delivered)\
+                .order_by(CatalogEvent.id.asc()).limit(self.max_replay + 1).all()
+            if len(rows) > self.max_replay:
+                return subscriber, [self._reset_item(delivered)]
+            backlog = [self._item(row) for row in rows]
+
+        return subscriber, [item for item in backlog if subscriber.wants(item)]
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def _before_retention(self, last_event_id):
+        """True when the events after last_event_id may already have been pruned"""
+        oldest = db.session.query(db.func.min(CatalogEvent.id)).scalar()
+        return oldest is None or oldest > last_event_id + 1
+
+    @staticmethod
+    def _reset_item(event_id):
+        return {'id': event_id, 'event': 'reset', 'user_id': None, 'data': {}}
+
+    @staticmethod
+    def _item(row):
+        return {'id': row.id, 'event': row.event, 'user_id': row.user_id, 'data': json.loads(row.payload)}
+
+    # ------------------------------------------------------------------ dispatcher
+
+    def start(self):
+        with self._lock:
+            if self._started or self.socketio is None:
+                return
+            self._started = True
+
+        with self.app.app_context():
+            last = db.session.query(db.func.max(CatalogEvent.id)).scalar() or 0
+            postgres = db.engine.dialect.name == 'postgresql'
+        with self._lock:
+            self._delivered_id = last
+
+        self.socketio.start_background_task(self._dispatch_loop)
+        if postgres:
+            self.socketio.start_background_task(self._listen_loop)
+        print(f'📡 Catalog event feed started at event {last}')
+
+    def _dispatch_loop(self):
+        while True:
+            timeout = self.poll_interval
+            if self._gap_since is not None:
+                timeout = min(timeout, self.gap_timeout / 4)
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+            try:
+                with self.app.app_context():
+                    self.dispatch()
+                    self._prune()
+            except Exception as e:
+                print(f'❌ Error dispatching catalog events: {str(e)}')
+
+    def dispatch(self):
+        """Fan out the committed events after the last delivered id, in id order"""
+        rows = CatalogEvent.query.filter(CatalogEvent.id > self._delivered_id)\
+            .order_by(CatalogEvent.id.asc()).limit(500).all()
+        db.session.rollback()  # no retener un snapshot entre rondas
+
+        expected = self._delivered_id + 1
+        items = []
+        for row in rows:
+            if row.id != expected:
+                # Hueco: una transacción con un id menor aún no confirmó (o hizo rollback)
+                if self._gap_since is None:
+                    self._gap_since = time.monotonic()
+                if time.monotonic() - self._gap_since < self.gap_timeout:
+                    break
+            self._gap_since = None
+            items.append(self._item(row))
+            expected = row.id + 1
+
+        if not items:
+            return 0
+
+        with self._lock:
+            self._delivered_id = items[-1]['id']
+            self._ring.extend(items)
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            for item in items:
+                if subscriber.wants(item):
+                    subscriber.offer(item)
+        if len(rows) == 500:
+            self._wakeup.set()
+        return len(items)
+
+    def _listen_loop(self):
+        """LISTEN on a dedicated connection; notifications only wake the dispatcher"""
+        backoff = 1
+        while True:
+            try:
+                with self.app.app_context():
+                    connection = db.engine.raw_connection()
+                try:
+                    dbapi = connection.dbapi_connection if hasattr(connection, 'dbapi_connection') \
+                        else connection.connection
+                    dbapi.autocommit = True
+                    dbapi.cursor().execute(f'LISTEN {NOTIFY_CHANNEL}')
+                    backoff = 1
+                    # Eventos escritos mientras se reconectaba
+                    self._wakeup.set()
+                    while True:
+                        if select.select([dbapi], [], [], 30) == ([], [], []):
+                            continue
+                        dbapi.poll()
+                        if dbapi.notifies:
+                            dbapi.notifies.clear()
+                            self._wakeup.set()
+                finally:
+                    connection.close()
+            except Exception as e:
+                print(f'⚠️ Catalog events LISTEN connection lost: {str(e)}')
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+    def _prune(self):
+        if time.monotonic() - self._last_prune < 600:
+            return
+        self._last_prune = time.monotonic()
+        deleted = CatalogEvent.query.filter(CatalogEvent.created_at < datetime.utcnow() - self.retention)\
+            .delete(synchronize_session=False)
+        db.session.commit()
+        if deleted:
+            print(f'🧹 Pruned {deleted} catalog events')
+
+    # ------------------------------------------------------------------ SSE
+
+    @staticmethod
+    def format_sse(item):
+        return f"id: {item['id']}\nevent: {item['event']}\ndata: {json.dumps(item['data'])}\n\n"
+
+    def stream(self, subscriber, backlog, keepalive=15):
+        """Generator of SSE frames for one subscriber"""
+        try:
+            yield 'retry: 3000\n\n'
+            for item in backlog:
+                yield self.format_sse(item)
+            while not subscriber.overflowed:
+                try:
+                    item = subscriber.queue.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield self.format_sse(item)
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'delivered_id': self._delivered_id,
+                'ring_size': len(self._ring),
+                'waiting_on_gap': self._gap_since is not None
+            }
+
+
+catalog_events = CatalogEventBus()
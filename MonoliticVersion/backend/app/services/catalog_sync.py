@@ -0,0 +1,125 @@
+import base64
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_
+
+from app.models.database import db, Song, SongTombstone
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class CatalogSync:
+    """
+    Incremental catalog sync for clients that keep a local copy.
+
+    ``changes(since)`` returns the songs created or updated after the token
+    (keyset on the indexed ``(updated_at, id)``) and the tombstones written
+    by ``delete_song`` after it, so a sync costs O(changes) instead of a
+    full refetch.
+
+    Rows are timestamped when their transaction runs, not when it commits,
+    so a slow write can become visible with an ``updated_at`` slightly in
+    the past. The returned token therefore stops at the watermark
+    ``now - lag`` (unless a full page needs it to move further): changes
+    newer than that are sent again on the next call, clients upsert by id,
+    but none are skipped. Tombstones are
+    kept ``retention_days``; an older token gets ``resync_required``.
+    """
+
+    def __init__(self, lag_seconds=5, retention_days=30, max_limit=1000):
+        self.lag = timedelta(seconds=lag_seconds)
+        self.retention = timedelta(days=retention_days)
+        self.max_limit = max_limit
+
+    def init_app(self, lag_seconds=None, retention_days=None):
+        if lag_seconds is not None:
+            self.lag = timedelta(seconds=lag_seconds)
+        if retention_days is not None:
+            self.retention = timedelta(days=retention_days)
+
+    # ------------------------------------------------------------------ writes
+
+    def record_deletion(self, song_id):
+        """Add the tombstone in the caller's transaction and prune expired ones"""
+        now = datetime.utcnow()
+        db.session.add(SongTombstone(song_id=song_id, deleted_at=now))
+        SongTombstone.query.filter(SongTombstone.deleted_at < now - self.retention)\
+            .delete(synchronize_session=False)
+
+    # ------------------------------------------------------------------ reads
+
+    def changes(self, since=None, limit=500):
+        limit = max(1, min(int(limit), self.max_limit))
+        now = datetime.utcnow()
+        watermark = (now - self.lag, 0)
+
+        if since:
+            song_cursor, tomb_cursor = self.decode_token(since)
+            if tomb_cursor[0] < now - self.retention:
+                # Los tombstones anteriores ya se purgaron: el cliente debe recargar todo
+                return {'resync_required': True, 'songs': [], 'deleted': [],
+                        'next_token': None, 'has_more': False}
+        else:
+            # Sin token: todo el catálogo; los tombstones anteriores no le interesan
+            song_cursor, tomb_cursor = (EPOCH, 0), watermark
+
+        songs = self._after(Song, Song.updated_at, song_cursor).limit(limit + 1).all()
+        tombstones = self._after(SongTombstone, SongTombstone.deleted_at, tomb_cursor)\
+            .limit(limit + 1).all()
+
+        songs_more = len(songs) > limit
+        tombs_more = len(tombstones) > limit
+        songs, tombstones = songs[:limit], tombstones[:limit]
+
+        next_songs = self._advance(song_cursor, (songs[-1].updated_at, songs[-1].id) if songs else None,
+                                   songs_more, watermark)
+        next_tombs = self._advance(tomb_cursor, (tombstones[-1].deleted_at, tombstones[-1].id)
+                                   if tombstones else None, tombs_more, watermark)
+
+        return {
+            'resync_required': False,
+            'songs': [song.to_dict() for song in songs],
+            'deleted': [{'id': tomb.song_id, 'deleted_at': tomb.deleted_at.isoformat()}
+                        for tomb in tombstones],
+            'next_token': self.encode_token(next_songs, next_tombs),
+            'has_more': songs_more or tombs_more
+        }
+
+    @staticmethod
+    def _after(model, column, cursor):
+        timestamp, last_id = cursor
+        return model.query.filter(or_(column > timestamp,
+                                      and_(column == timestamp, model.id > last_id)))\
+            .order_by(column.asc(), model.id.asc())
+
+    @staticmethod
+    def _advance(cursor, last, page_full, watermark):
+        """
+        Next cursor. Once caught up it moves to the watermark; a full page
+        moves to its last row, capped at the watermark when that still makes
+        progress.
+        """
+        if not page_full:
+            return max(cursor, watermark)
+        capped = min(last, watermark)
+        return capped if capped > cursor else last
+
+    # ------------------------------------------------------------------ tokens
+
+    @staticmethod
+    def encode_token(song_cursor, tomb_cursor):
+        raw = f'{song_cursor[0].isoformat()}|{song_cursor[1]}|{tomb_cursor[0].isoformat()}|{tomb_cursor[1]}'
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_token(token):
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            song_ts, song_id, tomb_ts, tomb_id = base64.urlsafe_b64decode(padded).decode().split('|')
+            return ((datetime.fromisoformat(song_ts), int(song_id)),
+                    (datetime.fromisoformat(tomb_ts), int(tomb_id)))
+        except Exception:
+            raise ValueError('Invalid sync token')
+
+
+catalog_sync = CatalogSync()
@@ -0,0 +1,242 @@
+import json
+import re
+from datetime import date, datetime
+
+from sqlalchemy import text
+
+from app.models.database import db
+
+PARENT = 'chat_messages'
+PARTITION_RE = re.compile(r'^chat_messages_y(\d{4})m(\d{2})$')
+
+# Misma estructura que init/01-init-database.sh, pero particionada por mes.
+# La PK debe incluir la clave de partición.
+PARTITIONED_DDL = """
+CREATE TABLE chat_messages (
+    id SERIAL,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    message TEXT NOT NULL,
+    timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    room VARCHAR(50) DEFAULT 'general',
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp)
+"""
+
+PARTITIONED_INDEX_DDL = """
+CREATE INDEX IF NOT EXISTS ix_chat_messages_room_timestamp_id
+    ON chat_messages (room, timestamp, id)
+"""
+
+# Búsqueda de texto (ChatService.search_messages usa la misma expresión)
+SEARCH_INDEX_DDL = """
+CREATE INDEX IF NOT EXISTS ix_chat_messages_message_fts
+    ON chat_messages USING gin (to_tsvector('simple'::regconfig, message))
+"""
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(month, months):
+    years, index = divmod(month.month - 1 + months, 12)
+    return date(month.year + years, index + 1, 1)
+
+
+def partition_name(month):
+    return f'{PARENT}_y{month.year}m{month.month:02d}'
+
+
+class ChatPartitionManager:
+    """
+    Monthly range partitions of chat_messages on ``timestamp`` (Postgres only).
+
+    - ``ensure_partitions`` creates the current month and ``months_ahead``
+      upcoming months so inserts never miss a partition.
+    - ``apply_retention`` detaches partitions older than ``retention_months``
+      (CONCURRENTLY on Postgres 14+) and drops them, or renames them to
+      ``chat_messages_archive_yYYYYmMM`` when ``archive`` is set. No DELETEs.
+    - ``explain_recent`` reports which partitions the hot-path queries touch.
+    """
+
+    def __init__(self, months_ahead=2, retention_months=0, archive=False,
+                 maintenance_interval=6 * 3600):
+        self.months_ahead = months_ahead
+        self.retention_months = retention_months
+        self.archive = archive
+        self.maintenance_interval = maintenance_interval
+        self.app = None
+        self.socketio = None
+
+    def init_app(self, app, socketio, **options):
+        self.app = app
+        self.socketio = socketio
+        for key, value in options.items():
+            if value is not None:
+                setattr(self, key, value)
+
+    # ------------------------------------------------------------------ setup
+
+    def enabled(self):
+        return db.engine.dialect.name == 'postgresql'
+
+    def is_partitioned(self, conn):
+        return conn.execute(text("""
+            SELECT 1 FROM pg_partitioned_table pt
+            JOIN pg_class c ON c.oid = pt.partrelid
+            WHERE c.relname = :name AND pg_table_is_visible(c.oid)
+        """), {'name': PARENT}).first() is not None
+
+    def prepare(self):
+        """
+        Called after db.create_all(): a fresh (empty) chat_messages is recreated
+        as a partitioned table. Existing data must be moved with
+        database/migrations/partition_chat_messages.sql.
+        """
+        if not self.enabled():
+            return False
+
+        try:
+            with db.engine.begin() as conn:
+                if not self.is_partitioned(conn):
+                    has_rows = conn.execute(text(f'SELECT 1 FROM {PARENT} LIMIT 1')).first()
+                    if has_rows:
+                        print('⚠️ chat_messages is not partitioned; run '
+                              'database/migrations/partition_chat_messages.sql')
+                        return False
+                    conn.execute(text(f'DROP TABLE {PARENT}'))
+                    conn.execute(text(PARTITIONED_DDL))
+                    conn.execute(text(PARTITIONED_INDEX_DDL))
+                    conn.execute(text(SEARCH_INDEX_DDL))
+                    print('✅ chat_messages recreated as a partitioned table')
+        except Exception as e:
+            print(f'❌ Error preparing chat partitions: {str(e)}')
+            return False
+
+        self.run_maintenance()
+        return True
+
+    # ------------------------------------------------------------------ maintenance
+
+    def partitions(self, conn):
+        """{month: partition name} of attached monthly partitions"""
+        rows = conn.execute(text("""
+            SELECT child.relname FROM pg_inherits i
+            JOIN pg_class parent ON parent.oid = i.inhparent
+            JOIN pg_class child ON child.oid = i.inhrelid
+            WHERE parent.relname = :name
+        """), {'name': PARENT})
+        result = {}
+        for (name,) in rows:
+            match = PARTITION_RE.match(name)
+            if match:
+                result[date(int(match.group(1)), int(match.group(2)), 1)] = name
+        return result
+
+    def ensure_partitions(self, today=None):
+        """Create missing partitions from the current month up to months_ahead"""
+        current = month_start(today or datetime.utcnow().date())
+        created = []
+        with db.engine.begin() as conn:
+            existing = self.partitions(conn)
+            for offset in range(self.months_ahead + 1):
+                month = add_months(current, offset)
+                if month in existing:
+                    continue
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {PARENT} "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+                ))
+                created.append(partition_name(month))
+        return created
+
+    def apply_retention(self, today=None):
+        """Detach and drop (or archive) partitions that ended before the retention window"""
+        if not self.retention_months:
+            return []
+
+        cutoff = add_months(month_start(today or datetime.utcnow().date()), -self.retention_months)
+        # DETACH CONCURRENTLY no puede ejecutarse dentro de una transacción
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            concurrently = conn.execute(text('SHOW server_version_num')).scalar()
+            concurrently = 'CONCURRENTLY' if int(concurrently) >= 140000 else ''
+            expired = sorted((m, n) for m, n in self.partitions(conn).items()
+                             if add_months(m, 1) <= cutoff)
+
+            for month, name in expired:
+                conn.execute(text(f'ALTER TABLE {PARENT} DETACH PARTITION {name} {concurrently}'))
+                if self.archive:
+                    archived = f'{PARENT}_archive_y{month.year}m{month.month:02d}'
+                    conn.execute(text(f'ALTER TABLE {name} RENAME TO {archived}'))
+                else:
+                    conn.execute(text(f'DROP TABLE {name}'))
+                print(f'🗄️ Chat partition {name} {"archived" if self.archive else "dropped"}')
+        return [name for _, name in expired]
+
+    def run_maintenance(self):
+        if not self.enabled():
+            return
+        try:
+            created = self.ensure_partitions()
+            expired = self.apply_retention()
+            if created or expired:
+                print(f'✅ Chat partitions maintained: created={created} expired={expired}')
+        except Exception as e:
+            print(f'❌ Error maintaining chat partitions: {str(e)}')
+
+    def start(self):
+        """Run maintenance periodically in the background"""
+        if self.socketio is None or not self.maintenance_interval:
+            return
+        self.socketio.start_background_task(self._maintenance_loop)
+
+    def _maintenance_loop(self):
+        while True:
+            self.socketio.sleep(self.maintenance_interval)
+            with self.app.app_context():
+                self.run_maintenance()
+
+    # ------------------------------------------------------------------ pruning check
+
+    def explain_recent(self, room='general', limit=50, before=None):
+        """
+        EXPLAIN ANALYZE the recent/history query of a room and report the
+        partitions it actually scanned (ordered Append stops after LIMIT rows,
+        so older partitions show up as never executed).
+        """
+        sql = f'SELECT * FROM {PARENT} WHERE room = :room'
+        params = {'room': room, 'limit': limit}
+        if before is not None:
+            sql += ' AND timestamp < :before'
+            params['before'] = before
+        sql += ' ORDER BY timestamp DESC LIMIT :limit'
+
+        with db.engine.connect() as conn:
+            plan = conn.execute(text(f'EXPLAIN (ANALYZE, COSTS OFF, FORMAT JSON) {sql}'), params).scalar()
+            attached = sorted(self.partitions(conn).values())
+
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        in_plan, executed = set(), set()
+
+        def walk(node):
+            relation = node.get('Relation Name')
+            if relation and PARTITION_RE.match(relation):
+                in_plan.add(relation)
+                if node.get('Actual Loops', 0) > 0:
+                    executed.add(relation)
+            for child in node.get('Plans', []):
+                walk(child)
+
+        walk(plan[0]['Plan'])
+        return {
+            'query': sql,
+            'partitions_attached': len(attached),
+            'partitions_in_plan': sorted(in_plan),
+            'partitions_scanned': sorted(executed),
+            'pruned_at_plan_time': len(attached) - len(in_plan)
+        }
+
+
+chat_partitions = ChatPartitionManager()
@@ -1,6 +1,19 @@
 from flask_socketio import emit, join_room, leave_room
+from sqlalchemy import and_, func, literal_column, or_
 from app.models.database import db, ChatMessage, User
+from app.services.unread_tracker import unread_tracker
 from datetime import datetime
+import base64
+import html
+import re
+
+# Búsqueda de texto: 'simple' (sin stemming) como literal para que coincida
+# con el índice GIN ix_chat_messages_message_fts
+SEARCH_REGCONFIG = literal_column("'simple'::regconfig")
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_STOP = '\x03'
+HEADLINE_OPTIONS = (f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, '
+                    'MaxWords=30, MinWords=10, MaxFragments=2')
 
 class ChatService:
     @staticmethod
@@ -15,11 +28,35 @@ class ChatService:
             )
             db.session.add(chat_message)
             db.session.commit()
+            ChatService._record_unread(room, user_id)
             return chat_message
         except Exception as e:
             db.session.rollback()
             return None
     
+    @staticmethod
+    def _record_unread(room, user_id):
+        # El mensaje ya está guardado: un fallo del contador no debe romper el envío
+        try:
+            unread_tracker.record_message(room, int(user_id))
+        except Exception as e:
+            print(f'⚠️ Unread counter not updated for room {room}: {str(e)}')
+    
+    @staticmethod
+    def get_unread_counts(user_id):
+        """Get unread message counts per room for a user"""
+        rooms = unread_tracker.unread_for(int(user_id))
+        return {
+            'user_id': int(user_id),
+            'rooms': rooms,
+            'total': sum(rooms.values())
+        }
+    
+    @staticmethod
+    def mark_room_read(user_id, room='general'):
+        """Mark all messages of a room as read; returns the read marker"""
+        return unread_tracker.mark_read(int(user_id), room)
+    
     @staticmethod
     def get_recent_messages(room='general', limit=50):
         """Get recent messages from a chat room"""
@@ -61,6 +98,85 @@ class ChatService:
                 'has_prev': False
             }
     
+    @staticmethod
+    def search_messages(room, query, cursor=None, limit=20):
+        """Full-text search in a room, newest first, paginated by (timestamp, id)"""
+        query = (query or '').strip()
+        if not query:
+            raise ValueError('Search query is required')
+        if len(query) > 200:
+            raise ValueError('Search query is too long')
+        
+        page = db.session.query(ChatMessage.id, ChatMessage.timestamp)\
+                         .filter(ChatMessage.room == room)
+        if cursor:
+            before_timestamp, before_id = ChatService._decode_cursor(cursor)
+            page = page.filter(or_(ChatMessage.timestamp < before_timestamp,
+                                   and_(ChatMessage.timestamp == before_timestamp,
+                                        ChatMessage.id < before_id)))
+        
+        postgres = db.engine.dialect.name == 'postgresql'
+        if postgres:
+            # websearch_to_tsquery acepta la entrada del usuario sin errores de sintaxis
+            tsquery = func.websearch_to_tsquery(SEARCH_REGCONFIG, query)
+            page = page.filter(func.to_tsvector(SEARCH_REGCONFIG, ChatMessage.message).op('@@')(tsquery))
+        else:
+            terms = query.split()
+            for term in terms:
+                escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                page = page.filter(ChatMessage.message.ilike(f'%{escaped}%', escape='\\'))
+        
+        page = page.order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc())\
+                   .limit(limit + 1)\
+                   .subquery()
+        
+        # ts_headline solo sobre las filas de la página
+        headline = func.ts_headline(SEARCH_REGCONFIG, ChatMessage.message, tsquery, HEADLINE_OPTIONS) \
+            if postgres else ChatMessage.message
+        rows = db.session.query(ChatMessage, headline)\
+                         .join(page, and_(ChatMessage.id == page.c.id,
+                                          ChatMessage.timestamp == page.c.timestamp))\
+                         .order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc())\
+                         .all()
+        
+        results = []
+        for message, snippet in rows[:limit]:
+            if not postgres:
+                pattern = re.compile('|'.join(re.escape(t) for t in terms), re.IGNORECASE)
+                snippet = pattern.sub(lambda m: f'{HIGHLIGHT_START}{m.group(0)}{HIGHLIGHT_STOP}', snippet)
+            results.append({**message.to_dict(), 'highlight': ChatService._highlight(snippet)})
+        
+        has_next = len(rows) > limit
+        return {
+            'room': room,
+            'query': query,
+            'results': results,
+            'has_next': has_next,
+            'next_cursor': ChatService._encode_cursor(rows[limit - 1][0]) if has_next and limit else None
+        }
+    
+    @staticmethod
+    def _highlight(snippet):
+        """Escape the snippet, then turn the headline delimiters into <mark> tags"""
+        return html.escape(snippet)\
+                   .replace(HIGHLIGHT_START, '<mark>')\
+                   .replace(HIGHLIGHT_STOP, '</mark>')
+    
+    @staticmethod
+    def _encode_cursor(message):
+        """Opaque keyset cursor for (timestamp, id)"""
+        raw = f'{message.timestamp.isoformat()}|{message.id}'
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+    
+    @staticmethod
+    def _decode_cursor(cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            timestamp, message_id = base64.urlsafe_b64decode(padded).decode().split('|')
+            return datetime.fromisoformat(timestamp), int(message_id)
+        except Exception:
+            raise ValueError('Invalid cursor')
+    
     @staticmethod
     def validate_message_data(data):
         """Validate chat message data"""
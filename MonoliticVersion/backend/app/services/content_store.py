@@ -0,0 +1,249 @@
+import hashlib
+import os
+import re
+import tempfile
+import time
+from datetime import datetime
+
+from flask import Request
+from sqlalchemy import event, text
+
+from app.models.database import db
+
+# INSERT ... ON CONFLICT funciona igual en PostgreSQL y SQLite (>= 3.24)
+ACQUIRE_SQL = text("""
+    INSERT INTO stored_files (path, sha256, size, ref_count, created_at)
+    VALUES (:path, :sha256, :size, 1, :now)
+    ON CONFLICT (path) DO UPDATE SET ref_count = stored_files.ref_count + 1
+""")
+RELEASE_SQL = text('UPDATE stored_files SET ref_count = ref_count - 1 WHERE path = :path')
+REMAINING_SQL = text('SELECT ref_count FROM stored_files WHERE path = :path')
+DELETE_SQL = text('DELETE FROM stored_files WHERE path = :path AND ref_count <= 0')
+# Fila provisional con ref_count 0 que bloquea la ruta mientras se borra el archivo
+RECLAIM_SQL = text("""
+    INSERT INTO stored_files (path, sha256, size, ref_count, created_at)
+    VALUES (:path, :sha256, 0, 0, :now)
+    ON CONFLICT (path) DO NOTHING
+""")
+
+# Archivos sin referencias pendientes de borrar cuando la transacción confirme
+RECLAIM_KEY = 'content_store_reclaim'
+
+# ab/cd/<sha256>.<ext>, con los dos primeros niveles tomados del propio hash
+CONTENT_PATH = re.compile(r'([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}\.[a-z0-9]+$')
+
+
+class StagedUpload:
+    """
+    Temp file in the staging folder that hashes what is written to it.
+
+    The form parser writes each uploaded file straight into one of these
+    (see ``ContentStoreRequest``), so the body is read once, in chunks,
+    and the SHA-256 is ready when the view runs. Closing it removes the
+    temp file unless it was moved into the store.
+    """
+
+    def __init__(self, directory):
+        fd, self.name = tempfile.mkstemp(dir=directory, suffix='.part')
+        self._file = os.fdopen(fd, 'w+b')
+        self._sha256 = hashlib.sha256()
+        self.size = 0
+        self.placed = False
+
+    def write(self, data):
+        self._sha256.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def hexdigest(self):
+        return self._sha256.hexdigest()
+
+    def place(self, target):
+        """Atomically move the file to ``target`` (same filesystem as the staging folder)"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.name, target)
+        self.placed = True
+
+    def close(self):
+        self._file.close()
+        if not self.placed:
+            try:
+                os.remove(self.name)
+            except FileNotFoundError:
+                pass
+
+    def __iter__(self):
+        return iter(self._file)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+class ContentStore:
+    """
+    Content-addressed storage of uploaded audio under ``UPLOAD_FOLDER``.
+
+    A file lives at ``ab/cd/<sha256>.<ext>``: identical uploads share one
+    file and names never collide. ``stored_files.ref_count`` counts the
+    songs pointing at it; ``store`` and ``release`` change it in the
+    caller's transaction, and the release that takes it to zero deletes
+    the row.
+
+    The file itself is only removed once that transaction commits, so a
+    rollback never leaves a song pointing at a missing file. After the
+    commit, ``_reclaim`` inserts a placeholder row for the path in a
+    transaction of its own and unlinks the file only if it could: if a
+    ``store`` re-acquired the content in between, the row exists and the
+    file stays, and a ``store`` arriving later waits on the placeholder,
+    then finds the file missing and places its own copy. A file placed by
+    a request that rolls back, or left behind by a process that died
+    before reclaiming it, has no row (the same content uploaded later
+    reuses it).
+    """
+
+    def __init__(self, chunk_size=1024 * 1024, staging_max_age=86400):
+        self.chunk_size = chunk_size
+        self.staging_max_age = staging_max_age
+        self.root = None
+        self.staging = None
+
+    def init_app(self, app):
+        root = app.config['UPLOAD_FOLDER']
+        self.root = root if os.path.isabs(root) else os.path.join(app.root_path, root)
+        # Misma partición que los archivos: el paso al almacén es un rename atómico
+        self.staging = os.path.join(self.root, '.staging')
+        os.makedirs(self.staging, exist_ok=True)
+        self._sweep_staging()
+        app.request_class = ContentStoreRequest
+        if not event.contains(db.session, 'after_commit', self._after_commit):
+            event.listen(db.session, 'after_commit', self._after_commit)
+            event.listen(db.session, 'after_rollback', self._after_rollback)
+
+    def store(self, file):
+        """
+        Content path of an uploaded ``FileStorage``, taking a reference to it
+        in the current session (caller commits)
+        """
+        staged = file.stream if isinstance(file.stream, StagedUpload) else self._stage(file.stream)
+        try:
+            return self._acquire(staged.hexdigest(), staged.size, file.filename, staged.place)
+        finally:
+            staged.close()
+
+    def store_file(self, source, filename):
+        """
+        ``store`` for a complete file on disk, on the same filesystem as the
+        store. New content is hard-linked into place; ``source`` is left for
+        the caller to remove once its transaction commits.
+        """
+        sha256 = hashlib.sha256()
+        size = 0
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                sha256.update(chunk)
+                size += len(chunk)
+        return self._acquire(sha256.hexdigest(), size, filename, lambda target: self._link(source, target))
+
+    def _acquire(self, digest, size, filename, place):
+        extension = filename.rsplit('.', 1)[1].lower()
+        path = f'{digest[:2]}/{digest[2:4]}/{digest}.{extension}'
+
+        db.session.execute(ACQUIRE_SQL, {'path': path, 'sha256': digest,
+                                         'size': size, 'now': datetime.utcnow()})
+        # Con la referencia tomada ningún release puede borrar el archivo
+        target = self.absolute(path)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            place(target)
+        return path
+
+    def release(self, path):
+        """
+        Drop a reference taken by ``store``; True if it was the last one, in
+        which case the file is removed after the caller commits
+        """
+        db.session.execute(RELEASE_SQL, {'path': path})
+        remaining = db.session.execute(REMAINING_SQL, {'path': path}).scalar()
+        if remaining is None or remaining > 0:
+            return False
+
+        db.session.execute(DELETE_SQL, {'path': path})
+        db.session.info.setdefault(RECLAIM_KEY, set()).add(path)
+        return True
+
+    def release_url(self, url):
+        """``release`` for the ``file_path`` of a song; files outside the store are left alone"""
+        path = self.path_from_url(url)
+        return self.release(path) if path else False
+
+    @staticmethod
+    def path_from_url(url):
+        match = CONTENT_PATH.search(url or '')
+        return match.group(0) if match else None
+
+    def _after_commit(self, session):
+        for path in session.info.pop(RECLAIM_KEY, ()):
+            try:
+                self._reclaim(path)
+            except Exception as e:
+                # El archivo queda sin fila: una subida del mismo contenido lo reutiliza
+                print(f'❌ Error reclaiming {path}: {str(e)}')
+
+    @staticmethod
+    def _after_rollback(session):
+        session.info.pop(RECLAIM_KEY, None)
+
+    def _reclaim(self, path):
+        # Transacción propia: la sesión que confirmó ya no puede ejecutar SQL
+        with db.engine.begin() as connection:
+            placeholder = connection.execute(RECLAIM_SQL, {'path': path, 'sha256': path.rsplit('/', 1)[1][:64],
+                                                           'now': datetime.utcnow()})
+            if placeholder.rowcount != 1:
+                return  # otra subida volvió a referenciar el contenido
+            try:
+                os.remove(self.absolute(path))
+            except FileNotFoundError:
+                pass
+            connection.execute(DELETE_SQL, {'path': path})
+
+    def absolute(self, path):
+        return os.path.join(self.root, *path.split('/'))
+
+    @staticmethod
+    def _link(source, target):
+        try:
+            os.link(source, target)
+        except FileExistsError:
+            pass  # otra subida del mismo contenido lo colocó entretanto
+
+    def _stage(self, stream):
+        # Archivo que no llegó por ContentStoreRequest: se copia por bloques al staging
+        staged = StagedUpload(self.staging)
+        for chunk in iter(lambda: stream.read(self.chunk_size), b''):
+            staged.write(chunk)
+        return staged
+
+    def _sweep_staging(self):
+        # Restos de subidas interrumpidas (proceso terminado antes de cerrar el temporal)
+        cutoff = time.time() - self.staging_max_age
+        for name in os.listdir(self.staging):
+            path = os.path.join(self.staging, name)
+            try:
+                if name.endswith('.part') and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+class ContentStoreRequest(Request):
+    """Request whose uploaded files are written straight into the store's staging folder"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if content_store.staging is None:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        return StagedUpload(content_store.staging)
+
+
+content_store = ContentStore()
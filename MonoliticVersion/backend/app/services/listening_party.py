@@ -0,0 +1,211 @@
+import threading
+import time
+
+MIN_RATE = 0.5
+MAX_RATE = 2.0
+
+# Reloj del servidor en ms epoch derivado de un reloj monótono: los ajustes
+# del reloj del sistema no hacen saltar las posiciones de reproducción
+_WALL_ANCHOR_MS = time.time() * 1000
+_MONO_ANCHOR = time.monotonic()
+
+
+def server_time_ms():
+    return _WALL_ANCHOR_MS + (time.monotonic() - _MONO_ANCHOR) * 1000
+
+
+class PartySession:
+    """Authoritative playback state of one room"""
+
+    __slots__ = ('room', 'host_id', 'song_id', 'position_ms', 'rate', 'paused',
+                 'updated_at', 'version')
+
+    def __init__(self, room, host_id, song_id, position_ms=0, rate=1.0, paused=False):
+        self.room = room
+        self.host_id = host_id
+        self.song_id = song_id
+        self.position_ms = position_ms
+        self.rate = rate
+        self.paused = paused
+        self.updated_at = server_time_ms()
+        self.version = 1
+
+    def position_at(self, now_ms):
+        if self.paused:
+            return self.position_ms
+        return self.position_ms + (now_ms - self.updated_at) * self.rate
+
+    def rebase(self, now_ms):
+        """Fold elapsed playback into position_ms before changing rate/pause/seek"""
+        self.position_ms = self.position_at(now_ms)
+        self.updated_at = now_ms
+        self.version += 1
+
+    def snapshot(self, now_ms=None):
+        now_ms = server_time_ms() if now_ms is None else now_ms
+        return {
+            'room': self.room,
+            'host_id': self.host_id,
+            'song_id': self.song_id,
+            'position_ms': round(self.position_at(now_ms)),
+            'rate': self.rate,
+            'paused': self.paused,
+            'server_time': round(now_ms),
+            'version': self.version
+        }
+
+    def tick(self, now_ms):
+        """Compact drift-correction payload: [room, version, server_time, position_ms]"""
+        return [self.room, self.version, round(now_ms), round(self.position_at(now_ms))]
+
+
+class ListeningPartyManager:
+    """
+    Synchronized playback for chat rooms.
+
+    Clients estimate their clock offset with ``clock_sync`` (NTP-style,
+    keeping the lowest round-trip sample) and compute the position locally
+    as ``position_ms + (server_now - server_time) * rate``. The server owns
+    the state of each room and bumps ``version`` on every host command.
+    Playing parties get a compact ``party_tick`` every ``tick_interval``
+    seconds so members can correct drift.
+    """
+
+    def __init__(self, tick_interval=1.0):
+        self.tick_interval = tick_interval
+        self.socketio = None
+
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._ticker_started = False
+
+    def init_app(self, socketio, tick_interval=None):
+        self.socketio = socketio
+        if tick_interval is not None:
+            self.tick_interval = tick_interval
+
+    @staticmethod
+    def clock_sync(t0, received_at):
+        """Timestamps for one NTP-style exchange (t1 = received, t2 = replied)"""
+        return {'t0': t0, 't1': received_at, 't2': server_time_ms()}
+
+    def state(self, room):
+        with self._lock:
+            session = self._sessions.get(room)
+        return session.snapshot() if session else None
+
+    def start(self, room, host_id, song_id, position_ms=0, rate=1.0, paused=False):
+        if song_id is None:
+            raise ValueError('song_id is required')
+        session = PartySession(room, str(host_id), song_id, self._valid_position(position_ms),
+                               self._valid_rate(rate), bool(paused))
+        with self._lock:
+            previous = self._sessions.get(room)
+            if previous and previous.host_id != session.host_id:
+                raise PermissionError('Only the host can restart the party')
+            if previous:
+                session.version = previous.version + 1
+            self._sessions[room] = session
+        self._ensure_ticker()
+        print(f'🎧 Listening party started in {room} by {host_id}')
+        return session.snapshot()
+
+    def control(self, room, user_id, action, data):
+        """Apply a host command: play, pause, seek, rate, song or host"""
+        with self._lock:
+            session = self._sessions.get(room)
+            if session is None:
+                raise ValueError('No listening party in this room')
+            if session.host_id != str(user_id):
+                raise PermissionError('Only the host can control playback')
+
+            # Validar antes de rebase: un comando inválido no cambia version ni posición
+            changes = self._changes(action, data)
+            now = server_time_ms()
+            session.rebase(now)
+            for field, value in changes.items():
+                setattr(session, field, value)
+            return session.snapshot(now)
+
+    def stop(self, room, user_id=None):
+        with self._lock:
+            session = self._sessions.get(room)
+            if session is None:
+                return False
+            if user_id is not None and session.host_id != str(user_id):
+                raise PermissionError('Only the host can stop the party')
+            del self._sessions[room]
+        print(f'🎧 Listening party stopped in {room}')
+        return True
+
+    @classmethod
+    def _changes(cls, action, data):
+        """Session fields a host command sets; raises ValueError if it is invalid"""
+        if action == 'play':
+            return {'paused': False}
+        if action == 'pause':
+            return {'paused': True}
+        if action == 'seek':
+            return {'position_ms': cls._valid_position(data.get('position_ms', 0))}
+        if action == 'rate':
+            return {'rate': cls._valid_rate(data.get('rate', 1.0))}
+        if action == 'song':
+            if data.get('song_id') is None:
+                raise ValueError('song_id is required')
+            return {'song_id': data['song_id'],
+                    'position_ms': cls._valid_position(data.get('position_ms', 0)),
+                    'paused': bool(data.get('paused', False))}
+        if action == 'host':
+            if not data.get('host_id'):
+                raise ValueError('host_id is required')
+            return {'host_id': str(data['host_id'])}
+        raise ValueError(f'Unknown action: {action}')
+
+    @staticmethod
+    def _valid_position(position):
+        try:
+            return max(0.0, float(position))
+        except (TypeError, ValueError):
+            raise ValueError('position_ms must be a number')
+
+    @staticmethod
+    def _valid_rate(rate):
+        try:
+            rate = float(rate)
+        except (TypeError, ValueError):
+            raise ValueError('rate must be a number')
+        if not MIN_RATE <= rate <= MAX_RATE:
+            raise ValueError(f'rate must be between {MIN_RATE} and {MAX_RATE}')
+        return rate
+
+    def _ensure_ticker(self):
+        with self._lock:
+            if self._ticker_started or not self.tick_interval:
+                return
+            self._ticker_started = True
+        self.socketio.start_background_task(self._tick_loop)
+
+    def _tick_loop(self):
+        while True:
+            self.socketio.sleep(self.tick_interval)
+            try:
+                self.tick()
+            except Exception as e:
+                print(f'❌ Error sending listening party ticks: {str(e)}')
+
+    def tick(self):
+        """Send one drift-correction tick to every playing party; end parties of empty rooms"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+
+        manager = self.socketio.server.manager
+        for session in sessions:
+            if not any(True for _ in manager.get_participants('/', session.room)):
+                self.stop(session.room)
+                continue
+            if not session.paused:
+                # Un solo emit por sala: el paquete se codifica una vez
+                self.socketio.emit('party_tick', session.tick(server_time_ms()), to=session.room)
+
+
+listening_party = ListeningPartyManager()
@@ -1,7 +1,7 @@
-import os
-from werkzeug.utils import secure_filename
 from sqlalchemy import or_
 
+from app.services.content_store import content_store
+
 
 class MusicService:
     ALLOWED_EXTENSIONS = {'mp3', 'wav', 'flac', 'ogg', 'm4a', 'aac'}
@@ -14,17 +14,14 @@ class MusicService:
                ) in MusicService.ALLOWED_EXTENSIONS
 
     @staticmethod
-    def save_file(file, upload_folder):
-        """Save uploaded file to disk"""
+    def save_file(file):
+        """
+        Store an uploaded file by content and return its path relative to the
+        upload folder (``ab/cd/<sha256>.mp3``). Takes a reference in the
+        current session: the caller commits it with the song.
+        """
         if file and MusicService.allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            file_path = os.path.join(upload_folder, filename)
-
-            # Create upload folder if it doesn't exist
-            os.makedirs(upload_folder, exist_ok=True)
-
-            file.save(file_path)
-            return file_path
+            return content_store.store(file)
         return None
 
     @staticmethod
@@ -76,6 +73,12 @@ class MusicService:
     @staticmethod
     def search_songs_by_criteria(db, Song, title=None, artist=None, query=None):
         """Search songs by multiple criteria"""
+        search = MusicService.search_songs_query(Song, title=title, artist=artist, query=query)
+        return search.all() if search is not None else []
+
+    @staticmethod
+    def search_songs_query(Song, title=None, artist=None, query=None):
+        """Query for search_songs_by_criteria (None when there are no criteria)"""
         if query:
             # Búsqueda general
             return Song.query.filter(
@@ -86,7 +89,7 @@ class MusicService:
                     Song.artist_name.ilike(f'%{query}%'),
                     Song.artist_nickname.ilike(f'%{query}%')
                 )
-            ).all()
+            )
 
         # Búsqueda específica por título y artista
         filters = []
@@ -100,9 +103,39 @@ class MusicService:
             ))
 
         if filters:
-            return Song.query.filter(*filters).all()
+            return Song.query.filter(*filters)
 
-        return []
+        return None
+
+    @staticmethod
+    def upload_fields(form):
+        """(song fields, None) from the form of an upload, or (None, error message)"""
+        title = (form.get('title') or '').strip()
+        artist = (form.get('artist') or '').strip()
+
+        if not title:
+            return None, 'Title is required'
+        if not artist:
+            return None, 'Artist is required'
+
+        # Convert duration to int if provided
+        duration = form.get('duration') or None
+        if duration is not None:
+            try:
+                duration = int(float(duration))
+            except (ValueError, TypeError):
+                duration = None
+
+        return {
+            'title': title,
+            'artist': artist,
+            'album': (form.get('album') or '').strip() or None,
+            'duration': duration,
+            'cover_url': (form.get('cover_url') or '').strip() or None,
+            'artist_name': (form.get('artist_name') or '').strip() or artist,
+            'artist_nickname': (form.get('artist_nickname') or '').strip() or None,
+            'nationality': (form.get('nationality') or '').strip() or None
+        }, None
 
     @staticmethod
     def check_duplicate_song(db, Song, title, artist):
@@ -0,0 +1,108 @@
+import functools
+from datetime import datetime, timezone
+
+from flask import current_app, g, request
+from sqlalchemy import text
+
+from app.models.database import db, ResourceVersion
+from app.utils.streaming import wants_ndjson
+
+# INSERT ... ON CONFLICT funciona igual en PostgreSQL y SQLite (>= 3.24)
+BUMP_SQL = text("""
+    INSERT INTO resource_versions (scope, version, updated_at)
+    VALUES (:scope, 1, :now)
+    ON CONFLICT (scope) DO UPDATE
+        SET version = resource_versions.version + 1, updated_at = excluded.updated_at
+""")
+
+
+class ResourceVersions:
+    """
+    Version counters behind the conditional GETs of the catalog and favorites.
+
+    Writers call ``bump`` in the same transaction as the change, so the
+    version and the data commit together. ``conditional`` turns a view into
+    one that answers ``If-None-Match`` / ``If-Modified-Since`` with a 304
+    after a single primary-key lookup, before querying or serializing rows.
+    """
+
+    CATALOG = 'catalog'
+
+    @staticmethod
+    def favorites(user_id):
+        return f'favorites:{user_id}'
+
+    def bump(self, *scopes):
+        """Increment the versions of scopes in the current session (caller commits)"""
+        now = datetime.utcnow()
+        for scope in scopes:
+            db.session.execute(BUMP_SQL, {'scope': scope, 'now': now})
+
+    def current(self, scopes):
+        """{scope: (version, updated_at)}; scopes never written are at version 0"""
+        rows = ResourceVersion.query.filter(ResourceVersion.scope.in_(scopes)).all()
+        found = {row.scope: (row.version, row.updated_at) for row in rows}
+        return {scope: found.get(scope, (0, None)) for scope in scopes}
+
+    @staticmethod
+    def etag_for(versions):
+        return '-'.join(str(version) for version, _ in versions.values())
+
+    def conditional(self, scopes_for, private=False, negotiated=False):
+        """
+        Add a strong ETag and Last-Modified to successful responses of a GET
+        view and answer matching revalidations with 304 without calling it.
+        ``scopes_for(**view_args)`` returns the version scopes the
+        representation depends on. ``negotiated`` views also answer NDJSON,
+        which gets its own ETag (and ``Vary: Accept``).
+        """
+        cache_control = 'private, no-cache' if private else 'no-cache'
+
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if request.method != 'GET':
+                    return view(*args, **kwargs)
+
+                try:
+                    versions = self.current(scopes_for(**kwargs))
+                except Exception as e:
+                    print(f'⚠️ Resource versions unavailable, serving without ETag: {str(e)}')
+                    return view(*args, **kwargs)
+
+                etag = self.etag_for(versions)
+                if negotiated and wants_ndjson():
+                    etag += '-ndjson'
+                modified = [updated_at for _, updated_at in versions.values() if updated_at]
+                last_modified = max(modified).replace(microsecond=0, tzinfo=timezone.utc) if modified else None
+                # La caché de respuestas incluye la versión en su clave
+                g.resource_etag = etag
+
+                if self._not_modified(etag, last_modified):
+                    response = current_app.response_class(status=304)
+                else:
+                    response = current_app.make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+
+                response.set_etag(etag)
+                if last_modified:
+                    response.last_modified = last_modified
+                response.headers['Cache-Control'] = cache_control
+                if negotiated:
+                    response.vary.add('Accept')
+                return response
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def _not_modified(etag, last_modified):
+        if request.if_none_match:
+            # If-None-Match tiene prioridad sobre If-Modified-Since (RFC 9110)
+            return request.if_none_match.contains_weak(etag)
+        if last_modified and request.if_modified_since:
+            return last_modified <= request.if_modified_since
+        return False
+
+
+resource_versions = ResourceVersions()
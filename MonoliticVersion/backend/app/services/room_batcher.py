@@ -0,0 +1,83 @@
+import threading
+
+
+class RoomBatcher:
+    """
+    Micro-batcher for chat broadcasts.
+
+    Messages sent to a room within ``window_ms`` are emitted together as one
+    ``new_messages`` event ({room, messages}), encoded once by Socket.IO and
+    reused for every member. A window holding a single message is emitted as
+    the usual ``new_message``. ``window_ms`` = 0 disables batching.
+    """
+
+    def __init__(self, window_ms=15, max_batch=100):
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.socketio = None
+
+        self._buffers = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flusher_started = False
+
+    def init_app(self, socketio, window_ms=None, max_batch=None):
+        self.socketio = socketio
+        if window_ms is not None:
+            self.window = window_ms / 1000.0
+        if max_batch is not None:
+            self.max_batch = max_batch
+
+    def add(self, room, message):
+        """Queue a message for room (emitted within one batching window)"""
+        if self.window <= 0:
+            self._emit(room, [message])
+            return
+
+        full_batch = None
+        with self._lock:
+            buffer = self._buffers.setdefault(room, [])
+            buffer.append(message)
+            if len(buffer) >= self.max_batch:
+                full_batch = self._buffers.pop(room)
+
+        if full_batch is not None:
+            self._emit(room, full_batch)
+            return
+
+        self._ensure_flusher()
+        self._wakeup.set()
+
+    def flush(self):
+        """Emit everything buffered so far"""
+        with self._lock:
+            buffers, self._buffers = self._buffers, {}
+        for room, messages in buffers.items():
+            self._emit(room, messages)
+
+    def _emit(self, room, messages):
+        try:
+            if len(messages) == 1:
+                self.socketio.emit('new_message', messages[0], to=room)
+            else:
+                self.socketio.emit('new_messages', {'room': room, 'messages': messages}, to=room)
+        except Exception as e:
+            print(f'❌ Error broadcasting {len(messages)} messages to room {room}: {str(e)}')
+
+    def _ensure_flusher(self):
+        with self._lock:
+            if self._flusher_started:
+                return
+            self._flusher_started = True
+        self.socketio.start_background_task(self._flush_loop)
+
+    def _flush_loop(self):
+        while True:
+            self._wakeup.wait()
+            self.socketio.sleep(self.window)
+            # Lo que llegue durante el flush abre una nueva ventana
+            self._wakeup.clear()
+            self.flush()
+
+
+room_batcher = RoomBatcher()
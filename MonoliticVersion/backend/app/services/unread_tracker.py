@@ -0,0 +1,209 @@
+import atexit
+import threading
+from datetime import datetime
+
+from sqlalchemy import func, text
+
+from app.models.database import db, ChatMessage, ChatReadMarker, ChatRoomCounter
+
+# INSERT ... ON CONFLICT funciona igual en PostgreSQL y SQLite (>= 3.24)
+CREATE_COUNTER_SQL = text("""
+    INSERT INTO chat_room_counters (room, message_count, updated_at)
+    VALUES (:room, :count, :now)
+    ON CONFLICT (room) DO NOTHING
+""")
+# Cada proceso suma lo que contó: ninguno pisa los mensajes contados por otro
+INCREMENT_COUNTER_SQL = text("""
+    INSERT INTO chat_room_counters (room, message_count, updated_at)
+    VALUES (:room, :count, :now)
+    ON CONFLICT (room) DO UPDATE
+        SET message_count = chat_room_counters.message_count + excluded.message_count,
+            updated_at = excluded.updated_at
+""")
+# GREATEST portable (SQLite no lo tiene): un marcador nunca retrocede
+ADVANCE_MARKER_SQL = text("""
+    INSERT INTO chat_read_markers (user_id, room, last_read_seq, updated_at)
+    VALUES (:user_id, :room, :seq, :now)
+    ON CONFLICT (user_id, room) DO UPDATE
+        SET last_read_seq = CASE WHEN excluded.last_read_seq > chat_read_markers.last_read_seq
+                                 THEN excluded.last_read_seq ELSE chat_read_markers.last_read_seq END,
+            updated_at = excluded.updated_at
+""")
+
+
+class UnreadTracker:
+    """
+    In-memory unread counters for the chat.
+
+    Each room keeps a message counter and each user a read marker per room
+    (the counter value when they last read it). ``save_message`` bumps the
+    counter, so unread = counter - marker and ``unread_for`` is O(rooms)
+    instead of O(messages).
+
+    Every ``flush_interval`` seconds the messages counted since the last
+    flush are added to the stored counters as deltas, dirty markers are
+    written (a stored marker only moves forward) and the in-memory counters
+    are refreshed from the table, so several processes can count the same
+    room without overwriting each other.
+    """
+
+    def __init__(self, flush_interval=5.0):
+        self.flush_interval = flush_interval
+        self.app = None
+        self.socketio = None
+
+        self._counters = {}
+        self._pending = {}  # mensajes contados aún no sumados en la tabla
+        self._markers = {}
+        self._dirty_markers = set()
+        self._lock = threading.Lock()
+        self._flusher_started = False
+
+    def init_app(self, app, socketio, flush_interval=None):
+        self.app = app
+        self.socketio = socketio
+        if flush_interval is not None:
+            self.flush_interval = flush_interval
+
+    def record_message(self, room, sender_id=None):
+        """Count a newly saved message; the sender has implicitly read it"""
+        bootstrapped = self._load_counters([room])
+        with self._lock:
+            if room not in bootstrapped:
+                # Un conteo inicial desde chat_messages ya incluye este mensaje
+                self._counters[room] += 1
+                self._pending[room] = self._pending.get(room, 0) + 1
+            seq = self._counters[room]
+
+        if sender_id is not None:
+            self._set_marker(sender_id, room, seq)
+        self._ensure_flusher()
+
+    def mark_read(self, user_id, room):
+        """Mark every message in room as read by user; returns the marker"""
+        self._load_counters([room])
+        with self._lock:
+            seq = self._counters[room]
+        self._set_marker(user_id, room, seq)
+        self._ensure_flusher()
+        return seq
+
+    def unread_for(self, user_id):
+        """{room: unread count} for every room the user has read before"""
+        markers = self._user_markers(user_id)
+        with self._lock:
+            rooms = list(markers)
+        self._load_counters(rooms)
+
+        with self._lock:
+            return {room: max(0, self._counters.get(room, 0) - markers[room]) for room in rooms}
+
+    def _set_marker(self, user_id, room, seq):
+        markers = self._user_markers(user_id)
+        with self._lock:
+            if markers.get(room, -1) < seq:
+                markers[room] = seq
+                self._dirty_markers.add((user_id, room))
+
+    def _user_markers(self, user_id):
+        with self._lock:
+            markers = self._markers.get(user_id)
+        if markers is not None:
+            return markers
+
+        rows = ChatReadMarker.query.filter_by(user_id=user_id).all()
+        with self._lock:
+            return self._markers.setdefault(user_id, {row.room: row.last_read_seq for row in rows})
+
+    def _load_counters(self, rooms):
+        """Load missing counters; returns the rooms bootstrapped by counting messages"""
+        with self._lock:
+            missing = [room for room in rooms if room not in self._counters]
+        if not missing:
+            return set()
+
+        stored = {row.room: row.message_count
+                  for row in ChatRoomCounter.query.filter(ChatRoomCounter.room.in_(missing)).all()}
+        counted = {}
+        uncounted = [room for room in missing if room not in stored]
+        if uncounted:
+            counted = {room: 0 for room in uncounted}
+            counted.update(dict(
+                db.session.query(ChatMessage.room, func.count(ChatMessage.id))
+                .filter(ChatMessage.room.in_(uncounted))
+                .group_by(ChatMessage.room)
+                .all()
+            ))
+            # Si otro proceso creó la fila entretanto, se usa la suya
+            now = datetime.utcnow()
+            with db.engine.begin() as connection:
+                connection.execute(CREATE_COUNTER_SQL, [{'room': room, 'count': count, 'now': now}
+                                                        for room, count in counted.items()])
+            stored.update(self._stored_counters(list(counted)))
+
+        with self._lock:
+            for room, count in stored.items():
+                self._counters.setdefault(room, count)
+        return set(counted)
+
+    @staticmethod
+    def _stored_counters(rooms):
+        with db.engine.connect() as connection:
+            rows = connection.execute(
+                db.select(ChatRoomCounter.room, ChatRoomCounter.message_count)
+                .where(ChatRoomCounter.room.in_(rooms))
+            )
+            return {room: count for room, count in rows}
+
+    def flush(self):
+        """Add pending counts to the table, persist dirty markers and refresh the counters"""
+        with self._lock:
+            deltas, self._pending = self._pending, {}
+            keys, self._dirty_markers = self._dirty_markers, set()
+            markers = [(user_id, room, self._markers[user_id][room]) for user_id, room in keys]
+
+        try:
+            with self.app.app_context():
+                now = datetime.utcnow()
+                with db.engine.begin() as connection:
+                    if deltas:
+                        connection.execute(INCREMENT_COUNTER_SQL, [{'room': room, 'count': delta, 'now': now}
+                                                                   for room, delta in deltas.items()])
+                    if markers:
+                        connection.execute(ADVANCE_MARKER_SQL, [{'user_id': user_id, 'room': room,
+                                                                 'seq': seq, 'now': now}
+                                                                for user_id, room, seq in markers])
+                self._refresh_counters()
+        except Exception as e:
+            print(f'❌ Error persisting unread counters: {str(e)}')
+            with self._lock:
+                for room, delta in deltas.items():
+                    self._pending[room] = self._pending.get(room, 0) + delta
+                self._dirty_markers.update(keys)
+
+    def _refresh_counters(self):
+        # Lo guardado (mensajes de todos los procesos) más lo pendiente en este
+        with self._lock:
+            rooms = list(self._counters)
+        if not rooms:
+            return
+        stored = self._stored_counters(rooms)
+        with self._lock:
+            for room, count in stored.items():
+                self._counters[room] = count + self._pending.get(room, 0)
+
+    def _ensure_flusher(self):
+        with self._lock:
+            if self._flusher_started:
+                return
+            self._flusher_started = True
+        atexit.register(self.flush)
+        self.socketio.start_background_task(self._flush_loop)
+
+    def _flush_loop(self):
+        while True:
+            self.socketio.sleep(self.flush_interval)
+            self.flush()
+
+
+unread_tracker = UnreadTracker()
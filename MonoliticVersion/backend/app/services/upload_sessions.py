@@ -0,0 +1,261 @@
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+from werkzeug.exceptions import ClientDisconnected
+
+from app.services.content_store import content_store
+
+try:
+    import fcntl
+except ImportError:  # Windows: el bloqueo solo vale dentro del proceso
+    fcntl = None
+
+SESSION_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class UploadSessionError(Exception):
+    """Protocol error of an upload session, with the HTTP status to answer"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class UploadSessions:
+    """
+    Resumable chunked uploads (tus-style) for audio too large for a single
+    request.
+
+    ``create`` opens a session for ``length`` bytes, the client ``append``s
+    chunks (PATCH with ``Upload-Offset``) and ``finalize`` hands the
+    assembled file to the content store and song creation. Each session is
+    ``<id>.part`` plus ``<id>.json`` in ``UPLOAD_FOLDER/.uploads``, so the
+    offset is simply the size of the part file: after a dropped connection
+    the bytes already written stay and the client resumes from the offset
+    the server reports. Chunks are short requests, so a large file never
+    holds a worker for the whole transfer.
+
+    Appends and finalize take an exclusive ``flock`` on the part file,
+    shared by every worker; a second writer gets 423 instead of waiting.
+    Finalize is idempotent: the song id is recorded in the session, and a
+    retry returns it. Sessions idle for ``ttl`` seconds (finalized ones
+    included) are removed by the background sweep.
+    """
+
+    def __init__(self, ttl=86400, max_size=1024 * 1024 * 1024, chunk_size=1024 * 1024, sweep_interval=3600):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+        self.sweep_interval = sweep_interval
+        self.directory = None
+        self.socketio = None
+        self._thread_locks = {}
+        self._guard = threading.Lock()
+
+    def init_app(self, app, socketio, ttl=None, max_size=None, sweep_interval=None):
+        if ttl is not None:
+            self.ttl = ttl
+        if max_size is not None:
+            self.max_size = max_size
+        if sweep_interval is not None:
+            self.sweep_interval = sweep_interval
+        self.socketio = socketio
+        # Junto al almacén por contenido: finalizar mueve el archivo con un rename
+        self.directory = os.path.join(content_store.root, '.uploads')
+        os.makedirs(self.directory, exist_ok=True)
+        if self.sweep_interval:
+            self.socketio.start_background_task(self._sweep_loop)
+
+    # ------------------------------------------------------------------ protocol
+
+    def create(self, filename, length):
+        if length <= 0:
+            raise UploadSessionError('Upload length must be positive')
+        if length > self.max_size:
+            raise UploadSessionError(f'Upload length exceeds {self.max_size} bytes', 413)
+
+        upload_id = secrets.token_hex(16)
+        open(self._part(upload_id), 'xb').close()
+        self._write_info(upload_id, {'id': upload_id, 'filename': filename,
+                                     'length': length, 'song_id': None})
+        return self.status(upload_id)
+
+    def status(self, upload_id):
+        """Session info with the current ``offset`` and ``expires_at`` (epoch seconds)"""
+        info = self._read_info(upload_id)
+        part = self._part(upload_id)
+        if os.path.exists(part):
+            info['offset'] = os.path.getsize(part)
+            last_activity = os.path.getmtime(part)
+        else:  # finalizada: el archivo ya está en el almacén
+            info['offset'] = info['length']
+            last_activity = os.path.getmtime(self._info(upload_id))
+        info['expires_at'] = int(last_activity + self.ttl)
+        return info
+
+    def append(self, upload_id, offset, stream):
+        """Write the chunk in ``stream`` at ``offset``; returns the new offset"""
+        with self._locked(upload_id) as part:
+            info = self._read_info(upload_id)
+            current = os.fstat(part.fileno()).st_size
+            if offset != current:
+                raise UploadSessionError(f'Offset mismatch: upload is at {current}', 409)
+
+            start, remaining = current, info['length'] - current
+            part.seek(current)
+            try:
+                while True:
+                    chunk = stream.read(min(self.chunk_size, remaining + 1))
+                    if not chunk:
+                        break
+                    if len(chunk) > remaining:
+                        part.truncate(start)  # el trozo entero se rechaza
+                        raise UploadSessionError('Chunk exceeds the upload length', 413)
+                    part.write(chunk)
+                    current += len(chunk)
+                    remaining -= len(chunk)
+            except ClientDisconnected:
+                pass  # lo recibido se conserva: el cliente reanuda desde el offset
+            finally:
+                part.flush()
+            return current
+
+    def finalize(self, upload_id, create_song):
+        """
+        Song id of a complete upload. ``create_song(path, filename)`` stores
+        the assembled file and creates the song (committing it) the first
+        time; later calls return the recorded id.
+        """
+        with self._locked(upload_id, completed_ok=True) as part:
+            info = self._read_info(upload_id)
+            if info['song_id'] is not None:
+                return info['song_id'], False
+
+            size = os.fstat(part.fileno()).st_size if part else 0
+            if size != info['length']:
+                raise UploadSessionError(f"Upload incomplete: {size} of {info['length']} bytes", 409)
+
+            # Si falla, la parte sigue intacta y se puede volver a completar
+            info['song_id'] = create_song(self._part(upload_id), info['filename'])
+            self._write_info(upload_id, info)
+            os.remove(self._part(upload_id))
+            return info['song_id'], True
+
+    def cancel(self, upload_id):
+        with self._locked(upload_id, completed_ok=True):
+            self._read_info(upload_id)
+            self._remove(upload_id)
+
+    # ------------------------------------------------------------------ expiry
+
+    def sweep(self):
+        """Remove sessions idle for longer than ``ttl``; returns how many"""
+        removed = 0
+        cutoff = time.time() - self.ttl
+        for name in os.listdir(self.directory):
+            upload_id, extension = os.path.splitext(name)
+            if extension != '.json' or not SESSION_ID.match(upload_id):
+                continue
+            try:
+                if self.status(upload_id)['expires_at'] < time.time():
+                    with self._locked(upload_id, completed_ok=True):
+                        self._remove(upload_id)
+                    removed += 1
+            except (UploadSessionError, OSError):
+                continue  # en uso o ya borrada por otro worker
+        # Partes sin info (proceso terminado entre los dos ficheros de create)
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith('.part') and not os.path.exists(path[:-len('.part')] + '.json'):
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except OSError:
+                    pass
+        return removed
+
+    def _sweep_loop(self):
+        while True:
+            self.socketio.sleep(self.sweep_interval)
+            try:
+                removed = self.sweep()
+                if removed:
+                    print(f'🧹 Removed {removed} expired upload sessions')
+            except Exception as e:
+                print(f'❌ Error sweeping upload sessions: {str(e)}')
+
+    # ------------------------------------------------------------------ storage
+
+    def _part(self, upload_id):
+        return os.path.join(self.directory, f'{upload_id}.part')
+
+    def _info(self, upload_id):
+        return os.path.join(self.directory, f'{upload_id}.json')
+
+    def _read_info(self, upload_id):
+        if not SESSION_ID.match(upload_id or ''):
+            raise UploadSessionError('Upload not found', 404)
+        try:
+            with open(self._info(upload_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise UploadSessionError('Upload not found', 404)
+
+    def _write_info(self, upload_id, info):
+        temp = self._info(upload_id) + '.tmp'
+        with open(temp, 'w') as f:
+            json.dump(info, f)
+        os.replace(temp, self._info(upload_id))
+
+    def _remove(self, upload_id):
+        with self._guard:
+            self._thread_locks.pop(upload_id, None)
+        for path in (self._part(upload_id), self._info(upload_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    @contextmanager
+    def _locked(self, upload_id, completed_ok=False):
+        """
+        Part file opened for writing under an exclusive, non-blocking lock.
+        A finalized session has no part file: ``completed_ok`` callers get
+        None, the rest a 409.
+        """
+        if not SESSION_ID.match(upload_id or ''):
+            raise UploadSessionError('Upload not found', 404)
+        try:
+            part = open(self._part(upload_id), 'r+b')
+        except FileNotFoundError:
+            if not os.path.exists(self._info(upload_id)):
+                raise UploadSessionError('Upload not found', 404)
+            if not completed_ok:
+                raise UploadSessionError('Upload already completed', 409)
+            yield None
+            return
+
+        with part:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(part.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    raise UploadSessionError('Upload is busy with another request', 423)
+                yield part
+                return
+
+            with self._guard:
+                lock = self._thread_locks.setdefault(upload_id, threading.Lock())
+            if not lock.acquire(blocking=False):
+                raise UploadSessionError('Upload is busy with another request', 423)
+            try:
+                yield part
+            finally:
+                lock.release()
+
+upload_sessions = UploadSessions()
@@ -0,0 +1,172 @@
+import gzip
+import mimetypes
+import os
+import re
+import zlib
+
+from flask import request, send_from_directory
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se negocia gzip
+    brotli = None
+
+COMPRESSIBLE_TYPES = {'application/json', 'application/x-ndjson', 'text/html', 'text/plain',
+                      'text/css', 'text/javascript', 'application/javascript', 'image/svg+xml'}
+
+# Ficheros del build de Angular con hash en el nombre (main-ABCD1234.js): su contenido no cambia nunca
+HASHED_NAME = re.compile(r'-[A-Z0-9]{8,}\.[a-z0-9]+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Extensión de la variante precomprimida de cada codificación (en orden de preferencia)
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+
+def available_encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate(offered):
+    """Best content coding among ``offered`` for the current request, or None"""
+    encoding = request.accept_encodings.best_match(offered)
+    return encoding if encoding in offered else None
+
+
+def weaken_etag(response):
+    """
+    The representation changed: a strong ETag becomes weak, so the
+    compressed and identity bodies never share a strong validator while
+    If-None-Match (weak comparison) keeps matching.
+    """
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+class ResponseCompressor:
+    """
+    Negotiated gzip/brotli compression of dynamic responses (``after_request``).
+
+    Bodies of a compressible type and at least ``min_size`` bytes are
+    compressed with the best coding the client accepts (``br`` first).
+    Streamed responses (lists sent in batches) are compressed chunk by
+    chunk with a sync flush, so every batch still reaches the client as
+    soon as it is produced. Files (``send_file``), partial content,
+    Server-Sent Events and already encoded bodies are left alone.
+    """
+
+    def __init__(self, min_size=1024, gzip_level=6, brotli_quality=4):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def init_app(self, app, min_size=None, gzip_level=None, brotli_quality=None):
+        if min_size is not None:
+            self.min_size = min_size
+        if gzip_level is not None:
+            self.gzip_level = gzip_level
+        if brotli_quality is not None:
+            self.brotli_quality = brotli_quality
+        app.after_request(self.after_request)
+
+    def after_request(self, response):
+        if response.mimetype not in COMPRESSIBLE_TYPES or response.direct_passthrough:
+            return response
+        response.vary.add('Accept-Encoding')
+
+        if (request.method == 'HEAD' or response.status_code < 200
+                or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        encoding = negotiate(available_encodings())
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self._compress_stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            response.set_data(self.compress(data, encoding))
+
+        response.headers['Content-Encoding'] = encoding
+        weaken_etag(response)
+        return response
+
+    def compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+
+    def _compress_stream(self, chunks, encoding):
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            compress, flush, finish = compressor.process, compressor.flush, compressor.finish
+        else:
+            compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            compress, finish = compressor.compress, compressor.flush
+            flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)  # noqa: E731
+
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                if chunk:
+                    yield compress(chunk) + flush()
+            yield finish()
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+
+
+class StaticAssets:
+    """
+    Serves the Angular bundle (``static/browser``) with the ``.br`` / ``.gz``
+    variants generated at build time by ``precompress_static.py``, chosen by
+    Accept-Encoding. A variant older than its original (a build that wasn't
+    precompressed) is ignored. Hashed filenames are cached as immutable for
+    a year; anything else (index.html) is revalidated on every use.
+    """
+
+    def init_app(self, app):
+        self.folder = app.static_folder
+        # Sustituye la vista estática de Flask (static_url_path='')
+        app.view_functions['static'] = self.send
+
+    def send(self, filename):
+        original = safe_join(self.folder, filename)
+        if original is None or not os.path.isfile(original):
+            raise NotFound()
+
+        # Servir .br no requiere el módulo brotli: se comprimió en el build
+        variants = {encoding: extension for encoding, extension in PRECOMPRESSED
+                    if self._fresh(original, original + extension)}
+        encoding = negotiate(list(variants)) if variants else None
+
+        if encoding:
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            response = send_from_directory(self.folder, filename + variants[encoding], mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+        else:
+            response = send_from_directory(self.folder, filename)
+        if variants:
+            response.vary.add('Accept-Encoding')
+
+        if HASHED_NAME.search(filename):
+            response.headers['Cache-Control'] = IMMUTABLE
+        else:
+            response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    @staticmethod
+    def _fresh(original, variant):
+        return os.path.isfile(variant) and os.path.getmtime(variant) >= os.path.getmtime(original)
+
+
+response_compressor = ResponseCompressor()
+static_assets = StaticAssets()
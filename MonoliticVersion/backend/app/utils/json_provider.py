@@ -0,0 +1,79 @@
+"""
+JSON encoding backed by orjson, with the stdlib ``json`` module as fallback.
+
+``FastJSONProvider`` replaces Flask's default provider (``app.json``), so
+``jsonify`` and ``ApiResponse`` encode with orjson while producing the same
+documents as before: sorted keys, HTTP dates for ``datetime`` values and
+the same handling of ``Decimal``, ``UUID`` and dataclasses.
+
+``rows_to_json`` is the direct path for list endpoints: it encodes plain
+row mappings (``Row._asdict()``) straight to bytes, with timestamps as ISO
+strings like ``to_dict()``, so no ORM objects or per-row dicts are built
+in Python. ``rows_to_ndjson`` is the same encoding, one object per line.
+"""
+import json
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el módulo json estándar
+    orjson = None
+
+
+def orjson_available() -> bool:
+    return orjson is not None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider using orjson when it is installed"""
+
+    def _options(self):
+        # Los datetime pasan por default() para mantener el formato HTTP de Flask
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default,
+                            option=self._options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def _iso_default(o):
+    if isinstance(o, date):
+        return o.isoformat()
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+def rows_to_json(rows) -> bytes:
+    """Encode a list of row mappings as a JSON array (sorted keys, ISO timestamps)"""
+    if orjson is not None:
+        return orjson.dumps(rows, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(rows, default=_iso_default, sort_keys=True, separators=(',', ':')).encode()
+
+
+def rows_to_ndjson(rows) -> bytes:
+    """Encode row mappings as NDJSON: one object per line, same encoding as rows_to_json"""
+    if orjson is not None:
+        option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+        return b''.join(orjson.dumps(row, option=option) for row in rows)
+    return b''.join(json.dumps(row, default=_iso_default, sort_keys=True,
+                               separators=(',', ':')).encode() + b'\n' for row in rows)
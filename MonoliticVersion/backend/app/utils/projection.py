@@ -0,0 +1,24 @@
+def selected_columns(columns, fields=None, required=('id',)):
+    """
+    Sparse fieldsets (``?fields=id,title,artist``): the columns of
+    ``columns`` named in ``fields``, plus ``required``, in their original
+    order. Without ``fields`` all of them. Only names in ``columns`` are
+    accepted, so hidden columns (e.g. passwords) can't be requested.
+    """
+    if not fields or not fields.strip():
+        return list(columns)
+
+    names = {name.strip() for name in fields.split(',') if name.strip()}
+    available = {column.key for column in columns}
+    unknown = names - available
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))} "
+                         f"(available: {', '.join(column.key for column in columns)})")
+
+    names.update(required)
+    return [column for column in columns if column.key in names]
+
+
+def fields_key(columns):
+    """Canonical form of a projection, for cache and single-flight keys"""
+    return ','.join(column.key for column in columns)
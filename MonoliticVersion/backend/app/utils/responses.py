@@ -1,4 +1,4 @@
-from flask import jsonify
+from flask import current_app, jsonify
 
 class ApiResponse:
     @staticmethod
@@ -11,6 +11,17 @@ class ApiResponse:
         }
         return jsonify(response), status_code
     
+    @staticmethod
+    def success_json(data_json, message="Success", status_code=200):
+        """Create a successful API response around data already encoded to JSON bytes"""
+        # Mismas claves y orden que success(): data, message, success
+        body = b''.join([
+            b'{"data":', data_json,
+            b',"message":', current_app.json.dumps(message).encode(),
+            b',"success":true}\n'
+        ])
+        return current_app.response_class(body, mimetype='application/json'), status_code
+    
     @staticmethod
     def error(message="Error", status_code=400, error_code=None):
         """Create an error API response"""
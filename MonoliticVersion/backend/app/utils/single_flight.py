@@ -0,0 +1,84 @@
+import threading
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Request coalescing (dogpile protection).
+
+    The first caller of ``do(key, fn)`` runs ``fn``; concurrent callers with
+    the same key wait for that call and get its result (or its exception)
+    instead of running the query again. A follower that waits longer than
+    ``timeout`` seconds stops waiting and runs ``fn`` itself, so a stuck
+    leader never blocks other requests indefinitely.
+
+    Results are shared between threads: return plain data (dicts, lists),
+    never ORM instances bound to the leader's session, and don't mutate it.
+    """
+
+    def __init__(self, timeout=10.0):
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {'leaders': 0, 'shared': 0, 'timeouts': 0, 'errors': 0}
+
+    def init_app(self, timeout=None):
+        if timeout is not None:
+            self.timeout = timeout
+
+    def do(self, key, fn, timeout=None):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+                self._stats['leaders'] += 1
+            else:
+                leader = False
+
+        if leader:
+            return self._lead(key, call, fn)
+
+        if not call.done.wait(self.timeout if timeout is None else timeout):
+            with self._lock:
+                self._stats['timeouts'] += 1
+            print(f'⚠️ Single-flight wait timed out for {key}, running the query directly')
+            return fn()
+
+        with self._lock:
+            self._stats['shared'] += 1
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def _lead(self, key, call, fn):
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self._stats['errors'] += 1
+            raise
+        finally:
+            # Las llamadas posteriores a este punto ejecutan una consulta nueva
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls)
+        return stats
+
+
+catalog_flight = SingleFlight()
@@ -0,0 +1,195 @@
+"""
+Per-client Socket.IO packet serialization: JSON (default) or MessagePack.
+
+Clients opt in by connecting with ``?serializer=msgpack`` after checking
+``GET /api/chat/socket-config``. The choice is stored per Engine.IO session,
+so JSON and MessagePack clients can share a room; a room broadcast is
+encoded at most once per format. MessagePack packets carry timestamps as
+integer epoch milliseconds instead of ISO strings.
+"""
+from datetime import datetime, timezone
+from urllib.parse import parse_qs
+from socketio import BaseManager, packet
+
+try:
+    import msgpack
+except ImportError:  # msgpack es opcional: sin él todos los clientes usan JSON
+    msgpack = None
+
+JSON = 'json'
+MSGPACK = 'msgpack'
+QUERY_PARAM = 'serializer'
+TIMESTAMP_KEYS = ('timestamp',)
+
+_ENVIRON_KEY = 'syncwave.serializer'
+
+
+def msgpack_available() -> bool:
+    return msgpack is not None
+
+
+def to_epoch_ms(value):
+    """datetime or ISO-8601 string -> int epoch milliseconds (naive values are UTC)"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def compact(value, key=None):
+    """Recursively replace timestamps with epoch milliseconds"""
+    if isinstance(value, dict):
+        return {k: compact(v, k) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [compact(v) for v in value]
+    if isinstance(value, datetime):
+        return to_epoch_ms(value)
+    if key in TIMESTAMP_KEYS and isinstance(value, str):
+        try:
+            return to_epoch_ms(value)
+        except ValueError:
+            return value
+    return value
+
+
+class CompactMsgPackPacket(packet.Packet):
+    """MessagePack packet with epoch-millisecond timestamps"""
+
+    uses_binary_events = False
+
+    def encode(self):
+        return msgpack.dumps({
+            'type': self.packet_type,
+            'data': compact(self.data),
+            'nsp': self.namespace or '/',
+            'id': self.id
+        })
+
+    def decode(self, encoded_packet):
+        decoded = msgpack.loads(encoded_packet)
+        self.packet_type = decoded['type']
+        self.data = decoded.get('data')
+        self.id = decoded.get('id')
+        self.namespace = decoded['nsp']
+
+    @classmethod
+    def from_packet(cls, pkt):
+        packet_type = pkt.packet_type
+        if packet_type == packet.BINARY_EVENT:
+            packet_type = packet.EVENT
+        elif packet_type == packet.BINARY_ACK:
+            packet_type = packet.ACK
+        return cls(packet_type, data=pkt.data, namespace=pkt.namespace, id=pkt.id)
+
+
+class AdaptivePacket(packet.Packet):
+    """Server packet class: encodes JSON, decodes JSON text or MessagePack bytes"""
+
+    def decode(self, encoded_packet):
+        if isinstance(encoded_packet, (bytes, bytearray)) and msgpack is not None:
+            # Los adjuntos binarios de JSON nunca llegan aquí: el servidor
+            # los entrega con add_attachment() al paquete pendiente
+            CompactMsgPackPacket.decode(self, encoded_packet)
+            return 0
+        return super().decode(encoded_packet)
+
+
+class EncodedPacket(packet.Packet):
+    """Packet whose wire encoding was computed once for every recipient of a broadcast"""
+
+    def __init__(self, pkt, encoded):
+        super().__init__(pkt.packet_type, data=pkt.data, namespace=pkt.namespace, id=pkt.id)
+        self.encoded = encoded
+
+    def encode(self):
+        return self.encoded
+
+
+class NegotiatingManager(BaseManager):
+    """Client manager that encodes each packet in the format negotiated by its recipient"""
+
+    def __init__(self, allow_msgpack: bool = True):
+        super().__init__()
+        self.allow_msgpack = allow_msgpack and msgpack_available()
+        if allow_msgpack and not msgpack_available():
+            print('⚠️ msgpack is not installed; Socket.IO clients will use JSON')
+
+    def serializer_for(self, eio_sid) -> str:
+        environ = self.server.environ.get(eio_sid)
+        if environ is None:
+            return JSON
+        serializer = environ.get(_ENVIRON_KEY)
+        if serializer is None:
+            requested = parse_qs(environ.get('QUERY_STRING', '')).get(QUERY_PARAM, [JSON])[0]
+            serializer = MSGPACK if requested == MSGPACK and self.allow_msgpack else JSON
+            environ[_ENVIRON_KEY] = serializer
+        return serializer
+
+    def encode_for(self, serializer, pkt):
+        """Encode pkt for a recipient; returns a list of encoded payloads"""
+        if serializer == MSGPACK:
+            pkt = CompactMsgPackPacket.from_packet(pkt)
+        encoded = pkt.encode()
+        return encoded if isinstance(encoded, list) else [encoded]
+
+    def emit(self, event, data, namespace, room=None, skip_sid=None,
+             callback=None, **kwargs):
+        if callback or namespace not in self.rooms:
+            # Con callback cada destinatario recibe su propio id y pasa por
+            # server._send_packet, que ya respeta el formato negociado
+            return super().emit(event, data, namespace, room=room, skip_sid=skip_sid,
+                                callback=callback, **kwargs)
+
+        if isinstance(data, tuple):
+            data = list(data)
+        elif data is not None:
+            data = [data]
+        else:
+            data = []
+        if not isinstance(skip_sid, list):
+            skip_sid = [skip_sid]
+
+        pkt = self.server.packet_class(packet.EVENT, namespace=namespace, data=[event] + data)
+        encoded_packets = {}
+        for sid, eio_sid in self.get_participants(namespace, room):
+            if sid in skip_sid:
+                continue
+            serializer = self.serializer_for(eio_sid)
+            if serializer not in encoded_packets:
+                encoded_packets[serializer] = EncodedPacket(pkt, self.encode_for(serializer, pkt))
+            # Por server._send_packet (no eio directamente) para que el test_client lo capture
+            self.server._send_packet(eio_sid, encoded_packets[serializer])
+
+
+def install_negotiated_serializer(socketio):
+    """
+    Make single-recipient packets (connect, acks, callbacks) honour the negotiated
+    format. Call after socketio.init_app(..., client_manager=NegotiatingManager()).
+    """
+    server = socketio.server
+    manager = server.manager
+    if not isinstance(manager, NegotiatingManager):
+        return
+
+    send_packet = server._send_packet
+
+    def _send_packet(eio_sid, pkt):
+        if manager.serializer_for(eio_sid) == MSGPACK and not isinstance(pkt, EncodedPacket):
+            pkt = CompactMsgPackPacket.from_packet(pkt)
+        send_packet(eio_sid, pkt)
+
+    server._send_packet = _send_packet
+
+
+def socket_config(manager) -> dict:
+    """Serializer options advertised to clients before they connect"""
+    serializers = [JSON]
+    if isinstance(manager, NegotiatingManager) and manager.allow_msgpack:
+        serializers.insert(0, MSGPACK)
+    return {
+        'serializers': serializers,
+        'preferred': serializers[0],
+        'query_param': QUERY_PARAM,
+        'timestamps': {JSON: 'iso8601', MSGPACK: 'epoch_ms'}
+    }
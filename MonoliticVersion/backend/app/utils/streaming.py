@@ -0,0 +1,107 @@
+from flask import Response, current_app, request, stream_with_context
+
+from app.models.database import db
+from app.utils.json_provider import rows_to_json, rows_to_ndjson
+from app.utils.projection import fields_key, selected_columns
+from app.utils.responses import ApiResponse
+from app.utils.single_flight import catalog_flight
+
+JSON = 'application/json'
+NDJSON = 'application/x-ndjson'
+
+
+def wants_ndjson():
+    """True when the client prefers NDJSON (``Accept: application/x-ndjson``)"""
+    return request.accept_mimetypes.best_match([JSON, NDJSON]) == NDJSON
+
+
+class CollectionStreamer:
+    """
+    Responses for list endpoints whose size depends on the data.
+
+    Up to ``threshold`` rows the body is encoded in one piece (coalesced by
+    ``catalog_flight`` and cacheable). Larger results, and every NDJSON
+    request, are streamed: the rows are read through a server-side cursor
+    (``yield_per``) and encoded ``batch_size`` rows at a time, so the time
+    to first byte and the memory of the worker don't grow with the result.
+
+    The streamed JSON keeps the ``ApiResponse`` envelope; ``message`` comes
+    after ``data`` (sorted keys), so it can include the final count. NDJSON
+    is one object per line without envelope. An error after the first byte
+    can no longer change the status: the body is cut short, which leaves
+    the JSON invalid.
+    """
+
+    def __init__(self, threshold=2000, batch_size=500):
+        self.threshold = threshold
+        self.batch_size = batch_size
+
+    def init_app(self, threshold=None, batch_size=None):
+        if threshold is not None:
+            self.threshold = threshold
+        if batch_size is not None:
+            self.batch_size = batch_size
+
+    def respond(self, query, columns, key=None, message=lambda count: 'Success'):
+        """
+        Response with the ``columns`` of the rows of ``query``; ``?fields=``
+        selects a subset of them (pushed down into the SELECT). ``key``
+        coalesces concurrent buffered reads; ``message(count)`` is the
+        envelope message.
+        """
+        try:
+            columns = selected_columns(columns, request.args.get('fields'))
+        except ValueError as e:
+            return ApiResponse.validation_error(str(e))
+        if key is not None:
+            key = f'{key}|{fields_key(columns)}'
+
+        if not wants_ndjson():
+            if key is None:
+                body, count = self.encode(query, columns)
+            else:
+                body, count = catalog_flight.do(key, lambda: self.encode(query, columns))
+            if body is not None:
+                return ApiResponse.success_json(body, message(count))
+        return self.stream(query, columns, message)
+
+    def encode(self, query, columns):
+        """(json_bytes, count), or (None, None) when there are more than ``threshold`` rows"""
+        rows = [row._asdict() for row in query.with_entities(*columns).limit(self.threshold + 1)]
+        if len(rows) > self.threshold:
+            return None, None
+        return rows_to_json(rows), len(rows)
+
+    def stream(self, query, columns, message=lambda count: 'Success'):
+        ndjson = wants_ndjson()
+        statement = query.with_entities(*columns).statement.execution_options(yield_per=self.batch_size)
+        # Se ejecuta antes de responder: un error de la consulta aún devuelve 500
+        result = db.session.execute(statement)
+
+        def generate():
+            count = 0
+            try:
+                if not ndjson:
+                    yield b'{"data":['
+                for partition in result.partitions():
+                    rows = [row._asdict() for row in partition]
+                    if ndjson:
+                        yield rows_to_ndjson(rows)
+                    else:
+                        # Cada lote se codifica como array y se le quitan los corchetes
+                        yield (b',' if count else b'') + rows_to_json(rows)[1:-1]
+                    count += len(rows)
+                if not ndjson:
+                    yield b''.join([b'],"message":', current_app.json.dumps(message(count)).encode(),
+                                    b',"success":true}\n'])
+            except Exception as e:
+                print(f'❌ Error streaming {request.path} after {count} rows: {str(e)}')
+            finally:
+                result.close()
+
+        response = Response(stream_with_context(generate()), mimetype=NDJSON if ndjson else JSON)
+        response.headers['X-Accel-Buffering'] = 'no'  # nginx: enviar cada lote sin esperar
+        return response
+
+
+collection_streamer = CollectionStreamer()
@@ -0,0 +1,123 @@
+"""
+Benchmark de serialización JSON de listas de canciones (por cada 1.000 canciones).
+
+Uso:
+    python benchmarks/json_serialization_bench.py
+    python benchmarks/json_serialization_bench.py --songs 5000 --iterations 50
+
+Usa una base SQLite en memoria y compara tres caminos para el cuerpo de
+``GET /api/music/songs``:
+
+- ``to_dict + json``:   objetos ORM, ``Song.to_dict()`` y el proveedor de Flask (stdlib)
+- ``to_dict + orjson``: lo mismo con ``FastJSONProvider``
+- ``rows -> bytes``:    filas Core (``collection_streamer.encode``) codificadas directo
+
+Para cada camino reporta la consulta + construcción de los datos, la
+codificación y el total, en ms por 1.000 canciones, y el tamaño del cuerpo.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from app.models.database import db, Song  # noqa: E402
+from app.utils.json_provider import FastJSONProvider, orjson_available  # noqa: E402
+from app.utils.responses import ApiResponse  # noqa: E402
+from app.utils.streaming import collection_streamer  # noqa: E402
+
+
+def make_app(songs):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    base = datetime(2024, 1, 1, 12, 0, 0)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([Song(
+            title=f'Canción número {i}',
+            artist=f'Artista {i % 150}',
+            album=f'Álbum {i % 400}',
+            duration=180 + i % 120,
+            file_path=f'assets/song_{i}.mp3',
+            cover_url=f'https://cdn.example.com/covers/{i}.jpg',
+            artist_name=f'Nombre Artista {i % 150}',
+            artist_nickname=f'nick{i % 150}',
+            nationality='EC',
+            created_at=base + timedelta(seconds=i),
+            updated_at=base + timedelta(seconds=i, microseconds=i)
+        ) for i in range(songs)])
+        db.session.commit()
+    return app
+
+
+def orm_path(app):
+    def build():
+        songs = [song.to_dict() for song in Song.query.order_by(Song.created_at.desc()).all()]
+        db.session.expunge_all()
+        return songs
+
+    def encode(songs):
+        return ApiResponse.success(songs)[0].get_data()
+    return build, encode
+
+
+def rows_path():
+    def build():
+        return collection_streamer.encode(Song.query.order_by(Song.created_at.desc()), Song.__table__.columns)
+
+    def encode(result):
+        return ApiResponse.success_json(result[0])[0].get_data()
+    return build, encode
+
+
+def measure(app, provider, path, iterations):
+    app.json = provider(app)
+    build, encode = path
+    build_s = encode_s = 0.0
+    with app.test_request_context():
+        data = build()
+        body = encode(data)
+        for _ in range(iterations):
+            start = time.perf_counter()
+            data = build()
+            middle = time.perf_counter()
+            encode(data)
+            build_s += middle - start
+            encode_s += time.perf_counter() - middle
+    return build_s / iterations, encode_s / iterations, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Song list JSON serialization benchmark')
+    parser.add_argument('--songs', type=int, default=1000)
+    parser.add_argument('--iterations', type=int, default=100)
+    args = parser.parse_args()
+
+    if not orjson_available():
+        sys.exit('orjson is not installed')
+
+    app = make_app(args.songs)
+    collection_streamer.threshold = args.songs  # medir siempre el cuerpo completo
+    paths = {
+        'to_dict + json': (DefaultJSONProvider, orm_path(app)),
+        'to_dict + orjson': (FastJSONProvider, orm_path(app)),
+        'rows -> bytes': (FastJSONProvider, rows_path())
+    }
+
+    per_1k = 1000 / args.songs * 1000  # segundos -> ms por 1.000 canciones
+    print(f"songs={args.songs} iterations={args.iterations} (ms per 1,000 songs)")
+    print(f"{'path':<18} {'query+build':>12} {'encode':>8} {'total':>8} {'body KB':>8}")
+    for name, (provider, path) in paths.items():
+        build, encode, size = measure(app, provider, path, args.iterations)
+        print(f"{name:<18} {build * per_1k:>12.2f} {encode * per_1k:>8.2f} "
+              f"{(build + encode) * per_1k:>8.2f} {size / 1024:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Script para mantener las particiones mensuales de chat_messages
+
+    python manage_chat_partitions.py ensure             # crear particiones futuras
+    python manage_chat_partitions.py retention          # desvincular y borrar/archivar las vencidas
+    python manage_chat_partitions.py explain --room general [--before 2024-01-01]
+"""
+
+import argparse
+import json
+
+from app import create_app
+from app.services.chat_partitions import chat_partitions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Chat partitions maintenance')
+    parser.add_argument('command', choices=['ensure', 'retention', 'explain'])
+    parser.add_argument('--room', default='general')
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--before', help='Timestamp bound for the history query')
+    args = parser.parse_args()
+
+    app, socketio = create_app()
+
+    with app.app_context():
+        if not chat_partitions.enabled():
+            print('Chat partitions require PostgreSQL. Nothing to do.')
+            return
+
+        if args.command == 'ensure':
+            print(f'Created: {chat_partitions.ensure_partitions()}')
+        elif args.command == 'retention':
+            print(f'Expired: {chat_partitions.apply_retention()}')
+        else:
+            report = chat_partitions.explain_recent(args.room, args.limit, args.before)
+            print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
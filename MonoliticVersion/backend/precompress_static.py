@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Genera las variantes precomprimidas (.br y .gz) del build de Angular.
+
+Se ejecuta al final de ``npm run build`` (script ``postbuild`` del frontend)
+o a mano:
+
+    python precompress_static.py                 # app/static/browser
+    python precompress_static.py --dir otra/ruta --min-size 512
+
+Cada fichero comprimible de al menos ``--min-size`` bytes se comprime con
+gzip (nivel 9) y, si el paquete ``brotli`` está instalado, con brotli
+(calidad 11): en el build el coste no importa. Una variante que no ahorra
+bytes no se escribe (y se borra la de un build anterior). El backend sirve
+la variante según Accept-Encoding (ver ``app/utils/compression.py``).
+"""
+import argparse
+import gzip
+import os
+import sys
+
+try:
+    import brotli
+except ImportError:  # sin brotli solo se generan las variantes .gz
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {'.js', '.mjs', '.css', '.html', '.svg', '.json', '.txt',
+                           '.map', '.ico', '.webmanifest', '.xml'}
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'static', 'browser')
+
+
+def write_variant(path, data, compressed, extension):
+    variant = path + extension
+    if len(compressed) >= len(data):
+        if os.path.exists(variant):
+            os.remove(variant)
+        return 0
+    with open(variant, 'wb') as f:
+        f.write(compressed)
+    # Misma fecha que el original: el backend descarta variantes más antiguas
+    stat = os.stat(path)
+    os.utime(variant, (stat.st_atime, stat.st_mtime))
+    return len(compressed)
+
+
+def precompress(directory, min_size):
+    totals = {'files': 0, 'original': 0, '.gz': 0, '.br': 0}
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            if len(data) < min_size:
+                continue
+
+            totals['files'] += 1
+            totals['original'] += len(data)
+            totals['.gz'] += write_variant(path, data, gzip.compress(data, compresslevel=9, mtime=0), '.gz')
+            if brotli is not None:
+                totals['.br'] += write_variant(path, data, brotli.compress(data, quality=11), '.br')
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-compress the static frontend build')
+    parser.add_argument('--dir', default=DEFAULT_DIR)
+    parser.add_argument('--min-size', type=int, default=1024)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.dir):
+        sys.exit(f'❌ Static folder not found: {args.dir} (run "npm run build" in fronted first)')
+
+    totals = precompress(args.dir, args.min_size)
+    print(f"🗜️ Pre-compressed {totals['files']} files ({totals['original'] / 1024:.0f} KB): "
+          f"gzip {totals['.gz'] / 1024:.0f} KB"
+          + (f", brotli {totals['.br'] / 1024:.0f} KB" if brotli is not None else ' (brotli not installed)'))
+
+
+if __name__ == '__main__':
+    main()
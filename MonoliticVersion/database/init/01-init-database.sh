@@ -18,11 +18,12 @@ psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" <<-E
     -- Configurar zona horaria
     SET timezone = 'America/Lima';
     
-    -- Crear función para actualizar timestamps automáticamente
+    -- Crear función para actualizar timestamps automáticamente (UTC como el backend;
+    -- clock_timestamp en lugar del inicio de la transacción para /songs/changes)
     CREATE OR REPLACE FUNCTION update_modified_column()
     RETURNS TRIGGER AS \$\$
     BEGIN
-        NEW.updated_at = CURRENT_TIMESTAMP;
+        NEW.updated_at = timezone('utc', clock_timestamp());
         RETURN NEW;
     END;
     \$\$ language 'plpgsql';
@@ -66,14 +67,47 @@ psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" <<-E
         UNIQUE(user_id, song_id) -- Un usuario no puede tener la misma canción como favorita dos veces
     );
 
-    -- Tabla de mensajes de chat
-    CREATE TABLE IF NOT EXISTS chat_messages (
+    -- Registro de canciones eliminadas para la sincronización incremental del catálogo
+    CREATE TABLE IF NOT EXISTS song_tombstones (
         id SERIAL PRIMARY KEY,
+        song_id INTEGER NOT NULL,
+        deleted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- Feed de cambios del catálogo y favoritos (SSE /api/music/events)
+    CREATE TABLE IF NOT EXISTS catalog_events (
+        id BIGSERIAL PRIMARY KEY,
+        event VARCHAR(32) NOT NULL,
+        user_id INTEGER,
+        payload TEXT NOT NULL,
+        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- Tabla de mensajes de chat, particionada por mes (la PK incluye timestamp).
+    -- El backend crea las particiones mensuales y aplica la retención.
+    CREATE TABLE IF NOT EXISTS chat_messages (
+        id SERIAL,
         user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
         message TEXT NOT NULL,
-        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        room VARCHAR(50) DEFAULT 'general'
-    );
+        timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        room VARCHAR(50) DEFAULT 'general',
+        PRIMARY KEY (id, timestamp)
+    ) PARTITION BY RANGE (timestamp);
+
+    -- Particiones del mes actual y los dos siguientes (02-seed-data.sql inserta mensajes)
+    DO \$\$
+    DECLARE
+        month DATE;
+    BEGIN
+        FOR i IN 0..2 LOOP
+            month := (date_trunc('month', CURRENT_TIMESTAMP) + i * INTERVAL '1 month')::date;
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF chat_messages FOR VALUES FROM (%L) TO (%L)',
+                'chat_messages_y' || to_char(month, 'YYYY') || 'm' || to_char(month, 'MM'),
+                month, (month + INTERVAL '1 month')::date
+            );
+        END LOOP;
+    END \$\$;
 
     -- Crear triggers para actualizar timestamps automáticamente
     CREATE TRIGGER update_users_modtime 
@@ -92,8 +126,13 @@ psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" <<-E
     -- Índices para búsquedas optimizadas
     CREATE INDEX IF NOT EXISTS idx_songs_artist ON songs USING gin(artist gin_trgm_ops);
     CREATE INDEX IF NOT EXISTS idx_songs_artist_name ON songs(artist_name);
+    CREATE INDEX IF NOT EXISTS ix_songs_updated_at_id ON songs(updated_at, id);
+    CREATE INDEX IF NOT EXISTS ix_song_tombstones_deleted_at_id ON song_tombstones(deleted_at, id);
+    CREATE INDEX IF NOT EXISTS ix_catalog_events_created_at ON catalog_events(created_at);
     CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
     CREATE INDEX IF NOT EXISTS idx_favorite_songs_user_id ON favorite_songs(user_id);
     CREATE INDEX IF NOT EXISTS idx_favorite_songs_song_id ON favorite_songs(song_id);
+    CREATE INDEX IF NOT EXISTS ix_chat_messages_room_timestamp_id ON chat_messages(room, timestamp, id);
+    CREATE INDEX IF NOT EXISTS ix_chat_messages_message_fts ON chat_messages USING gin(to_tsvector('simple'::regconfig, message));
 EOSQL
 
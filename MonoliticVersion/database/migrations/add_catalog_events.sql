@@ -0,0 +1,17 @@
+-- Migración para el feed de cambios del catálogo (SSE /api/music/events)
+-- Ejecutar este script en PostgreSQL (db.create_all() también crea la tabla)
+
+-- Eventos de canciones y favoritos; el id ordena el feed y es el Last-Event-ID
+CREATE TABLE IF NOT EXISTS catalog_events (
+    id BIGSERIAL PRIMARY KEY,
+    event VARCHAR(32) NOT NULL,
+    user_id INTEGER,
+    payload TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Purga por antigüedad (CATALOG_EVENTS_RETENTION_HOURS)
+CREATE INDEX IF NOT EXISTS ix_catalog_events_created_at ON catalog_events(created_at);
+
+-- Mensaje de confirmación
+SELECT 'Migración completada: feed de eventos del catálogo creado' AS result;
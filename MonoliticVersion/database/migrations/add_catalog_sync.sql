@@ -0,0 +1,30 @@
+-- Migración para la sincronización incremental del catálogo (/api/music/songs/changes)
+-- Ejecutar este script en PostgreSQL
+
+-- Canciones sin updated_at no aparecerían en la sincronización
+UPDATE songs SET updated_at = COALESCE(created_at, timezone('utc', now())) WHERE updated_at IS NULL;
+
+-- Keyset sobre (updated_at, id)
+CREATE INDEX IF NOT EXISTS ix_songs_updated_at_id ON songs(updated_at, id);
+
+-- El trigger usa UTC como el backend, y la hora real de la escritura en lugar
+-- del inicio de la transacción
+CREATE OR REPLACE FUNCTION update_modified_column()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = timezone('utc', clock_timestamp());
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+-- Registro de canciones eliminadas (db.create_all() también crea la tabla)
+CREATE TABLE IF NOT EXISTS song_tombstones (
+    id SERIAL PRIMARY KEY,
+    song_id INTEGER NOT NULL,
+    deleted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_song_tombstones_deleted_at_id ON song_tombstones(deleted_at, id);
+
+-- Mensaje de confirmación
+SELECT 'Migración completada: sincronización incremental del catálogo' AS result;
@@ -0,0 +1,16 @@
+-- Migración para la búsqueda de texto en el chat
+-- Ejecutar este script en PostgreSQL
+
+-- Índice GIN sobre el tsvector del mensaje (en cada partición de chat_messages).
+-- La expresión debe coincidir con ChatService.search_messages.
+CREATE INDEX IF NOT EXISTS ix_chat_messages_message_fts
+    ON chat_messages USING gin (to_tsvector('simple'::regconfig, message));
+
+-- Filtro por sala y orden por (timestamp, id) de la paginación keyset
+CREATE INDEX IF NOT EXISTS ix_chat_messages_room_timestamp_id
+    ON chat_messages (room, timestamp, id);
+
+ANALYZE chat_messages;
+
+-- Mensaje de confirmación
+SELECT 'Migración completada: índice de búsqueda del chat creado' AS result;
@@ -0,0 +1,26 @@
+-- Migración para contadores de mensajes no leídos del chat
+-- Ejecutar este script en PostgreSQL (db.create_all() también crea las tablas)
+
+-- Contador de mensajes por sala (se incrementa en save_message)
+CREATE TABLE IF NOT EXISTS chat_room_counters (
+    room VARCHAR(50) PRIMARY KEY,
+    message_count BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Marcador de lectura por usuario y sala (message_count al leer)
+CREATE TABLE IF NOT EXISTS chat_read_markers (
+    user_id INTEGER NOT NULL,
+    room VARCHAR(50) NOT NULL,
+    last_read_seq BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, room)
+);
+
+-- Inicializar contadores con los mensajes existentes
+INSERT INTO chat_room_counters (room, message_count)
+SELECT room, COUNT(*) FROM chat_messages WHERE room IS NOT NULL GROUP BY room
+ON CONFLICT (room) DO NOTHING;
+
+-- Mensaje de confirmación
+SELECT 'Migración completada: contadores de no leídos creados' AS result;
@@ -0,0 +1,13 @@
+-- Migración para GET condicionales (ETag / Last-Modified) del catálogo y favoritos
+-- Ejecutar este script en PostgreSQL (db.create_all() también crea la tabla)
+
+-- Versión por recurso: 'catalog' cambia con cada escritura de canciones,
+-- 'favorites:<user_id>' con cada cambio en los favoritos de ese usuario
+CREATE TABLE IF NOT EXISTS resource_versions (
+    scope VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Mensaje de confirmación
+SELECT 'Migración completada: versiones de recursos creadas' AS result;
@@ -0,0 +1,60 @@
+-- Migración: particionar chat_messages por mes (RANGE sobre timestamp)
+-- Ejecutar este script en PostgreSQL (11+) con el backend detenido.
+-- Las particiones futuras y la retención las mantiene el backend
+-- (app/services/chat_partitions.py) o manage_chat_partitions.py.
+
+BEGIN;
+
+ALTER TABLE chat_messages RENAME TO chat_messages_legacy;
+ALTER SEQUENCE chat_messages_id_seq RENAME TO chat_messages_legacy_id_seq;
+
+-- La PK de una tabla particionada debe incluir la clave de partición
+CREATE TABLE chat_messages (
+    id SERIAL,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    message TEXT NOT NULL,
+    timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    room VARCHAR(50) DEFAULT 'general',
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+-- Se crea en cada partición; sirve para WHERE room = ? ORDER BY timestamp DESC
+CREATE INDEX IF NOT EXISTS ix_chat_messages_room_timestamp_id
+    ON chat_messages (room, timestamp, id);
+
+-- Una partición por mes desde el mensaje más antiguo hasta dos meses adelante
+DO $$
+DECLARE
+    month DATE := date_trunc('month', COALESCE(
+        (SELECT MIN(timestamp) FROM chat_messages_legacy), CURRENT_TIMESTAMP))::date;
+    last_month DATE := (date_trunc('month', CURRENT_TIMESTAMP) + INTERVAL '2 months')::date;
+BEGIN
+    WHILE month <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF chat_messages FOR VALUES FROM (%L) TO (%L)',
+            'chat_messages_y' || to_char(month, 'YYYY') || 'm' || to_char(month, 'MM'),
+            month, (month + INTERVAL '1 month')::date
+        );
+        month := (month + INTERVAL '1 month')::date;
+    END LOOP;
+END $$;
+
+-- Copiar los mensajes (los que no tengan fecha quedan con la de hoy)
+INSERT INTO chat_messages (id, user_id, message, timestamp, room)
+SELECT id, user_id, message, COALESCE(timestamp, CURRENT_TIMESTAMP), room
+FROM chat_messages_legacy;
+
+SELECT setval('chat_messages_id_seq', COALESCE((SELECT MAX(id) FROM chat_messages), 0) + 1, false);
+
+DROP TABLE chat_messages_legacy;
+
+COMMIT;
+
+ANALYZE chat_messages;
+
+-- Comprobar la poda: solo deben aparecer las particiones recientes como ejecutadas
+-- EXPLAIN (ANALYZE, COSTS OFF)
+-- SELECT * FROM chat_messages WHERE room = 'general' ORDER BY timestamp DESC LIMIT 50;
+
+-- Mensaje de confirmación
+SELECT 'Migración completada: chat_messages particionada por mes' AS result;
@@ -0,0 +1,90 @@
+import { Injectable, NgZone, OnDestroy } from '@angular/core';
+import { Observable, Subject } from 'rxjs';
+import { filter } from 'rxjs/operators';
+
+export type CatalogEventType =
+    | 'song.created'
+    | 'song.updated'
+    | 'song.deleted'
+    | 'favorite.added'
+    | 'favorite.removed'
+    | 'reset';
+
+export interface CatalogEvent {
+    id: number;
+    type: CatalogEventType;
+    data: any;
+}
+
+const EVENT_TYPES: CatalogEventType[] = [
+    'song.created', 'song.updated', 'song.deleted', 'favorite.added', 'favorite.removed', 'reset'
+];
+
+/**
+ * Feed de cambios del catálogo por Server-Sent Events (/api/music/events).
+ * Reemplaza el polling: el navegador reconecta solo y reenvía Last-Event-ID,
+ * así que el servidor repite los eventos perdidos durante la desconexión.
+ */
+@Injectable({
+    providedIn: 'root'
+})
+export class CatalogEventsService implements OnDestroy {
+    private readonly EVENTS_URL = 'http://localhost:5000/api/music/events';
+
+    private source?: EventSource;
+    private userId?: number;
+    private eventsSubject = new Subject<CatalogEvent>();
+    public events$ = this.eventsSubject.asObservable();
+
+    constructor(private zone: NgZone) { }
+
+    /**
+     * Abrir el stream (idempotente). Con userId también llegan sus favoritos;
+     * sin userId se reutiliza el stream ya abierto.
+     */
+    connect(userId?: number): void {
+        if (this.source && (userId === undefined || this.userId === userId)) {
+            return;
+        }
+        this.disconnect();
+        this.userId = userId;
+
+        const url = userId !== undefined ? `${this.EVENTS_URL}?user_id=${userId}` : this.EVENTS_URL;
+        this.source = new EventSource(url);
+
+        EVENT_TYPES.forEach(type => {
+            this.source!.addEventListener(type, (message: MessageEvent) => {
+                this.zone.run(() => this.eventsSubject.next({
+                    id: Number(message.lastEventId),
+                    type,
+                    data: JSON.parse(message.data)
+                }));
+            });
+        });
+
+        this.source.onerror = () => {
+            // EventSource reintenta solo (retry del servidor); solo se informa
+            console.warn('⚠️ Catalog event stream interrupted, reconnecting...');
+        };
+    }
+
+    disconnect(): void {
+        this.source?.close();
+        this.source = undefined;
+    }
+
+    /**
+     * Eventos de canciones (incluye reset: el cliente debe recargar el catálogo)
+     */
+    songEvents(): Observable<CatalogEvent> {
+        return this.events$.pipe(filter(event => event.type.startsWith('song.') || event.type === 'reset'));
+    }
+
+    favoriteEvents(): Observable<CatalogEvent> {
+        return this.events$.pipe(filter(event => event.type.startsWith('favorite.') || event.type === 'reset'));
+    }
+
+    ngOnDestroy(): void {
+        this.disconnect();
+    }
+}
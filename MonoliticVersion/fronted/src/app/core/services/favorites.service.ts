@@ -2,6 +2,7 @@ import { Injectable } from '@angular/core';
 import { HttpClient } from '@angular/common/http';
 import { Observable, BehaviorSubject } from 'rxjs';
 import { map, tap } from 'rxjs/operators';
+import { CatalogEventsService } from './catalog-events.service';
 
 export interface FavoriteResponse {
     success: boolean;
@@ -21,8 +22,23 @@ export class FavoritesService {
     // Cache de favoritos del usuario
     private userFavorites$ = new BehaviorSubject<number[]>([]);
 
-    constructor(private http: HttpClient) {
+    constructor(private http: HttpClient, private catalogEvents: CatalogEventsService) {
         this.loadUserFavorites();
+
+        // Favoritos cambiados desde otra pestaña o dispositivo (SSE)
+        this.catalogEvents.connect(this.USER_ID);
+        this.catalogEvents.favoriteEvents().subscribe(event => this.applyFavoriteEvent(event.type, event.data));
+    }
+
+    private applyFavoriteEvent(type: string, data: any): void {
+        const current = this.userFavorites$.value;
+        if (type === 'favorite.added' && !current.includes(data.song_id)) {
+            this.userFavorites$.next([...current, data.song_id]);
+        } else if (type === 'favorite.removed') {
+            this.userFavorites$.next(current.filter(id => id !== data.song_id));
+        } else if (type === 'reset') {
+            this.loadUserFavorites();
+        }
     }
 
     /**
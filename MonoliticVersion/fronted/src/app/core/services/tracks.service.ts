@@ -3,6 +3,7 @@ import { HttpClient } from '@angular/common/http';
 import { Observable, BehaviorSubject } from 'rxjs';
 import { map } from 'rxjs/operators';
 import { TrackModel } from '@core/models/tracks.model';
+import { CatalogEventsService } from './catalog-events.service';
 
 @Injectable({
     providedIn: 'root'
@@ -14,7 +15,11 @@ export class TracksService {
     private tracksRefreshSubject = new BehaviorSubject<boolean>(false);
     public tracksRefresh$ = this.tracksRefreshSubject.asObservable();
 
-    constructor(private http: HttpClient) { }
+    constructor(private http: HttpClient, private catalogEvents: CatalogEventsService) {
+        // Cambios del catálogo en tiempo real (SSE) en lugar de recargar por polling
+        this.catalogEvents.connect();
+        this.catalogEvents.songEvents().subscribe(() => this.refreshTracks());
+    }
 
     getAllTracks(): Observable<TrackModel[]> {
         console.log('Calling API:', `${this.API_URL}/songs`);